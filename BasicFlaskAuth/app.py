@@ -1,5 +1,8 @@
 from flask import Flask, request, abort
 import json
+import re
+import threading
+import time
 from functools import wraps
 from jose import jwt
 from urllib.request import urlopen
@@ -12,6 +15,14 @@ ALGORITHMS = ['RS256']
 API_AUDIENCE = @TODO_REPLACE_WITH_YOUR_API_AUDIENCE
 
 
+# JWKS cache, keys are kept for the Cache-Control max-age of the response
+JWKS_DEFAULT_MAX_AGE = 600
+JWKS_MIN_REFETCH_INTERVAL = 30
+jwks_cache = {'keys': {}, 'fetched_at': None, 'expires_at': 0}
+jwks_lock = threading.Lock()
+jwks_refresh_thread = None
+
+
 class AuthError(Exception):
     def __init__(self, error, status_code):
         self.error = error
@@ -51,9 +62,79 @@ def get_token_auth_header():
     return token
 
 
+def fetch_jwks():
+    """Fetches the signing keys and caches them by kid
+    """
+    started = time.monotonic()
+    with jwks_lock:
+        # Another thread fetched while we waited for the lock
+        if jwks_cache['fetched_at'] is not None and jwks_cache['fetched_at'] >= started:
+            return
+        jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json', timeout=5)
+        jwks = json.loads(jsonurl.read())
+        max_age = parse_max_age(jsonurl.headers.get('Cache-Control'), JWKS_DEFAULT_MAX_AGE)
+        jwks_cache['keys'] = {key['kid']: key for key in jwks['keys']}
+        jwks_cache['fetched_at'] = time.monotonic()
+        jwks_cache['expires_at'] = jwks_cache['fetched_at'] + max_age
+
+
+def parse_max_age(cache_control, default):
+    """Reads max-age from a Cache-Control header, no-cache/no-store mean 0
+    """
+    if not cache_control:
+        return default
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else default
+
+
+def refresh_jwks_in_background():
+    global jwks_refresh_thread
+    if jwks_refresh_thread is not None and jwks_refresh_thread.is_alive():
+        return
+
+    def refresh():
+        try:
+            fetch_jwks()
+        except Exception:
+            # Keep serving the cached keys until the next retry
+            jwks_cache['expires_at'] = time.monotonic() + JWKS_MIN_REFETCH_INTERVAL
+
+    jwks_refresh_thread = threading.Thread(target=refresh, daemon=True)
+    jwks_refresh_thread.start()
+
+
+def fetch_jwks_or_raise():
+    """Fetches the signing keys, raising a 503 AuthError if Auth0 cannot be reached
+    """
+    try:
+        fetch_jwks()
+    # URLError for connection failures, OSError for timeouts while reading
+    except (OSError, ValueError):
+        raise AuthError({
+            'code': 'jwks_unavailable',
+            'description': 'Unable to fetch the signing keys.'
+        }, 503)
+
+
+def get_signing_key(kid):
+    """Returns the cached JWK for kid, re-fetching once on an unknown kid
+    """
+    if jwks_cache['fetched_at'] is None:
+        fetch_jwks_or_raise()
+    now = time.monotonic()
+    since_fetch = now - jwks_cache['fetched_at']
+    if now >= jwks_cache['expires_at'] and since_fetch >= JWKS_MIN_REFETCH_INTERVAL:
+        refresh_jwks_in_background()
+    key = jwks_cache['keys'].get(kid)
+    if key is None and since_fetch >= JWKS_MIN_REFETCH_INTERVAL:
+        fetch_jwks_or_raise()
+        key = jwks_cache['keys'].get(kid)
+    return key
+
+
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
     unverified_header = jwt.get_unverified_header(token)
     rsa_key = {}
     if 'kid' not in unverified_header:
@@ -62,15 +143,15 @@ def verify_decode_jwt(token):
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    key = get_signing_key(unverified_header['kid'])
+    if key:
+        rsa_key = {
+            'kty': key['kty'],
+            'kid': key['kid'],
+            'use': key['use'],
+            'n': key['n'],
+            'e': key['e']
+        }
     if rsa_key:
         try:
             payload = jwt.decode(
@@ -111,6 +192,9 @@ def requires_auth(f):
         token = get_token_auth_header()
         try:
             payload = verify_decode_jwt(token)
+        except AuthError as e:
+            # Keys that could not be fetched are not the client's fault
+            abort(503 if e.status_code == 503 else 401)
         except:
             abort(401)
         return f(payload, *args, **kwargs)
@@ -0,0 +1,103 @@
+#----------------------------------------------------------------------------#
+# JSON API helpers.
+#
+# Pagination, field selection and the response the /api/v1 blueprint in
+# app.py sends: compact JSON with a weak ETag, answered with 304 Not
+# Modified when the client already has it, and gzipped when the client
+# accepts it.
+#----------------------------------------------------------------------------#
+import gzip
+import hashlib
+import json
+
+from flask import Response, request, url_for
+from werkzeug.exceptions import BadRequest
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+# Deeper pages would make the database skip a million rows or more
+MAX_PAGE = 10000
+# Smaller bodies are sent uncompressed
+MIN_GZIP_SIZE = 512
+GZIP_LEVEL = 6
+
+
+def int_arg(args, name, default, low, high):
+  '''The query string argument name as an int from low to high, default
+  when it is missing. Raises BadRequest for anything else.'''
+  value = args.get(name)
+  if value is None:
+    return default
+  try:
+    number = int(value)
+  except ValueError:
+    number = None
+  if number is None or not low <= number <= high:
+    raise BadRequest('{} must be a whole number from {} to {}.'.format(name, low, high))
+  return number
+
+
+def page_args(args):
+  '''(page, per_page) from the query string, page counts from 1.'''
+  page = int_arg(args, 'page', 1, 1, MAX_PAGE)
+  per_page = int_arg(args, 'per_page', DEFAULT_PER_PAGE, 1, MAX_PER_PAGE)
+  return page, per_page
+
+
+def paginate(query, page, per_page):
+  '''(rows, has_next) for one page of query. Fetches one row past the page
+  to tell whether another follows, instead of counting every row.'''
+  rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+  return rows[:per_page], len(rows) > per_page
+
+
+def field_args(args, available):
+  '''The names in ?fields=a,b as a tuple, or None for every field.'''
+  if not args.get('fields'):
+    return None
+  fields = tuple(name.strip() for name in args['fields'].split(',') if name.strip())
+  unknown = [name for name in fields if name not in available]
+  if unknown:
+    raise BadRequest('Unknown fields: {}. Available: {}.'.format(', '.join(unknown), ', '.join(available)))
+  return fields
+
+
+def list_payload(key, records, page, per_page, has_next):
+  '''{key: records, page, per_page, next}, next is the URL of the
+  following page with the same query string, or None on the last one.'''
+  next_url = None
+  if has_next:
+    args = request.args.to_dict()
+    args['page'] = page + 1
+    next_url = url_for(request.endpoint, _external=True, **dict(request.view_args, **args))
+  return {key: records, 'page': page, 'per_page': per_page, 'next': next_url}
+
+
+def select_fields(record, fields):
+  if fields is None:
+    return record
+  return {name: record[name] for name in fields}
+
+
+def encode(value):
+  # Dates and datetimes
+  return value.isoformat()
+
+
+def json_response(payload, status=200):
+  '''The payload as a JSON response, made conditional and compressed for
+  the current request.'''
+  body = json.dumps(payload, default=encode, separators=(',', ':')).encode('utf-8')
+  response = Response(body, status=status, mimetype='application/json')
+  response.cache_control.no_cache = True
+  response.vary.add('Accept-Encoding')
+  if status != 200:
+    return response
+
+  # Weak, as the gzipped and plain bodies share it
+  response.set_etag(hashlib.sha1(body).hexdigest(), weak=True)
+  response.make_conditional(request)
+  if response.status_code == 200 and len(body) >= MIN_GZIP_SIZE and request.accept_encodings['gzip']:
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+  return response
@@ -3,19 +3,33 @@
 #----------------------------------------------------------------------------#
 import sys
 import json
+import multiprocessing
+import signal
+from collections import namedtuple
+from itertools import groupby
+from datetime import timedelta
+import click
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, jsonify, redirect, url_for, abort
+from flask import Flask, Blueprint, render_template, request, Response, flash, jsonify, redirect, url_for, abort, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_moment import Moment
 from sqlalchemy.exc import IntegrityError
-from psycopg2.errors import ForeignKeyViolation
+from sqlalchemy.dialects.postgresql import JSONB
+from psycopg2.errors import ExclusionViolation, ForeignKeyViolation
 from flask_migrate import Migrate
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import FlaskForm
 from forms import *
+from validation import without_csrf, validate_json, parse_datetime, VENUE_RULES, ARTIST_RULES, SHOW_RULES, STATES, STATE_SET
+import assets
+import scheduling
+import ical
+import jobs
+import warmup
+import api
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
@@ -25,6 +39,13 @@ moment = Moment(app)
 app.config.from_object('config')
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
+assets.init_app(app)
+
+@app.cli.command('build-assets')
+def build_assets():
+  '''Bundles, fingerprints and precompresses static/ into static/dist.'''
+  manifest = assets.build()
+  print('Built {} assets into {}'.format(len(manifest), assets.DIST_DIR))
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -37,18 +58,31 @@ class Genre(db.Model):
 
 # Association table for venues to genres
 venue_genres = db.Table('venue_genres',
-    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True),
     db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True)
 )
 
 # Association table for artists to genres
 artist_genres = db.Table('artist_genres',
-    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True),
     db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True)
 )
 
-class Venue(db.Model):
+# Venues and artists are deleted with a single DELETE, the database cascades it
+# to their shows and genre rows (passive_deletes keeps SQLAlchemy from loading
+# them first). With SOFT_DELETE set they are hidden instead, see purge_deleted().
+class SoftDeleteMixin(object):
+    deleted_at = db.Column(db.DateTime, index=True)
+
+    @classmethod
+    def listed(cls):
+        '''Query for the rows that have not been soft deleted.'''
+        return cls.query.filter(cls.deleted_at.is_(None))
+
+class Venue(SoftDeleteMixin, db.Model):
     __tablename__ = 'venue'
+    # Show searches filter by state, or state and city
+    __table_args__ = (db.Index('ix_venue_state_city', 'state', 'city'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
@@ -60,10 +94,10 @@ class Venue(db.Model):
     website = db.Column(db.String)
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String)
-    shows = db.relationship("Show", backref="venue", lazy=True, cascade="all, delete-orphan")
-    genres = db.relationship("Genre", secondary=venue_genres, backref="venues", lazy=True)
+    shows = db.relationship("Show", backref="venue", lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    genres = db.relationship("Genre", secondary=venue_genres, backref="venues", lazy=True, passive_deletes=True)
 
-class Artist(db.Model):
+class Artist(SoftDeleteMixin, db.Model):
     __tablename__ = 'artist'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -76,18 +110,52 @@ class Artist(db.Model):
     website = db.Column(db.String)
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String)
-    shows = db.relationship("Show", backref="artist", lazy=True, cascade="all, delete-orphan")
-    genres = db.relationship("Genre", secondary=artist_genres, backref="artists", lazy=True)
+    shows = db.relationship("Show", backref="artist", lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    genres = db.relationship("Genre", secondary=artist_genres, backref="artists", lazy=True, passive_deletes=True)
 
 # Note: Show is also an association table for artists <-> venues
 class Show(db.Model):
     __tablename__ = 'show'
     id = db.Column(db.Integer, primary_key=True)
-    start_time = db.Column(db.DateTime)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'))
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'))
+    start_time = db.Column(db.DateTime, index=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), index=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), index=True)
     # Note: Show.artist and Show.venue exist via backref
 
+JSONDocument = db.JSON().with_variant(JSONB(), 'postgresql')
+
+# Denormalized copies of what the venue and artist pages show, one row per
+# listing, kept current by refresh_profiles()
+
+class VenueProfile(db.Model):
+    __tablename__ = 'venue_profile'
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True)
+    document = db.Column(JSONDocument, nullable=False)
+    built_at = db.Column(db.DateTime, nullable=False)
+
+class ArtistProfile(db.Model):
+    __tablename__ = 'artist_profile'
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True)
+    document = db.Column(JSONDocument, nullable=False)
+    built_at = db.Column(db.DateTime, nullable=False)
+
+# A background job, queued by jobs.enqueue() and run by `flask worker`
+class Job(db.Model):
+    __tablename__ = 'job'
+    # Workers claim the earliest due queued job
+    __table_args__ = (db.Index('ix_job_status_run_at', 'status', 'run_at'),)
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    args = db.Column(JSONDocument, nullable=False)
+    status = db.Column(db.String(16), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime, index=True)
+    worker = db.Column(db.String(120))
+    last_error = db.Column(db.Text)
+
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
@@ -129,11 +197,569 @@ def get_genres(genre_strings):
   #   db.session.close()
   return genres
 
+def get_genre_ids(genre_names):
+  '''Ids of the named genres, inserting the ones not in the db yet.
+  Flushes but does not commit.'''
+  ids = dict(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(genre_names)).all())
+  new_genres = [Genre(name=name) for name in set(genre_names) - set(ids)]
+  if new_genres:
+    db.session.add_all(new_genres)
+    db.session.flush()
+    ids.update((genre.name, genre.id) for genre in new_genres)
+  return {ids[name] for name in genre_names}
+
+def save_listing_changes(model, association, listing_id, values, genre_names):
+  '''Writes an edit of a venue or artist as the smallest set of statements:
+  an UPDATE of just the columns in values that changed, skipped if none did,
+  and INSERT/DELETE on the association table for the genres added and
+  removed, then the profile documents the edit changes. Nothing is loaded
+  into the session. Commits, and returns False if there is no such listing.'''
+  current = db.session.query(*[getattr(model, name) for name in values]).filter(
+    model.id == listing_id, model.deleted_at.is_(None)).first()
+  if current is None:
+    return False
+
+  changed = {name: value for name, value in values.items() if getattr(current, name) != value}
+  if changed:
+    db.session.query(model).filter(model.id == listing_id).update(changed, synchronize_session=False)
+
+  listing_column = association.c[model.__tablename__ + '_id']
+  current_ids = {genre_id for genre_id, in db.session.execute(
+    db.select([association.c.genre_id]).where(listing_column == listing_id))}
+  genre_ids = get_genre_ids(genre_names)
+  removed = current_ids - genre_ids
+  added = genre_ids - current_ids
+  if removed:
+    db.session.execute(association.delete().where(listing_column == listing_id).where(association.c.genre_id.in_(removed)))
+  if added:
+    db.session.execute(association.insert(), [{listing_column.name: listing_id, 'genre_id': genre_id} for genre_id in added])
+  if changed or removed or added:
+    others = show_counterparts(model, listing_id) if EMBEDDED_FIELDS & set(changed) else ()
+    refresh_listing_profiles(model, listing_id, others)
+  db.session.commit()
+  return True
+
 def flash_errors(form):
   for field, errors in form.errors.items():
     for error in errors:
       flash("Error in the {} field - {}".format(getattr(form, field).label.text,error))
 
+def create_from_json(rules, model, check=None):
+  '''Creates a model from a JSON request body checked with validate_json,
+  the path for API clients, which skips building a form. check, if given,
+  is called with the validated values and returns messages that reject
+  the record with a 409.'''
+  values, errors = validate_json(rules, request.get_json(silent=True))
+  if errors:
+    return jsonify({'success': False, 'errors': errors}), 400
+  messages = check(values) if check else None
+  if messages:
+    return jsonify({'success': False, 'errors': {'json': messages}}), 409
+  try:
+    if 'genres' in values:
+      values['genres'] = get_genres(values['genres'])
+    record = model(**values)
+    db.session.add(record)
+    db.session.flush()
+    refresh_record_profiles(record)
+    db.session.commit()
+    record_id = record.id
+  except IntegrityError as e:
+    db.session.rollback()
+    if isinstance(e.orig, ForeignKeyViolation):
+      return jsonify({'success': False, 'errors': {'json': ['Show must use valid artist and venue ids.']}}), 422
+    if isinstance(e.orig, ExclusionViolation):
+      return jsonify({'success': False, 'errors': {'json': [SHOW_OVERLAP_MESSAGE]}}), 409
+    raise
+  finally:
+    db.session.close()
+  return jsonify({'success': True, 'id': record_id}), 201
+
+def edit_from_json(rules, model, association, listing_id):
+  '''Edits a venue or artist from a JSON request body checked with
+  validate_json, the counterpart of create_from_json. Every field is
+  replaced, as the edit forms do.'''
+  values, errors = validate_json(rules, request.get_json(silent=True))
+  if errors:
+    return jsonify({'success': False, 'errors': errors}), 400
+  genre_names = values.pop('genres')
+  try:
+    found = save_listing_changes(model, association, listing_id, values, genre_names)
+  except Exception:
+    db.session.rollback()
+    raise
+  finally:
+    db.session.close()
+  if not found:
+    abort(404)
+  return jsonify({'success': True, 'id': listing_id})
+
+SHOW_OVERLAP_MESSAGE = 'The artist or venue is already booked at that time.'
+
+def show_conflicts(proposed):
+  '''Messages for the conflicts of a batch of proposed shows, each a
+  (artist_id, venue_id, start_time), as (index, reason, message) tuples.'''
+  conflicts = scheduling.check_shows(db.session, proposed, Artist, Venue, Show)
+  return [(c.index, c.reason, scheduling.describe(c, proposed[c.index])) for c in conflicts]
+
+def check_new_show(values):
+  proposed = (values['artist_id'], values['venue_id'], values['start_time'])
+  return [message for _, _, message in show_conflicts([proposed])]
+
+# Rows fetched per round trip while a show search streams
+SHOW_SEARCH_BATCH = 200
+SHOW_SEARCH_DEFAULT_DAYS = 7
+SHOW_SEARCH_MAX_DAYS = 366
+
+def parse_show_search(args):
+  '''Filters of a show search from its query string: from and to, ISO dates
+  or datetimes, to exclusive, default the next 7 days, local time unless
+  they have a UTC offset; state; city, which
+  needs a state; venue_id and artist_id. Returns (filters, errors).'''
+  filters, errors, dates = {}, {}, {}
+  for name in ('from', 'to'):
+    try:
+      dates[name] = parse_datetime(args[name]) if args.get(name) else None
+    except ValueError:
+      errors[name] = ['Not a valid date.']
+  filters['start'] = dates.get('from') or datetime.now()
+  filters['end'] = dates.get('to') or filters['start'] + timedelta(days=SHOW_SEARCH_DEFAULT_DAYS)
+  if not errors and not timedelta(0) < filters['end'] - filters['start'] <= timedelta(days=SHOW_SEARCH_MAX_DAYS):
+    errors['to'] = ['Must be after from, by at most {} days.'.format(SHOW_SEARCH_MAX_DAYS)]
+
+  filters['state'] = args.get('state') or None
+  filters['city'] = args.get('city') or None
+  if filters['state'] is not None and filters['state'] not in STATE_SET:
+    errors['state'] = ['Not a valid choice']
+  if filters['city'] is not None and filters['state'] is None:
+    errors['city'] = ['Needs a state.']
+  for name in ('venue_id', 'artist_id'):
+    filters[name] = args.get(name, type=int)
+  return filters, errors
+
+def query_shows(start=None, end=None, state=None, city=None, venue_id=None, artist_id=None):
+  '''Shows from start until end, either left out for no bound, ordered by
+  start time, as rows of the columns a listing needs. The time range uses
+  the show.start_time index, state and city the venue (state, city) one.
+  Shows of soft deleted venues and artists are left out. Rows are fetched
+  in batches as the query is iterated, through a server side cursor on
+  Postgres.'''
+  query = db.session.query(
+    Show.id, Show.start_time, Show.venue_id, Venue.name.label('venue_name'),
+    Venue.address, Venue.city, Venue.state, Venue.image_link.label('venue_image_link'),
+    Show.artist_id, Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link')
+  ).join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id).filter(
+    Venue.deleted_at.is_(None), Artist.deleted_at.is_(None))
+  if start is not None:
+    query = query.filter(Show.start_time >= start)
+  if end is not None:
+    query = query.filter(Show.start_time < end)
+  if state is not None:
+    query = query.filter(Venue.state == state)
+  if city is not None:
+    query = query.filter(Venue.city == city)
+  if venue_id is not None:
+    query = query.filter(Show.venue_id == venue_id)
+  if artist_id is not None:
+    query = query.filter(Show.artist_id == artist_id)
+  return query.order_by(Show.start_time, Show.id).yield_per(SHOW_SEARCH_BATCH)
+
+# The listing and profile queries below back both the HTML pages and
+# /api/v1, one or two statements each instead of a lazy load per venue,
+# artist or show.
+
+def upcoming_show_count(listing, other):
+  '''Correlated count of listing's upcoming shows with a listed other side,
+  one column of the listing query.'''
+  show_column = Show.venue_id if listing is Venue else Show.artist_id
+  other_column = Show.artist_id if other is Artist else Show.venue_id
+  return db.session.query(db.func.count(Show.id)).join(other, other.id == other_column).filter(
+    show_column == listing.id, Show.start_time > datetime.now(), other.deleted_at.is_(None)
+  ).correlate(listing).as_scalar().label('num_upcoming_shows')
+
+def query_venues(name=None, state=None, city=None):
+  '''Listed venues ordered by place and name, with their number of
+  upcoming shows. name matches anywhere in the venue name, ignoring case.'''
+  query = db.session.query(
+    Venue.id, Venue.name, Venue.city, Venue.state, Venue.image_link, upcoming_show_count(Venue, Artist)
+  ).filter(Venue.deleted_at.is_(None))
+  if name:
+    query = query.filter(Venue.name.ilike('%{}%'.format(name)))
+  if state is not None:
+    query = query.filter(Venue.state == state)
+  if city is not None:
+    query = query.filter(Venue.city == city)
+  return query.order_by(Venue.state, Venue.city, Venue.name, Venue.id)
+
+def query_artists(name=None):
+  '''Listed artists ordered by name, with their number of upcoming shows.'''
+  query = db.session.query(
+    Artist.id, Artist.name, Artist.city, Artist.state, Artist.image_link, upcoming_show_count(Artist, Venue)
+  ).filter(Artist.deleted_at.is_(None))
+  if name:
+    query = query.filter(Artist.name.ilike('%{}%'.format(name)))
+  return query.order_by(Artist.name, Artist.id)
+
+#  Profile documents
+#  ----------------------------------------------------------------
+# The venue and artist pages read one document per listing, a primary key
+# lookup on venue_profile or artist_profile. Every write that changes a
+# listing, its genres or its shows rebuilds the documents it touches in the
+# same transaction. A document also holds the name and image of the other
+# side of each show, so renaming an artist queues a job rebuilding the
+# documents of the venues it plays at. check-profiles compares the
+# documents with the source tables.
+
+ProfileKind = namedtuple('ProfileKind', ['document_model', 'key', 'fields', 'association', 'show_column', 'show_fields'])
+
+VENUE_PROFILE_FIELDS = ('id', 'name', 'address', 'city', 'state', 'phone', 'website', 'facebook_link',
+                        'seeking_talent', 'seeking_description', 'image_link')
+ARTIST_PROFILE_FIELDS = ('id', 'name', 'city', 'state', 'phone', 'website', 'facebook_link',
+                         'seeking_venue', 'seeking_description', 'image_link')
+
+PROFILE_KINDS = {
+  Venue: ProfileKind(VenueProfile, 'venue_id', VENUE_PROFILE_FIELDS, venue_genres, Show.venue_id,
+                     ('id', 'start_time', 'artist_id', 'artist_name', 'artist_image_link')),
+  Artist: ProfileKind(ArtistProfile, 'artist_id', ARTIST_PROFILE_FIELDS, artist_genres, Show.artist_id,
+                      ('id', 'start_time', 'venue_id', 'venue_name', 'venue_image_link')),
+}
+
+# Columns of a listing that the other side's documents hold
+EMBEDDED_FIELDS = {'name', 'image_link'}
+
+def build_profiles(model, ids):
+  '''Documents of the listed venues or artists among ids, by id, built from
+  the source tables in three statements however many ids there are.'''
+  kind = PROFILE_KINDS[model]
+  documents = {}
+  for row in db.session.query(*[getattr(model, field) for field in kind.fields]).filter(
+      model.id.in_(list(ids)), model.deleted_at.is_(None)):
+    documents[row.id] = dict(row._asdict(), genres=[], shows=[])
+  if not documents:
+    return documents
+
+  listing_column = kind.association.c[kind.key]
+  for listing_id, genre in db.session.query(listing_column, Genre.name).join(
+      Genre, Genre.id == kind.association.c.genre_id).filter(
+      listing_column.in_(list(documents))).order_by(listing_column, Genre.name):
+    documents[listing_id]['genres'].append(genre)
+
+  for show in query_shows().filter(kind.show_column.in_(list(documents))):
+    entry = {field: getattr(show, field) for field in kind.show_fields}
+    entry['start_time'] = show.start_time.isoformat()
+    documents[getattr(show, kind.key)]['shows'].append(entry)
+  return documents
+
+def rebuild_profiles(model, ids):
+  '''Rebuilds the documents of the given venues or artists, dropping those
+  of listings that are gone or soft deleted. Does not commit.'''
+  ids = list(set(ids))
+  if not ids:
+    return
+  kind = PROFILE_KINDS[model]
+  # Writers of the same document take turns, so each builds on the rows
+  # the one before it committed. NO KEY UPDATE leaves inserting shows,
+  # which only share lock the listing, unblocked.
+  db.session.query(model.id).filter(model.id.in_(ids)).order_by(model.id).with_for_update(key_share=True).all()
+  documents = build_profiles(model, ids)
+  key = getattr(kind.document_model, kind.key)
+  db.session.query(kind.document_model).filter(key.in_(ids)).delete(synchronize_session=False)
+  if documents:
+    built_at = datetime.now()
+    db.session.execute(kind.document_model.__table__.insert(), [
+      {kind.key: listing_id, 'document': document, 'built_at': built_at}
+      for listing_id, document in documents.items()])
+
+def refresh_profiles(venue_ids=(), artist_ids=()):
+  # Venues first, the same lock order for every writer
+  rebuild_profiles(Venue, venue_ids)
+  rebuild_profiles(Artist, artist_ids)
+
+def refresh_record_profiles(record):
+  '''Refreshes the documents a newly added venue, artist or show changes.'''
+  if isinstance(record, Show):
+    refresh_profiles([record.venue_id], [record.artist_id])
+  elif isinstance(record, Venue):
+    refresh_profiles(venue_ids=[record.id])
+  elif isinstance(record, Artist):
+    refresh_profiles(artist_ids=[record.id])
+
+def show_counterparts(model, listing_id):
+  '''Ids of the artists playing at a venue, or of the venues an artist plays
+  at, whose documents embed the listing.'''
+  kind = PROFILE_KINDS[model]
+  other = Show.artist_id if model is Venue else Show.venue_id
+  return {other_id for other_id, in db.session.query(other).filter(kind.show_column == listing_id).distinct()}
+
+def refresh_listing_profiles(model, listing_id, others=()):
+  '''Refreshes a venue's or artist's document, and queues a job refreshing
+  those of others, ids from show_counterparts(), which can be many.'''
+  rebuild_profiles(model, [listing_id])
+  if others:
+    key = 'artist_ids' if model is Venue else 'venue_ids'
+    jobs.enqueue(db.session, Job, 'refresh-profiles', {key: sorted(others)})
+
+def profile_info(document):
+  '''The page context for a document: its shows split into past and
+  upcoming, with counts.'''
+  now = datetime.now()
+  info = dict(document, past_shows=[], upcoming_shows=[])
+  for show in info.pop('shows'):
+    show['start_time'] = datetime.fromisoformat(show['start_time'])
+    (info['upcoming_shows'] if show['start_time'] > now else info['past_shows']).append(show)
+  info['past_shows_count'] = len(info['past_shows'])
+  info['upcoming_shows_count'] = len(info['upcoming_shows'])
+  return info
+
+def read_profile(model, listing_id):
+  kind = PROFILE_KINDS[model]
+  document = db.session.query(kind.document_model.document).filter(
+    getattr(kind.document_model, kind.key) == listing_id).scalar()
+  if document is None:
+    # Not built yet, until check-profiles --fix has run after the migration
+    document = build_profiles(model, [listing_id]).get(listing_id)
+  return profile_info(document) if document is not None else None
+
+def venue_profile(venue_id):
+  '''Everything the venue page shows, or None for an unknown venue.'''
+  return read_profile(Venue, venue_id)
+
+def artist_profile(artist_id):
+  '''Everything the artist page shows, or None for an unknown artist.'''
+  return read_profile(Artist, artist_id)
+
+def check_profiles(model, batch_size=500, fix=False):
+  '''Compares the documents of every venue or artist with ones built from
+  the source tables, a batch of listings at a time. Returns the ids with a
+  missing, stale or leftover document, rebuilding them first with fix.'''
+  kind = PROFILE_KINDS[model]
+  key = getattr(kind.document_model, kind.key)
+  problems = {'missing': [], 'stale': [], 'leftover': []}
+  last_id = 0
+  while True:
+    ids = [listing_id for listing_id, in db.session.query(model.id).filter(
+      model.id > last_id, model.deleted_at.is_(None)).order_by(model.id).limit(batch_size)]
+    if not ids:
+      break
+    last_id = ids[-1]
+    built = build_profiles(model, ids)
+    stored = dict(db.session.query(key, kind.document_model.document).filter(key.in_(ids)))
+    missing = [listing_id for listing_id in ids if listing_id not in stored]
+    stale = [listing_id for listing_id in ids if listing_id in stored and stored[listing_id] != built[listing_id]]
+    problems['missing'] += missing
+    problems['stale'] += stale
+    if fix and (missing or stale):
+      rebuild_profiles(model, missing + stale)
+    db.session.commit()
+
+  # Soft deleted listings keep no document, hard deleted ones cascade
+  problems['leftover'] = [listing_id for listing_id, in db.session.query(key).join(
+    model, model.id == key).filter(model.deleted_at.isnot(None)).order_by(key)]
+  if fix and problems['leftover']:
+    rebuild_profiles(model, problems['leftover'])
+    db.session.commit()
+  return problems
+
+@app.cli.command('check-profiles')
+@click.option('--fix', is_flag=True, help='Rebuild the documents that do not match.')
+@click.option('--batch-size', default=500, show_default=True)
+def check_profiles_command(fix, batch_size):
+  '''Checks the venue and artist profile documents against the source
+  tables. Exits with status 1 if any did not match.'''
+  found = False
+  for model in (Venue, Artist):
+    problems = check_profiles(model, batch_size, fix)
+    for problem, ids in problems.items():
+      if ids:
+        found = True
+        shown = ', '.join(str(listing_id) for listing_id in ids[:20]) + (', ...' if len(ids) > 20 else '')
+        print('{} {} {} documents: {}'.format(len(ids), problem, model.__name__.lower(), shown))
+  if not found:
+    print('All profile documents match.')
+  elif fix:
+    print('Rebuilt.')
+  else:
+    sys.exit(1)
+
+def wants_json():
+  '''Whether the request asks for JSON, with ?format=json or its Accept header.'''
+  return request.args.get('format') == 'json' or \
+    request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+def stream_json_list(key, rows):
+  '''Writes {key: [row, ...]} one row at a time.'''
+  yield '{{"{}": ['.format(key)
+  separator = ''
+  for row in rows:
+    yield separator + json.dumps(row, default=lambda value: value.isoformat())
+    separator = ','
+  yield ']}'
+
+def stream_template(template_name, **context):
+  '''render_template() as a generator, so the page is sent as it renders.'''
+  app.update_template_context(context)
+  stream = app.jinja_env.get_template(template_name).stream(context)
+  stream.enable_buffering(5)
+  return stream
+
+def delete_listing(model, listing_id):
+  '''Deletes a venue or artist with one DELETE statement, which the database
+  cascades to its shows and genres. With SOFT_DELETE set it only stamps
+  deleted_at, and purge-deleted removes the row later.'''
+  listing = model.listed().filter_by(id=listing_id)
+  name = listing.with_entities(model.name).scalar()
+  if name is None:
+    return redirect(url_for('index'))
+
+  error = False
+  try:
+    # Read before the shows cascade away
+    others = show_counterparts(model, listing_id)
+    if app.config.get('SOFT_DELETE'):
+      listing.update({'deleted_at': datetime.now()}, synchronize_session=False)
+    else:
+      listing.delete(synchronize_session=False)
+    refresh_listing_profiles(model, listing_id, others)
+    db.session.commit()
+  except Exception as e:
+    error = True
+    db.session.rollback()
+    print("Error deleting {} {}: {}".format(model.__name__, listing_id, e))
+  finally:
+    db.session.close()
+  if error:
+    abort(500)
+  # Flask cannot redirect via an AJAX call, so it gets handled on the JavaScript side
+  flash('{} {} was successfully deleted!'.format(model.__name__, name))
+  return jsonify({'success': True, 'redirect': url_for('index')})
+
+def restore_listing(model, listing_id):
+  '''Brings back a soft deleted venue or artist with its shows, and
+  refreshes the profile documents that left them out. Commits, and
+  returns False if there is no such soft deleted listing.'''
+  restored = model.query.filter(model.id == listing_id, model.deleted_at.isnot(None)).update(
+    {'deleted_at': None}, synchronize_session=False)
+  if restored:
+    refresh_listing_profiles(model, listing_id, show_counterparts(model, listing_id))
+  db.session.commit()
+  return bool(restored)
+
+@app.cli.command('restore')
+@click.argument('kind', type=click.Choice(['venue', 'artist']))
+@click.argument('listing_id', type=int)
+def restore_command(kind, listing_id):
+  '''Restores a soft deleted venue or artist.'''
+  model = Venue if kind == 'venue' else Artist
+  if not restore_listing(model, listing_id):
+    sys.exit('No soft deleted {} {}'.format(kind, listing_id))
+  print('Restored {} {}'.format(kind, listing_id))
+
+def purge_deleted(before, batch_size=500):
+  '''Deletes venues and artists soft deleted before the given datetime, in
+  batches of batch_size rows, each its own transaction so no lock is held
+  for long. Returns the number of rows deleted per model name.'''
+  purged = {}
+  for model in (Venue, Artist):
+    purged[model.__name__] = 0
+    while True:
+      batch = db.session.query(model.id).filter(model.deleted_at < before).limit(batch_size).subquery()
+      count = model.query.filter(model.id.in_(batch)).delete(synchronize_session=False)
+      db.session.commit()
+      purged[model.__name__] += count
+      if count < batch_size:
+        break
+  return purged
+
+@app.cli.command('purge-deleted')
+@click.option('--days', default=None, type=int, help='Keep rows soft deleted within this many days. Defaults to SOFT_DELETE_RETENTION_DAYS.')
+@click.option('--batch-size', default=500, show_default=True)
+def purge_deleted_command(days, batch_size):
+  '''Deletes soft deleted venues and artists, with their shows.'''
+  if days is None:
+    days = app.config['SOFT_DELETE_RETENTION_DAYS']
+  purged = purge_deleted(datetime.now() - timedelta(days=days), batch_size)
+  for name, count in purged.items():
+    print('Purged {} {} rows'.format(count, name.lower()))
+
+#  Background jobs
+#  ----------------------------------------------------------------
+# Work that need not hold up a request, and periodic maintenance. See
+# jobs.py for the queue.
+
+@jobs.task('refresh-profiles', max_attempts=5)
+def refresh_profiles_job(venue_ids=(), artist_ids=()):
+  refresh_profiles(venue_ids, artist_ids)
+
+@jobs.task('purge-deleted', limit=1, every=timedelta(days=1))
+def purge_deleted_job():
+  if app.config.get('SOFT_DELETE'):
+    purge_deleted(datetime.now() - timedelta(days=app.config['SOFT_DELETE_RETENTION_DAYS']))
+
+@jobs.task('purge-jobs', limit=1, every=timedelta(days=1))
+def purge_jobs_job():
+  '''Deletes the jobs that finished more than JOB_RETENTION_DAYS ago.'''
+  before = datetime.now() - timedelta(days=app.config['JOB_RETENTION_DAYS'])
+  Job.query.filter(Job.status.in_((jobs.DONE, jobs.FAILED)), Job.finished_at < before).delete(synchronize_session=False)
+
+def run_worker(burst):
+  with app.app_context():
+    # Connections inherited from the parent process are not safe to share
+    db.engine.dispose()
+    jobs.Worker(db.session, Job, burst=burst).run()
+
+@app.cli.command('worker')
+@click.option('--processes', default=1, show_default=True, help='Worker processes to run.')
+@click.option('--burst', is_flag=True, help='Exit once no job is due.')
+def worker_command(processes, burst):
+  '''Runs background jobs until stopped.'''
+  if processes == 1:
+    return run_worker(burst)
+  workers = [multiprocessing.Process(target=run_worker, args=(burst,)) for _ in range(processes)]
+  for process in workers:
+    process.start()
+  # Each worker stops after its current job
+  signal.signal(signal.SIGTERM, lambda *args: [process.terminate() for process in workers])
+  for process in workers:
+    process.join()
+
+#  Warmup
+#  ----------------------------------------------------------------
+# `flask warmup` and the hooks in gunicorn.conf.py, see warmup.py.
+
+def warmup_pages(profiles):
+  '''WARMUP_PAGES, then the pages of the venues and artists with the most
+  upcoming shows, profiles of each.'''
+  paths = list(app.config['WARMUP_PAGES'])
+  for endpoint, key, query in (('show_venue', 'venue_id', query_venues()), ('show_artist', 'artist_id', query_artists())):
+    top = query.order_by(None).order_by(db.desc('num_upcoming_shows')).limit(profiles)
+    paths += [url_for(endpoint, **{key: listing.id}) for listing in top]
+  return paths
+
+def prime_caches():
+  '''Builds what the app otherwise builds on first use: the CSRF-less form
+  classes and the genre ids edits look up.'''
+  for form_class in (VenueForm, ArtistForm, ShowForm):
+    without_csrf(form_class)
+  return len(dict(db.session.query(Genre.name, Genre.id).all()))
+
+def warm_app(profiles=None, connections=None):
+  '''Warms this process, returns the warmup.Report.'''
+  if profiles is None:
+    profiles = app.config['WARMUP_PROFILES']
+  with app.test_request_context():
+    paths = warmup_pages(profiles)
+  db.session.remove()
+  return warmup.warm(app, db.engine, paths, prime_caches, connections)
+
+@app.cli.command('warmup')
+@click.option('--profiles', default=None, type=int, help='Venue and artist pages to render, those with the most upcoming shows. Defaults to WARMUP_PROFILES.')
+@click.option('--connections', default=None, type=int, help='Connections to open. Defaults to the pool size.')
+def warmup_command(profiles, connections):
+  '''Compiles templates, fills caches, opens connections and renders the
+  most visited pages.'''
+  for line in warmup.format_report(warm_app(profiles, connections)):
+    print(line)
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -147,21 +773,10 @@ def index():
 @app.route('/venues')
 def venues():
   ordered_venues = []
-  now = datetime.now()
-
-  # Get all unique city/state places
-  places = Venue.query.distinct(Venue.city, Venue.state).order_by(Venue.state).all()
-  for place in places:
-    # Venues that match the city and state
-    venues = Venue.query.filter(Venue.city == place.city, Venue.state == place.state).order_by(Venue.state, Venue.city).all()
-    venues_list = []
-    for venue in venues:
-      num_upcoming = 0
-      for show in venue.shows:
-        if show.start_time > now:
-          num_upcoming += 1
-      venues_list.append({'id': venue.id, 'name': venue.name, 'num_upcoming_shows': num_upcoming})
-    ordered_venues.append({'city':place.city, 'state':place.state, 'venues':venues_list})
+  # Rows come ordered by state and city, one group per place
+  for (state, city), venues in groupby(query_venues(), lambda venue: (venue.state, venue.city)):
+    venues_list = [{'id': venue.id, 'name': venue.name, 'num_upcoming_shows': venue.num_upcoming_shows} for venue in venues]
+    ordered_venues.append({'city':city, 'state':state, 'venues':venues_list})
     
   # Mock data
 
@@ -192,14 +807,9 @@ def venues():
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
   search_term = request.form.get('search_term', '')
-  search = '%{}%'.format(search_term) # Same as SQL LIKE operator, '%' is 0,1, or more chars 
-  venues = Venue.query.filter(Venue.name.ilike(search)).all()
+  venues = query_venues(name=search_term).all()
 
-  data = []
-  now = datetime.now()
-  for venue in venues:
-    upcoming = sum(map(lambda s: s.start_time > now, venue.shows))
-    data.append({'id':venue.id, 'name':venue.name, 'num_upcoming_shows':upcoming})
+  data = [{'id':venue.id, 'name':venue.name, 'num_upcoming_shows':venue.num_upcoming_shows} for venue in venues]
   results = {
     'count':len(venues),
     'data':data
@@ -217,37 +827,9 @@ def search_venues():
 
 @app.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
-  venue = Venue.query.get(venue_id)
-  now = datetime.now()
-  past_shows = []
-  upcoming_shows = []
-  for show in venue.shows:
-    show_info = {
-      'artist_id': show.artist_id, 'artist_name': show.artist.name,
-      'artist_image_link': show.artist.image_link, 'start_time': show.start_time
-    }
-    if show.start_time > now:
-      upcoming_shows.append(show_info)
-    else:
-      past_shows.append(show_info)
-  venue_info = {
-    'id': venue.id,
-    'name': venue.name,
-    'genres': [g.name for g in venue.genres],
-    'address': venue.address,
-    'city': venue.city,
-    'state': venue.state,
-    'phone': venue.phone,
-    'website': venue.website,
-    'facebook_link': venue.facebook_link,
-    'seeking_talent': venue.seeking_talent,
-    'seeking_description': venue.seeking_description,
-    'image_link': venue.image_link,
-    'past_shows': past_shows,
-    'upcoming_shows': upcoming_shows,
-    'past_shows_count': len(past_shows),
-    'upcoming_shows_count': len(upcoming_shows)
-  }
+  venue_info = venue_profile(venue_id)
+  if venue_info is None:
+    abort(404)
   # Mock data
   # data1={
   #   "id": 1,
@@ -339,7 +921,9 @@ def create_venue_form():
 
 @app.route('/venues/create', methods=['POST'])
 def create_venue_submission():
-  form = VenueForm(request.form, meta={'csrf':False})
+  if request.is_json:
+    return create_from_json(VENUE_RULES, Venue)
+  form = without_csrf(VenueForm)(request.form)
   error = False
   if form.validate():
     venue = {
@@ -351,6 +935,8 @@ def create_venue_submission():
     try:
       venue_model = Venue(**venue)
       db.session.add(venue_model)
+      db.session.flush()
+      refresh_record_profiles(venue_model)
       db.session.commit()
     except Exception as e:
       error = True
@@ -368,38 +954,16 @@ def create_venue_submission():
     flash_errors(form)
     return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@app.route('/venues/<int:venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
   # Deletes a venue using an AJAX call on the show venue page
-  venue = Venue.query.get(venue_id)
-  if not venue:
-    return redirect(url_for('index'))
-
-  error = False
-  # Save the venue name before deletion
-  venue_name = venue.name
-  try:
-      db.session.delete(venue)
-      db.session.commit()
-  except:
-      db.session.rollback()
-  finally:
-      db.session.close()
-  if error:
-      abort(400)
-  else:
-      # Flask cannot redirect via an AJAX call, so it gets handled on the JavaScript side
-      flash('Venue ' + venue_name + ' was successfully deleted!')
-      return jsonify({'success': True, 'redirect': url_for('index')})
+  return delete_listing(Venue, venue_id)
 
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
 def artists():
-  artists = Artist.query.all()
-  artists_info = []
-  for artist in artists:
-    artists_info.append({'id':artist.id, 'name':artist.name})
+  artists_info = [{'id':artist.id, 'name':artist.name} for artist in query_artists()]
   # Mock data
   # data=[{
   #   "id": 4,
@@ -416,14 +980,9 @@ def artists():
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
   search_term = request.form.get('search_term', '')
-  search = '%{}%'.format(search_term) # Same as SQL LIKE operator, '%' is 0,1, or more chars 
-  artists = Artist.query.filter(Artist.name.ilike(search)).all()
+  artists = query_artists(name=search_term).all()
 
-  data = []
-  now = datetime.now()
-  for artist in artists:
-    upcoming = sum(map(lambda s: s.start_time > now, artist.shows))
-    data.append({'id':artist.id, 'name':artist.name, 'num_upcoming_shows':upcoming})
+  data = [{'id':artist.id, 'name':artist.name, 'num_upcoming_shows':artist.num_upcoming_shows} for artist in artists]
   results = {
     'count':len(artists),
     'data':data
@@ -441,36 +1000,9 @@ def search_artists():
 
 @app.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
-  artist = Artist.query.get(artist_id)
-  now = datetime.now()
-  past_shows = []
-  upcoming_shows = []
-  for show in artist.shows:
-    show_info = {
-      'venue_id': show.venue_id, 'venue_name': show.venue.name,
-      'venue_image_link': show.venue.image_link, 'start_time': show.start_time
-    }
-    if show.start_time > now:
-      upcoming_shows.append(show_info)
-    else:
-      past_shows.append(show_info)
-  artist_info = {
-    'id': artist.id,
-    'name': artist.name,
-    'genres': [g.name for g in artist.genres],
-    'city': artist.city,
-    'state': artist.state,
-    'phone': artist.phone,
-    'website': artist.website,
-    'facebook_link': artist.facebook_link,
-    'seeking_venue': artist.seeking_venue,
-    'seeking_description': artist.seeking_description,
-    'image_link': artist.image_link,
-    'past_shows': past_shows,
-    'upcoming_shows': upcoming_shows,
-    'past_shows_count': len(past_shows),
-    'upcoming_shows_count': len(upcoming_shows)
-  }
+  artist_info = artist_profile(artist_id)
+  if artist_info is None:
+    abort(404)
   # Mock data
   # data1={
   #   "id": 4,
@@ -546,12 +1078,17 @@ def show_artist(artist_id):
   # data = list(filter(lambda d: d['id'] == artist_id, [data1, data2, data3]))[0]
   return render_template('pages/show_artist.html', artist=artist_info)
 
+@app.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  # Deletes an artist using an AJAX call on the show artist page
+  return delete_listing(Artist, artist_id)
+
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   form = ArtistForm()
-  artist = Artist.query.get(artist_id)
+  artist = Artist.listed().filter_by(id=artist_id).first_or_404()
   artist_info = {
     'id': artist.id,
     'name': artist.name,
@@ -587,31 +1124,26 @@ def edit_artist(artist_id):
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
-  form = ArtistForm(request.form, meta={'csrf':False})
+  if request.is_json:
+    return edit_from_json(ARTIST_RULES, Artist, artist_genres, artist_id)
+  form = without_csrf(ArtistForm)(request.form)
   error = False
   if form.validate():
     try:
-      # Get the existing artist.
-      artist = Artist.query.get(artist_id)
-
-      # Update the fields.
-      artist.name = form.name.data
-      artist.city = form.city.data
-      artist.state = form.state.data
-      artist.phone = form.phone.data
-      artist.genres = get_genres(form.genres.data)
-      artist.image_link = form.image_link.data
-      artist.facebook_link = form.facebook_link.data
-      artist.website = form.website.data
-      artist.seeking_venue = form.seeking_venue.data
-      artist.seeking_description = form.seeking_description.data
-      db.session.commit()
+      found = save_listing_changes(Artist, artist_genres, artist_id, {
+        'name': form.name.data, 'city': form.city.data, 'state': form.state.data,
+        'phone': form.phone.data, 'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data, 'website': form.website.data,
+        'seeking_venue': form.seeking_venue.data, 'seeking_description': form.seeking_description.data
+      }, form.genres.data)
     except Exception as e:
       error = True
       db.session.rollback()
       print("Error on Artist db model: {}".format(e))
     finally:
       db.session.close()
+    if not error and not found:
+      abort(404)
     if error:
       flash('An error occurred. Artist could not be edited.')
       return redirect(url_for('edit_artist_submission', artist_id=artist_id))
@@ -626,7 +1158,7 @@ def edit_artist_submission(artist_id):
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   form = VenueForm()
-  venue = Venue.query.get(venue_id)
+  venue = Venue.listed().filter_by(id=venue_id).first_or_404()
   venue_info = {
     'id': venue.id,
     'name': venue.name,
@@ -668,32 +1200,26 @@ def edit_venue(venue_id):
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
-  form = VenueForm(request.form, meta={'csrf':False})
+  if request.is_json:
+    return edit_from_json(VENUE_RULES, Venue, venue_genres, venue_id)
+  form = without_csrf(VenueForm)(request.form)
   error = False
   if form.validate():
     try:
-      # Get the existing artist.
-      venue = Venue.query.get(venue_id)
-
-      # Update the fields.
-      venue.name = form.name.data
-      venue.city = form.city.data
-      venue.state = form.state.data
-      venue.address = form.address.data
-      venue.phone = form.phone.data
-      venue.genres = get_genres(form.genres.data)
-      venue.image_link = form.image_link.data
-      venue.facebook_link = form.facebook_link.data
-      venue.website = form.website.data
-      venue.seeking_talent = form.seeking_talent.data
-      venue.seeking_description = form.seeking_description.data
-      db.session.commit()
+      found = save_listing_changes(Venue, venue_genres, venue_id, {
+        'name': form.name.data, 'city': form.city.data, 'state': form.state.data,
+        'address': form.address.data, 'phone': form.phone.data, 'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data, 'website': form.website.data,
+        'seeking_talent': form.seeking_talent.data, 'seeking_description': form.seeking_description.data
+      }, form.genres.data)
     except Exception as e:
       error = True
       db.session.rollback()
       print("Error on Venue db model: {}".format(e))
     finally:
       db.session.close()
+    if not error and not found:
+      abort(404)
     if error:
       flash('An error occurred. Venue could not be edited.')
       return redirect(url_for('edit_venue_submission', venue_id=venue_id))
@@ -715,7 +1241,9 @@ def create_artist_form():
 
 @app.route('/artists/create', methods=['POST'])
 def create_artist_submission():
-  form = ArtistForm(request.form, meta={'csrf':False})
+  if request.is_json:
+    return create_from_json(ARTIST_RULES, Artist)
+  form = without_csrf(ArtistForm)(request.form)
   error = False
   if form.validate():
     artist = {
@@ -728,6 +1256,8 @@ def create_artist_submission():
     try:
       artist_model = Artist(**artist)
       db.session.add(artist_model)
+      db.session.flush()
+      refresh_record_profiles(artist_model)
       db.session.commit()
     except Exception as e:
       error = True
@@ -751,14 +1281,7 @@ def create_artist_submission():
 
 @app.route('/shows')
 def shows():
-  shows = Show.query.all()
-  shows_info = []
-
-  for show in shows:
-    shows_info.append({
-      'venue_id':show.venue_id, 'venue_name':show.venue.name,
-      'artist_id':show.artist_id, 'artist_name':show.artist.name,
-      'artist_image_link':show.artist.image_link, 'start_time':show.start_time})
+  shows_info = [show._asdict() for show in query_shows()]
   # Mock data
   # data=[{
   #   "venue_id": 1,
@@ -798,6 +1321,42 @@ def shows():
   # }]
   return render_template('pages/shows.html', shows=shows_info)
 
+@app.route('/shows/search')
+def search_shows():
+  '''Shows in a date range, optionally in a state or a city, as HTML or, for
+  ?format=json or Accept: application/json, as {"shows": [...]}. Either is
+  streamed while the rows are read.'''
+  filters, errors = parse_show_search(request.args)
+  if errors:
+    if wants_json():
+      return jsonify({'success': False, 'errors': errors}), 400
+    for field, messages in errors.items():
+      for message in messages:
+        flash('Error in the {} field - {}'.format(field, message))
+    return redirect(url_for('search_shows'))
+
+  rows = (row._asdict() for row in query_shows(**filters))
+  if wants_json():
+    return Response(stream_with_context(stream_json_list('shows', rows)), mimetype='application/json')
+  return Response(stream_with_context(stream_template('pages/search_shows.html', shows=rows, filters=filters, states=STATES)))
+
+@app.route('/venues/<int:venue_id>/shows.ics')
+def venue_calendar(venue_id):
+  '''The venue's upcoming shows for the next year as an iCalendar feed.'''
+  venue = Venue.listed().with_entities(Venue.name).filter_by(id=venue_id).first_or_404()
+  start = datetime.now()
+  shows = query_shows(start, start + timedelta(days=SHOW_SEARCH_MAX_DAYS), venue_id=venue_id)
+  events = (ical.Event(
+    uid='show-{}@fyyur'.format(show.id),
+    start=show.start_time,
+    end=show.start_time + scheduling.SHOW_DURATION,
+    summary=show.artist_name,
+    location=', '.join(part for part in (show.venue_name, show.address, show.city, show.state) if part),
+    url=url_for('show_artist', artist_id=show.artist_id, _external=True)) for show in shows)
+  response = Response(stream_with_context(ical.calendar(venue.name, events)), mimetype='text/calendar')
+  response.headers['Content-Disposition'] = 'inline; filename=venue-{}.ics'.format(venue_id)
+  return response
+
 @app.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
@@ -806,38 +1365,34 @@ def create_shows():
 
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
-  form = ShowForm(request.form, meta={'csrf':False})
-  # Todo: check for existence of foreign keys
+  if request.is_json:
+    return create_from_json(SHOW_RULES, Show, check=check_new_show)
+  form = without_csrf(ShowForm)(request.form)
   if form.validate():
     error = False
     err_msg = 'An error occurred. Show could not be listed.'
     show = {
       'artist_id':form.artist_id.data, 'venue_id':form.venue_id.data, 'start_time':form.start_time.data
     }
+    conflicts = check_new_show(show)
+    db.session.close()
+    if conflicts:
+      for message in conflicts:
+        flash(message)
+      return render_template('forms/new_show.html', form=form)
     try:
       show_model = Show(**show)
       db.session.add(show_model)
+      db.session.flush()
+      refresh_record_profiles(show_model)
       db.session.commit()
-    # except IntegrityError as e:
-    #   print("Statement: ", e.statement)
-    #   print("Params: ", e.params)
-    #   print("Orig: ", e.orig)
-    #   err_msg = 'Integrity error!'
-    #   raise e
     except Exception as e:
-      # if isinstance(e, IntegrityError):
-      #   print("Integrity Error!")
-      #   print("Statement: ", e.statement)
-      #   print("Params: ", e.params)
-      #   print("Orig: -->{}<--".format(e.orig))
-      #   err_msg = 'Integrity error!'
-      #   if isinstance(e.orig, ForeignKeyViolation):
-      #     print("It's an FK violation!")
-      if e.orig and isinstance(e.orig, ForeignKeyViolation):
+      # Only an IntegrityError carries the driver's error in e.orig
+      orig = e.orig if isinstance(e, IntegrityError) else None
+      if isinstance(orig, ForeignKeyViolation):
         err_msg = 'Invalid submission. Show must use valid artist and venue ids.'
-      # psycopg2.errors.ForeignKeyViolation
-      # sqlalchemy.exc.IntegrityError
-      #print("Exception class:", e.__class__)
+      elif isinstance(orig, ExclusionViolation):
+        err_msg = SHOW_OVERLAP_MESSAGE
       error = True
       db.session.rollback()
       print("Error on Show db model: {}".format(e))
@@ -854,6 +1409,114 @@ def create_show_submission():
     flash_errors(form)
     return render_template('forms/new_show.html', form=form)
 
+@app.route('/shows/check', methods=['POST'])
+def check_shows():
+  '''Checks a batch of proposed shows, {"shows": [{"artist_id", "venue_id",
+  "start_time"}, ...]}, for unknown ids and double bookings, without
+  creating them. Shows are checked in order, each against the existing
+  shows and the earlier ones of the batch.'''
+  body = request.get_json(silent=True)
+  shows = body.get('shows') if isinstance(body, dict) else None
+  if not isinstance(shows, list):
+    return jsonify({'success': False, 'errors': {'shows': ['Expected a list of shows.']}}), 400
+
+  proposed, errors = [], {}
+  for index, show in enumerate(shows):
+    values, show_errors = validate_json(SHOW_RULES, show)
+    if show_errors:
+      errors[index] = show_errors
+    else:
+      proposed.append((values['artist_id'], values['venue_id'], values['start_time']))
+  if errors:
+    return jsonify({'success': False, 'errors': errors}), 400
+
+  try:
+    conflicts = show_conflicts(proposed)
+  finally:
+    db.session.close()
+  return jsonify({
+    'success': True,
+    'count': len(proposed),
+    'conflicts': [{'index': index, 'reason': reason, 'message': message} for index, reason, message in conflicts]
+  })
+
+#  Admin
+#  ----------------------------------------------------------------
+
+@app.route('/admin/jobs')
+def job_status():
+  '''Background job counts and throughput over the last hour, as HTML or
+  JSON, and the latest failures. Not found unless ADMIN_PAGES is set.'''
+  if not app.config.get('ADMIN_PAGES'):
+    abort(404)
+  stats = jobs.stats(db.session, Job)
+  failures = [{
+    'id': job.id, 'name': job.name, 'args': job.args, 'attempts': job.attempts,
+    'finished_at': job.finished_at, 'last_error': job.last_error
+  } for job in Job.query.filter(Job.status == jobs.FAILED).order_by(Job.finished_at.desc()).limit(20)]
+  if wants_json():
+    return jsonify(dict(stats, failures=failures))
+  return render_template('pages/jobs.html', stats=stats, failures=failures)
+
+#  JSON API
+#  ----------------------------------------------------------------
+# Read only and paginated, on the same queries as the pages above.
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+VENUE_LIST_FIELDS = ('id', 'name', 'city', 'state', 'image_link', 'num_upcoming_shows')
+ARTIST_LIST_FIELDS = ('id', 'name', 'city', 'state', 'image_link', 'num_upcoming_shows')
+PROFILE_SHOW_FIELDS = ('genres', 'past_shows', 'upcoming_shows', 'past_shows_count', 'upcoming_shows_count')
+SHOW_LIST_FIELDS = ('id', 'start_time', 'venue_id', 'venue_name', 'address', 'city', 'state',
+                    'venue_image_link', 'artist_id', 'artist_name', 'artist_image_link')
+
+def api_list(key, query, available):
+  page, per_page = api.page_args(request.args)
+  fields = api.field_args(request.args, available)
+  rows, has_next = api.paginate(query, page, per_page)
+  records = [api.select_fields(row._asdict(), fields) for row in rows]
+  return api.json_response(api.list_payload(key, records, page, per_page, has_next))
+
+def api_profile(profile, available):
+  if profile is None:
+    abort(404)
+  return api.json_response(api.select_fields(profile, api.field_args(request.args, available)))
+
+@api_v1.route('/venues')
+def api_venues():
+  state = request.args.get('state')
+  if state is not None and state not in STATE_SET:
+    abort(400, 'Not a valid state.')
+  return api_list('venues', query_venues(request.args.get('name'), state, request.args.get('city')), VENUE_LIST_FIELDS)
+
+@api_v1.route('/venues/<int:venue_id>')
+def api_venue(venue_id):
+  return api_profile(venue_profile(venue_id), VENUE_PROFILE_FIELDS + PROFILE_SHOW_FIELDS)
+
+@api_v1.route('/artists')
+def api_artists():
+  return api_list('artists', query_artists(request.args.get('name')), ARTIST_LIST_FIELDS)
+
+@api_v1.route('/artists/<int:artist_id>')
+def api_artist(artist_id):
+  return api_profile(artist_profile(artist_id), ARTIST_PROFILE_FIELDS + PROFILE_SHOW_FIELDS)
+
+@api_v1.route('/shows')
+def api_shows():
+  '''Shows in a date range as /shows/search takes it, a week from today
+  by default.'''
+  filters, errors = parse_show_search(request.args)
+  if errors:
+    return api.json_response({'success': False, 'errors': errors}, 400)
+  return api_list('shows', query_shows(**filters), SHOW_LIST_FIELDS)
+
+@api_v1.errorhandler(400)
+@api_v1.errorhandler(404)
+def api_error(error):
+  return api.json_response({'success': False, 'error': error.code, 'message': error.description}, error.code)
+
+app.register_blueprint(api_v1)
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
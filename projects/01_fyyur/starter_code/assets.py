@@ -0,0 +1,209 @@
+#----------------------------------------------------------------------------#
+# Static asset pipeline.
+#
+# `flask build-assets` bundles and minifies the css and js listed in BUNDLES,
+# copies every other static file, names each output after a hash of its
+# contents and writes static/dist/manifest.json mapping source paths to the
+# hashed ones, plus .gz and .br siblings for text assets.
+#
+# Templates link assets through asset_urls() and static_url(). Once a
+# manifest exists they point at static/dist, served precompressed with a
+# far-future immutable Cache-Control. Without a build they fall back to the
+# plain source files, so development needs no build step.
+#----------------------------------------------------------------------------#
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+try:
+  import rcssmin
+except ImportError:
+  rcssmin = None
+
+try:
+  import rjsmin
+except ImportError:
+  rjsmin = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Bundle name -> source files, relative to static/, in load order
+BUNDLES = {
+  'main.css': [
+    'css/bootstrap.min.css',
+    'css/layout.main.css',
+    'css/main.css',
+    'css/main.responsive.css',
+    'css/main.quickfix.css',
+  ],
+  # Loaded in <head>, before the page renders
+  'head.js': [
+    'js/libs/modernizr-2.8.2.min.js',
+    'js/libs/moment.min.js',
+  ],
+  # Deferred, runs after jQuery in the order the separate scripts ran
+  'main.js': [
+    'js/script.js',
+    'js/libs/bootstrap-3.1.1.min.js',
+    'js/plugins.js',
+  ],
+}
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.map', '.eot', '.ttf', '.otf')
+# Skip .gz/.br siblings that would save less than this
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def hashed_name(path, content):
+  '''css/main.css -> css/main.<first 12 hex chars of sha256>.css'''
+  base, ext = posixpath.splitext(path)
+  return '{}.{}{}'.format(base, hashlib.sha256(content).hexdigest()[:12], ext)
+
+
+def minify(path, text):
+  if path.endswith('.css'):
+    if rcssmin is not None:
+      return rcssmin.cssmin(text)
+    # Comments and whitespace only, enough for hand written css
+    text = re.sub(r'/\*(?!!).*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    return re.sub(r'\s*([{};:,>])\s*', r'\1', text).strip()
+  if path.endswith('.js') and rjsmin is not None and not path.endswith('.min.js'):
+    return rjsmin.jsmin(text)
+  return text
+
+
+def rewrite_css_urls(source_path, text, manifest):
+  '''Points url() references at the hashed copies, relative to static/dist.'''
+  source_dir = posixpath.dirname(source_path)
+
+  def replace(match):
+    url = match.group(2)
+    if re.match(r'^(?:[a-z]+:|/|#)', url):
+      return match.group(0)
+    path, sep, suffix = url, '', ''
+    split = re.search(r'[?#]', url)
+    if split:
+      path, sep, suffix = url[:split.start()], url[split.start()], url[split.start() + 1:]
+    target = posixpath.normpath(posixpath.join(source_dir, path))
+    if target not in manifest:
+      return match.group(0)
+    return 'url("{}{}{}")'.format(manifest[target], sep, suffix)
+
+  return CSS_URL.sub(replace, text)
+
+
+def write_output(relative_path, content):
+  path = os.path.join(DIST_DIR, relative_path)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'wb') as f:
+    f.write(content)
+
+  if relative_path.endswith(COMPRESSIBLE) and len(content) >= MIN_COMPRESS_SIZE:
+    # mtime=0 keeps the .gz bytes stable between builds
+    with open(path + '.gz', 'wb') as f:
+      f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+      with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(content, quality=11))
+
+
+def build():
+  '''Builds static/dist and returns the manifest.'''
+  shutil.rmtree(DIST_DIR, ignore_errors=True)
+  manifest = {}
+
+  bundled = {path for sources in BUNDLES.values() for path in sources}
+  for root, dirs, files in os.walk(STATIC_DIR):
+    dirs[:] = [d for d in dirs if os.path.join(root, d) != DIST_DIR]
+    for name in files:
+      path = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/')
+      if path in bundled or name.startswith('.'):
+        continue
+      with open(os.path.join(root, name), 'rb') as f:
+        content = f.read()
+      manifest[path] = hashed_name(path, content)
+      write_output(manifest[path], content)
+
+  # Bundles go last so their url() references can use the hashed files
+  for bundle, sources in BUNDLES.items():
+    parts = []
+    for source in sources:
+      with open(os.path.join(STATIC_DIR, source), encoding='utf-8') as f:
+        text = minify(source, f.read())
+      if bundle.endswith('.css'):
+        text = rewrite_css_urls(source, text, manifest)
+      parts.append(text)
+    # A js file may end without a semicolon
+    separator = '\n' if bundle.endswith('.css') else ';\n'
+    content = separator.join(parts).encode('utf-8')
+    manifest[bundle] = hashed_name(bundle, content)
+    write_output(manifest[bundle], content)
+
+  with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+    json.dump(manifest, f, indent=2, sort_keys=True)
+  return manifest
+
+
+def load_manifest():
+  try:
+    with open(MANIFEST_PATH, encoding='utf-8') as f:
+      return json.load(f)
+  except FileNotFoundError:
+    return None
+
+
+def init_app(app):
+  '''Registers static_url()/asset_urls() in Jinja and the route serving static/dist.'''
+  manifest = load_manifest()
+
+  def static_url(path):
+    if manifest and path in manifest:
+      return url_for('dist_static', filename=manifest[path])
+    return url_for('static', filename=path)
+
+  def asset_urls(bundle):
+    if manifest and bundle in manifest:
+      return [url_for('dist_static', filename=manifest[bundle])]
+    return [url_for('static', filename=path) for path in BUNDLES[bundle]]
+
+  def dist_static(filename):
+    # Hashed names never change content, so any encoding can be cached for good
+    encodings = request.accept_encodings
+    path = os.path.join(DIST_DIR, filename)
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+      if encodings[encoding] and os.path.isfile(path + suffix):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+        break
+    else:
+      response = send_from_directory(DIST_DIR, filename)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+  app.add_url_rule('/static/dist/<path:filename>', 'dist_static', dist_static)
+  app.jinja_env.globals.update(static_url=static_url, asset_urls=asset_urls)
+
+
+if __name__ == '__main__':
+  manifest = build()
+  print('built {} assets into {}'.format(len(manifest), DIST_DIR))
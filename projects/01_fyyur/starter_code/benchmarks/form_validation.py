@@ -0,0 +1,145 @@
+'''
+Validation cost of one submission for each of the Fyyur forms, three ways:
+
+    wtforms, inline     the form built and validated the way the routes did
+                        before validation.py, a choices list scanned per
+                        field and meta={'csrf': False} on every call
+    wtforms, shared     the forms.py form through without_csrf(), the path
+                        the HTML routes take now
+    json                validate_json() on the same values as a dict, the
+                        path JSON requests to the create routes take
+
+Both a valid submission and one with an invalid state, genre and phone are
+timed.
+
+    python benchmarks/form_validation.py --number 2000
+'''
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_wtf import FlaskForm
+from werkzeug.datastructures import MultiDict
+from wtforms import StringField, IntegerField, SelectField, SelectMultipleField, DateTimeField, BooleanField
+from wtforms.validators import DataRequired, Optional, URL, Regexp
+
+from forms import ArtistForm, ShowForm, VenueForm
+from validation import (
+    ARTIST_RULES, GENRES, PHONE_REGEX, SHOW_RULES, STATES, VENUE_RULES, validate_json, without_csrf
+)
+
+
+def inline_select(name, values, multiple=False):
+    field = SelectMultipleField if multiple else SelectField
+    return field(name, validators=[DataRequired()], choices=[(v, v) for v in values])
+
+
+def optional_url(name):
+    return StringField(name, validators=[Optional(), URL()])
+
+
+class InlineShowForm(FlaskForm):
+    artist_id = IntegerField('artist_id', validators=[DataRequired()])
+    venue_id = IntegerField('venue_id', validators=[DataRequired()])
+    start_time = DateTimeField('start_time', validators=[DataRequired()])
+
+
+class InlineVenueForm(FlaskForm):
+    name = StringField('name', validators=[DataRequired()])
+    city = StringField('city', validators=[DataRequired()])
+    state = inline_select('state', STATES)
+    address = StringField('address', validators=[DataRequired()])
+    phone = StringField('phone', validators=[Optional(), Regexp(PHONE_REGEX.pattern)])
+    genres = inline_select('genres', GENRES, multiple=True)
+    website = optional_url('website')
+    image_link = optional_url('image_link')
+    facebook_link = optional_url('facebook_link')
+    seeking_talent = BooleanField('seeking_talent', default=True)
+    seeking_description = StringField('seeking_description')
+
+
+class InlineArtistForm(FlaskForm):
+    name = StringField('name', validators=[DataRequired()])
+    city = StringField('city', validators=[DataRequired()])
+    state = inline_select('state', STATES)
+    phone = StringField('phone', validators=[Optional(), Regexp(PHONE_REGEX.pattern)])
+    genres = inline_select('genres', GENRES, multiple=True)
+    image_link = optional_url('image_link')
+    website = optional_url('website')
+    facebook_link = optional_url('facebook_link')
+    seeking_venue = BooleanField('seeking_venue', default=True)
+    seeking_description = StringField('seeking_description')
+
+
+VENUE = {
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'WY',
+    'address': '1015 Folsom Street', 'phone': '415-555-0134',
+    'genres': ['Jazz', 'Reggae', 'Soul', 'Other'],
+    'website': 'https://www.themusicalhop.com',
+    'image_link': 'https://images.unsplash.com/photo-1543900694-133f37abaaa5',
+    'facebook_link': 'https://www.facebook.com/TheMusicalHop',
+    'seeking_talent': True,
+    'seeking_description': 'We are on the lookout for a local artist to play every two weeks.',
+}
+ARTIST = dict(VENUE, name='Guns N Petals', seeking_venue=True)
+del ARTIST['address'], ARTIST['seeking_talent']
+SHOW = {'artist_id': 4, 'venue_id': 1, 'start_time': '2035-04-01 20:00:00'}
+
+INVALID = {'state': 'XX', 'genres': ['Jazz', 'Polka'], 'phone': '123-4567'}
+
+CASES = (
+    ('show', InlineShowForm, ShowForm, SHOW_RULES, SHOW),
+    ('venue', InlineVenueForm, VenueForm, VENUE_RULES, VENUE),
+    ('artist', InlineArtistForm, ArtistForm, ARTIST_RULES, ARTIST),
+)
+
+
+def formdata(values):
+    data = MultiDict()
+    for name, value in values.items():
+        if value is True:
+            data.add(name, 'y')
+        elif isinstance(value, list):
+            for item in value:
+                data.add(name, item)
+        else:
+            data.add(name, str(value))
+    return data
+
+
+def best(function, number, repeat):
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with app.test_request_context():
+        print('{:8} {:8} {:>16} {:>16} {:>10}'.format('form', 'input', 'wtforms, inline', 'wtforms, shared', 'json'))
+        for name, inline_form, shared_form, rules, values in CASES:
+            for label, case in (('valid', values), ('invalid', dict(values, **INVALID) if name != 'show' else dict(values, artist_id='x'))):
+                data = formdata(case)
+                shared = without_csrf(shared_form)
+                expected = label == 'valid'
+                assert inline_form(data, meta={'csrf': False}).validate() == expected
+                assert shared(data).validate() == expected
+                assert (not validate_json(rules, case)[1]) == expected
+
+                timings = (
+                    best(lambda: inline_form(data, meta={'csrf': False}).validate(), args.number, args.repeat),
+                    best(lambda: shared(data).validate(), args.number, args.repeat),
+                    best(lambda: validate_json(rules, case), args.number, args.repeat),
+                )
+                print('{:8} {:8} {:>13.1f} us {:>13.1f} us {:>7.1f} us'.format(name, label, *(t * 1e6 for t in timings)))
+
+
+if __name__ == '__main__':
+    main()
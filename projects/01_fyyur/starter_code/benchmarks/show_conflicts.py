@@ -0,0 +1,118 @@
+'''
+Conflict checks for batches of proposed shows against 100k existing ones,
+spread over 1000 venues and 5000 artists across five years.
+
+    index build         ShowSchedule over all existing shows
+    in memory           the per-venue and per-artist IntervalIndex lookups
+                        check_shows() runs for each proposal
+    linear scan         the same check comparing against every existing
+                        show, timed on a sample and scaled to the batch
+    check_shows         end to end on a seeded sqlite file: the id and
+                        window queries, index build and lookups
+
+    python benchmarks/show_conflicts.py --shows 100000 --batch 1000 --batch 10000
+'''
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduling
+
+VENUES = 1000
+ARTISTS = 5000
+EPOCH = datetime(2021, 1, 1)
+SPAN_HOURS = 5 * 365 * 24
+
+
+def random_shows(rng, count):
+  return [
+    scheduling.ProposedShow(rng.randint(1, ARTISTS), rng.randint(1, VENUES), EPOCH + timedelta(hours=rng.randrange(SPAN_HOURS)))
+    for _ in range(count)]
+
+
+def in_memory(schedule, proposed):
+  conflicts = []
+  for index, show in enumerate(proposed):
+    found = schedule.conflicts(index, show)
+    if not found:
+      schedule.add(show)
+    conflicts.extend(found)
+  return conflicts
+
+
+def linear_scan(existing, proposed):
+  duration = scheduling.SHOW_DURATION
+  conflicts = 0
+  for show in proposed:
+    for other in existing:
+      if (other.venue_id == show.venue_id or other.artist_id == show.artist_id) and \
+          other.start_time < show.start_time + duration and show.start_time < other.start_time + duration:
+        conflicts += 1
+  return conflicts
+
+
+def timed(function, *args):
+  started = time.perf_counter()
+  result = function(*args)
+  return time.perf_counter() - started, result
+
+
+def seed(database, existing):
+  import app
+  app.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database
+  with app.app.app_context():
+    app.db.create_all()
+    app.db.session.execute(app.Venue.__table__.insert(), [
+      {'id': i, 'name': 'venue {}'.format(i), 'city': 'city', 'state': 'CA', 'address': 'address'}
+      for i in range(1, VENUES + 1)])
+    app.db.session.execute(app.Artist.__table__.insert(), [
+      {'id': i, 'name': 'artist {}'.format(i), 'city': 'city', 'state': 'CA'} for i in range(1, ARTISTS + 1)])
+    app.db.session.execute(app.Show.__table__.insert(), [show._asdict() for show in existing])
+    app.db.session.commit()
+  return app
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--shows', type=int, default=100000)
+  parser.add_argument('--batch', type=int, action='append', help='proposals per batch, repeatable')
+  parser.add_argument('--scan-sample', type=int, default=50)
+  parser.add_argument('--no-database', action='store_true', help='skip the sqlite end to end run')
+  args = parser.parse_args()
+  batches = args.batch or [1, 1000, 10000]
+
+  rng = random.Random(0)
+  existing = random_shows(rng, args.shows)
+  build_time, _ = timed(scheduling.ShowSchedule, existing)
+  print('{} existing shows, index build {:.0f} ms'.format(args.shows, build_time * 1e3))
+
+  app = None
+  with tempfile.TemporaryDirectory() as directory:
+    if not args.no_database:
+      app = seed(os.path.join(directory, 'bench.db'), existing)
+
+    print('{:>7} {:>14} {:>14} {:>14} {:>10}'.format('batch', 'in memory', 'linear scan', 'check_shows', 'conflicts'))
+    for size in batches:
+      proposed = random_shows(rng, size)
+      memory_time, conflicts = timed(in_memory, scheduling.ShowSchedule(existing), proposed)
+      sample = proposed[:args.scan_sample]
+      scan_time, _ = timed(linear_scan, existing, sample)
+      scan_time = scan_time / len(sample) * size
+
+      end_to_end = ''
+      if app is not None:
+        with app.app.app_context():
+          db_time, db_conflicts = timed(scheduling.check_shows, app.db.session, proposed, app.Artist, app.Venue, app.Show)
+          assert len(db_conflicts) == len(conflicts)
+        end_to_end = '{:11.1f} ms'.format(db_time * 1e3)
+      print('{:>7} {:11.1f} ms {:11.0f} ms {:>14} {:>10}'.format(size, memory_time * 1e3, scan_time * 1e3, end_to_end, len(conflicts)))
+
+
+if __name__ == '__main__':
+  main()
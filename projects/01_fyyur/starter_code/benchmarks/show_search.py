@@ -0,0 +1,144 @@
+'''
+Latency of GET /shows/search under load from several worker processes on
+a seeded sqlite file: 100k shows over two years at 1000 venues in 50
+cities, by 5000 artists.
+
+Each request asks for the shows of one weekend in a city, a state or the
+whole country, as JSON or, for a share of them, as HTML. The run is
+repeated with the show.start_time and venue (state, city) indexes dropped.
+
+    python benchmarks/show_search.py --workers 4 --seconds 5
+'''
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VENUES = 1000
+ARTISTS = 5000
+STATES = ('CA', 'NY', 'TX', 'IL', 'WA', 'MA', 'CO', 'GA', 'OR', 'TN')
+CITIES = [('{} city {}'.format(state, i), state) for state in STATES for i in range(5)]
+EPOCH = datetime(2021, 1, 1)
+SPAN_DAYS = 2 * 365
+
+
+def load_app(database):
+  import app
+  app.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database
+  return app
+
+
+def seed(database, shows):
+  app = load_app(database)
+  rng = random.Random(0)
+  with app.app.app_context():
+    app.db.create_all()
+    app.db.session.execute(app.Venue.__table__.insert(), [
+      {'id': i, 'name': 'venue {}'.format(i), 'city': CITIES[i % len(CITIES)][0],
+       'state': CITIES[i % len(CITIES)][1], 'address': '{} Main Street'.format(i)}
+      for i in range(1, VENUES + 1)])
+    app.db.session.execute(app.Artist.__table__.insert(), [
+      {'id': i, 'name': 'artist {}'.format(i), 'city': 'city', 'state': 'CA'} for i in range(1, ARTISTS + 1)])
+    app.db.session.execute(app.Show.__table__.insert(), [
+      {'artist_id': rng.randint(1, ARTISTS), 'venue_id': rng.randint(1, VENUES),
+       'start_time': EPOCH + timedelta(minutes=rng.randrange(SPAN_DAYS * 24 * 60))}
+      for _ in range(shows)])
+    app.db.session.commit()
+    # Planner statistics, which Postgres keeps up to date on its own
+    app.db.session.execute('ANALYZE')
+
+
+def drop_indexes(database):
+  app = load_app(database)
+  with app.app.app_context():
+    app.db.session.execute('DROP INDEX ix_show_start_time')
+    app.db.session.execute('DROP INDEX ix_venue_state_city')
+    app.db.session.execute('ANALYZE')
+    app.db.session.commit()
+
+
+def weekend_query(rng):
+  '''One weekend in a random city for 60% of queries, a random state for
+  30% and the whole country for the rest.'''
+  saturday = EPOCH + timedelta(days=rng.randrange(SPAN_DAYS // 7) * 7 + 1)
+  query = {'from': saturday.date().isoformat(), 'to': (saturday + timedelta(days=2)).date().isoformat()}
+  city, state = rng.choice(CITIES)
+  where = rng.random()
+  if where < 0.9:
+    query['state'] = state
+  if where < 0.6:
+    query['city'] = city
+  return query
+
+
+def worker(database, seconds, html_ratio, results):
+  app = load_app(database)
+  client = app.app.test_client()
+  rng = random.Random(os.getpid())
+  latencies, rows = [], 0
+
+  deadline = time.perf_counter() + seconds
+  while time.perf_counter() < deadline:
+    query = weekend_query(rng)
+    html = rng.random() < html_ratio
+    if not html:
+      query['format'] = 'json'
+    started = time.perf_counter()
+    response = client.get('/shows/search', query_string=query)
+    body = response.get_data()
+    latencies.append(time.perf_counter() - started)
+    assert response.status_code == 200
+    rows += body.count(b'tile-show') if html else body.count(b'"id"')
+  results.put((latencies, rows))
+
+
+def percentile(samples, q):
+  samples = sorted(samples)
+  return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def run(label, database, args):
+  results = multiprocessing.Queue()
+  workers = [multiprocessing.Process(target=worker, args=(database, args.seconds, args.html_ratio, results))
+             for _ in range(args.workers)]
+  for process in workers:
+    process.start()
+  latencies, rows = [], 0
+  for _ in workers:
+    worker_latencies, worker_rows = results.get()
+    latencies += worker_latencies
+    rows += worker_rows
+  for process in workers:
+    process.join()
+
+  print('{}:'.format(label))
+  print('  {:7.0f} requests/s  p50 {:6.1f} ms  p99 {:6.1f} ms  {:.1f} shows per response'.format(
+    len(latencies) / args.seconds, percentile(latencies, 0.5) * 1e3, percentile(latencies, 0.99) * 1e3,
+    rows / len(latencies)))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--workers', type=int, default=4)
+  parser.add_argument('--seconds', type=float, default=5)
+  parser.add_argument('--shows', type=int, default=100000)
+  parser.add_argument('--html-ratio', type=float, default=0.2)
+  args = parser.parse_args()
+
+  print('{} workers, {} shows, {:.0%} html'.format(args.workers, args.shows, args.html_ratio))
+  with tempfile.TemporaryDirectory() as directory:
+    database = os.path.join(directory, 'bench.db')
+    seed(database, args.shows)
+    run('with indexes', database, args)
+    drop_indexes(database)
+    run('without indexes', database, args)
+
+
+if __name__ == '__main__':
+  main()
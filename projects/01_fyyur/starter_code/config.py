@@ -13,3 +13,21 @@ DEBUG = True
 SQLALCHEMY_DATABASE_URI = 'postgresql://john@localhost:5432/fyurrdb'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+
+# Hide deleted venues and artists instead of deleting them. The daily purge-deleted
+# job, or `flask purge-deleted`, deletes them once they are older than
+# SOFT_DELETE_RETENTION_DAYS.
+SOFT_DELETE = False
+SOFT_DELETE_RETENTION_DAYS = 30
+
+# Finished background jobs are kept this long for the /admin/jobs page
+JOB_RETENTION_DAYS = 7
+
+# Serve /admin/jobs, which shows job arguments and tracebacks. It has no login,
+# so only turn it on where the site is not public.
+ADMIN_PAGES = False
+
+# Rendered by `flask warmup` and the gunicorn hooks after a deploy, followed by
+# the WARMUP_PROFILES venues and artists with the most upcoming shows
+WARMUP_PAGES = ('/', '/venues', '/artists', '/shows', '/shows/search', '/api/v1/venues', '/api/v1/artists')
+WARMUP_PROFILES = 10
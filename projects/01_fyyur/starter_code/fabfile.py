@@ -38,6 +38,13 @@ def heroku():
     local("git push heroku master")
 
 
+def warmup():
+    # The web dynos warm themselves through gunicorn.conf.py, this reads
+    # the most visited pages into the database's buffers once more after
+    # the release
+    local("heroku run flask warmup")
+
+
 def heroku_test():
     local(
         "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
@@ -49,6 +56,7 @@ def deploy():
     test()
     commit()
     heroku()
+    warmup()
     heroku_test()
 
 # rollback
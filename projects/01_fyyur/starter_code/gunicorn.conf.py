@@ -0,0 +1,36 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# Loads the app once in the master and warms it there before forking, so
+# every worker starts with compiled templates and filled caches and the
+# database has the most visited pages in its buffers. Each worker then
+# opens its own pool connections before it takes a request.
+import os
+import time
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+# Heroku sets WEB_CONCURRENCY from the dyno size
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = True
+
+
+def when_ready(server):
+  import app
+  with app.app.app_context():
+    report = app.warm_app()
+    # Workers must not share the master's connections
+    app.db.engine.dispose()
+  for line in app.warmup.format_report(report):
+    server.log.info(line)
+
+
+def post_fork(server, worker):
+  import app
+  started = time.perf_counter()
+  with app.app.app_context():
+    app.db.engine.dispose()
+    count = app.warmup.open_connections(app.db.engine)
+    # Nothing to render with WARMUP_PAGES empty
+    pages = app.warmup.render_pages(app.app, app.app.config['WARMUP_PAGES'][:1])
+  first = ', first response {:.1f} ms warm'.format(pages[0].warm * 1e3) if pages else ''
+  server.log.info('Worker %s opened %s connections%s, ready after %.0f ms',
+                  worker.pid, count, first, (time.perf_counter() - started) * 1e3)
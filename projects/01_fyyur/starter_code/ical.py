@@ -0,0 +1,62 @@
+#----------------------------------------------------------------------------#
+# iCalendar (RFC 5545) output.
+#
+# Just what a read-only feed of shows needs: a VCALENDAR of VEVENTs, written
+# line by line so a response can stream it.
+#----------------------------------------------------------------------------#
+from collections import namedtuple
+from datetime import datetime, timezone
+
+Event = namedtuple('Event', ['uid', 'start', 'end', 'summary', 'location', 'url'])
+
+# Content lines are folded at 75 octets
+MAX_LINE = 75
+
+
+def escape(text):
+  return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def fold(line):
+  '''Splits a content line into 75 octet pieces, continuations start with a space.'''
+  encoded = line.encode('utf-8')
+  if len(encoded) <= MAX_LINE:
+    return line + '\r\n'
+  pieces, limit = [], MAX_LINE
+  while encoded:
+    cut = min(limit, len(encoded))
+    # Never split a multi-byte character
+    while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+      cut -= 1
+    pieces.append(encoded[:cut].decode('utf-8'))
+    encoded = encoded[cut:]
+    limit = MAX_LINE - 1
+  return '\r\n '.join(pieces) + '\r\n'
+
+
+def format_time(value):
+  '''Floating local time, shows are stored without a timezone.'''
+  return value.strftime('%Y%m%dT%H%M%S')
+
+
+def calendar(name, events):
+  '''Yields the lines of a VCALENDAR holding events, an iterable of Event.'''
+  stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+  yield fold('BEGIN:VCALENDAR')
+  yield fold('VERSION:2.0')
+  yield fold('PRODID:-//Fyyur//Shows//EN')
+  yield fold('CALSCALE:GREGORIAN')
+  yield fold('X-WR-CALNAME:' + escape(name))
+  for event in events:
+    yield fold('BEGIN:VEVENT')
+    yield fold('UID:' + event.uid)
+    yield fold('DTSTAMP:' + stamp)
+    yield fold('DTSTART:' + format_time(event.start))
+    yield fold('DTEND:' + format_time(event.end))
+    yield fold('SUMMARY:' + escape(event.summary))
+    if event.location:
+      yield fold('LOCATION:' + escape(event.location))
+    if event.url:
+      yield fold('URL:' + event.url)
+    yield fold('END:VEVENT')
+  yield fold('END:VCALENDAR')
@@ -0,0 +1,250 @@
+#----------------------------------------------------------------------------#
+# Background jobs.
+#
+# A queue kept in the job table and worked by `flask worker` processes, so
+# no broker is needed and a job enqueued in a request commits, or rolls
+# back, with it. Tasks are registered with @task, each with its retry
+# budget, how many of its jobs may run at once and, for periodic tasks,
+# how often it runs. Like scheduling.py this takes the session and the Job
+# model as arguments instead of importing app.
+#----------------------------------------------------------------------------#
+import os
+import signal
+import socket
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import false, func
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+# Retries wait 30s, 1m, 2m, ... up to an hour
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+# A job still running after its lease is taken to have lost its worker
+DEFAULT_LEASE = timedelta(minutes=10)
+# How often a worker requeues expired jobs and schedules periodic ones
+MAINTENANCE_INTERVAL = 30
+MAX_ERROR_LENGTH = 4000
+# Key of the Postgres advisory lock taken by lock_queue()
+CLAIM_LOCK = 0x66797975
+
+Task = namedtuple('Task', ['name', 'function', 'max_attempts', 'limit', 'every', 'lease'])
+Claim = namedtuple('Claim', ['id', 'name', 'args', 'attempts', 'run_at'])
+
+TASKS = {}
+
+
+def task(name, max_attempts=3, limit=None, every=None, lease=DEFAULT_LEASE):
+  '''Registers a function as the task name. Its jobs are tried up to
+  max_attempts times, at most limit of them run at once across workers,
+  and with every, a timedelta, one is scheduled that often.'''
+  def register(function):
+    TASKS[name] = Task(name, function, max_attempts, limit, every, lease)
+    return function
+  return register
+
+
+def enqueue(session, job_model, name, args=None, run_at=None):
+  '''Adds a job for task name to the session, queued once the caller
+  commits. args are the task's keyword arguments and must be JSON.'''
+  if name not in TASKS:
+    raise KeyError('No task named {}'.format(name))
+  now = datetime.now()
+  job = job_model(name=name, args=args or {}, status=QUEUED, attempts=0, run_at=run_at or now, created_at=now)
+  session.add(job)
+  return job
+
+
+def retry_delay(attempts):
+  return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def lock_queue(session, job_model):
+  '''Serializes claims and scheduling until the transaction ends, which
+  keeps concurrency limits exact and periodic jobs single with several
+  workers.'''
+  dialect = session.bind.dialect.name
+  if dialect == 'postgresql':
+    session.execute('SELECT pg_advisory_xact_lock(:key)', {'key': CLAIM_LOCK})
+  elif dialect == 'sqlite':
+    # Any write takes the database lock, even one matching no rows
+    session.execute(job_model.__table__.update().where(false()).values(id=job_model.id))
+
+
+def claim(session, job_model, worker):
+  '''Marks the next due job of a task under its limit as running in worker
+  and commits. Returns a Claim, or None when no job is due.'''
+  lock_queue(session, job_model)
+  running = dict(session.query(job_model.name, func.count(job_model.id)).filter(
+    job_model.status == RUNNING).group_by(job_model.name))
+  full = [name for name, count in running.items()
+          if name in TASKS and TASKS[name].limit is not None and count >= TASKS[name].limit]
+  now = datetime.now()
+  query = session.query(job_model).filter(job_model.status == QUEUED, job_model.run_at <= now)
+  if full:
+    query = query.filter(~job_model.name.in_(full))
+  job = query.with_entities(job_model.id, job_model.name, job_model.args, job_model.attempts, job_model.run_at).order_by(
+    job_model.run_at, job_model.id).first()
+  claimed = None
+  # Only while still queued, should another worker have taken it meanwhile
+  if job is not None and session.query(job_model).filter(job_model.id == job.id, job_model.status == QUEUED).update(
+      {'status': RUNNING, 'started_at': now, 'worker': worker, 'attempts': job.attempts + 1}, synchronize_session=False):
+    claimed = Claim(job.id, job.name, job.args, job.attempts + 1, job.run_at)
+  session.commit()
+  return claimed
+
+
+def finish(session, job_model, claimed, worker, error=None):
+  '''Records how a claimed job ended: done, queued again for a retry or
+  failed for good. Skipped if the job's lease expired and it was requeued.'''
+  now = datetime.now()
+  values = {'finished_at': now, 'status': DONE, 'last_error': None}
+  if error is not None:
+    task = TASKS.get(claimed.name)
+    retry = task is not None and claimed.attempts < task.max_attempts
+    values.update(status=QUEUED if retry else FAILED, last_error=error[-MAX_ERROR_LENGTH:])
+    if retry:
+      values.update(run_at=now + retry_delay(claimed.attempts), worker=None)
+  session.query(job_model).filter(
+    job_model.id == claimed.id, job_model.status == RUNNING, job_model.worker == worker
+  ).update(values, synchronize_session=False)
+
+  # The next run of a periodic task, counted from when this one was due so
+  # the period does not drift by the run time
+  task = TASKS.get(claimed.name)
+  if values['status'] != QUEUED and task is not None and task.every is not None:
+    lock_queue(session, job_model)
+    enqueue(session, job_model, task.name, claimed.args, max(claimed.run_at + task.every, now))
+  session.commit()
+
+
+def requeue_expired(session, job_model):
+  '''Returns jobs whose worker stopped answering to the queue, counting the
+  run as a failed attempt.'''
+  now = datetime.now()
+  expired = 0
+  for job in session.query(job_model).filter(job_model.status == RUNNING).all():
+    lease = TASKS[job.name].lease if job.name in TASKS else DEFAULT_LEASE
+    if job.started_at + lease < now:
+      finish(session, job_model, Claim(job.id, job.name, job.args, job.attempts, job.run_at), job.worker,
+             'Lease of {} expired on worker {}'.format(lease, job.worker))
+      expired += 1
+  session.commit()
+  return expired
+
+
+def schedule_periodic(session, job_model):
+  '''Queues a job for each periodic task with none queued or running, the
+  first time a worker starts or after one was deleted.'''
+  lock_queue(session, job_model)
+  pending = {name for name, in session.query(job_model.name).filter(
+    job_model.status.in_((QUEUED, RUNNING))).distinct()}
+  for task in TASKS.values():
+    if task.every is not None and task.name not in pending:
+      enqueue(session, job_model, task.name)
+  session.commit()
+
+
+class Worker(object):
+  '''Claims and runs jobs one at a time until stopped, or with burst
+  until no job is due. SIGTERM and SIGINT stop it after the current job.'''
+
+  def __init__(self, session, job_model, poll_interval=1.0, burst=False, log=print):
+    self.session = session
+    self.job_model = job_model
+    self.poll_interval = poll_interval
+    self.burst = burst
+    self.log = log
+    self.name = '{}:{}'.format(socket.gethostname(), os.getpid())
+    self.stopping = False
+
+  def stop(self, *args):
+    self.stopping = True
+
+  def run(self):
+    signal.signal(signal.SIGTERM, self.stop)
+    signal.signal(signal.SIGINT, self.stop)
+    next_maintenance = 0
+    processed = 0
+    while not self.stopping:
+      if time.monotonic() >= next_maintenance:
+        requeue_expired(self.session, self.job_model)
+        schedule_periodic(self.session, self.job_model)
+        next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+      claimed = claim(self.session, self.job_model, self.name)
+      if claimed is None:
+        if self.burst:
+          break
+        time.sleep(self.poll_interval)
+        continue
+      self.execute(claimed)
+      processed += 1
+    return processed
+
+  def execute(self, claimed):
+    started = time.perf_counter()
+    error = None
+    try:
+      if claimed.name not in TASKS:
+        raise LookupError('No task named {}'.format(claimed.name))
+      TASKS[claimed.name].function(**claimed.args)
+      self.session.commit()
+    except Exception:
+      self.session.rollback()
+      error = traceback.format_exc()
+    finish(self.session, self.job_model, claimed, self.name, error)
+    self.log('{} job {} {} in {:.0f} ms'.format(
+      claimed.name, claimed.id, 'failed' if error else 'done', (time.perf_counter() - started) * 1e3))
+
+
+def percentile(samples, q):
+  samples = sorted(samples)
+  return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else None
+
+
+def stats(session, job_model, window=timedelta(hours=1)):
+  '''Queue state and throughput over the last window: job counts by task
+  and status, and per task the jobs finished per minute, run time and the
+  lag between when jobs were due and when they started.'''
+  now = datetime.now()
+  since = now - window
+  counts = {}
+  for name, status, count in session.query(job_model.name, job_model.status, func.count(job_model.id)).group_by(
+      job_model.name, job_model.status):
+    counts.setdefault(name, dict.fromkeys(STATUSES, 0))[status] = count
+
+  # Jobs waiting on a retry keep the times of their failed attempt, so only
+  # those done or failed for good are counted
+  finished = {}
+  for name, status, run_at, started_at, finished_at in session.query(
+      job_model.name, job_model.status, job_model.run_at, job_model.started_at, job_model.finished_at).filter(
+      job_model.finished_at >= since, job_model.status.in_((DONE, FAILED))):
+    finished.setdefault(name, []).append((status, (finished_at - started_at).total_seconds(),
+                                          (started_at - run_at).total_seconds()))
+  oldest_due = dict(session.query(job_model.name, func.min(job_model.run_at)).filter(
+    job_model.status == QUEUED, job_model.run_at <= now).group_by(job_model.name))
+
+  tasks = []
+  for name in sorted(set(counts) | set(finished) | set(TASKS)):
+    runs = finished.get(name, [])
+    durations = [duration for _, duration, _ in runs]
+    lags = [lag for _, _, lag in runs]
+    tasks.append({
+      'name': name,
+      'counts': counts.get(name, dict.fromkeys(STATUSES, 0)),
+      'limit': TASKS[name].limit if name in TASKS else None,
+      'every': TASKS[name].every.total_seconds() if name in TASKS and TASKS[name].every else None,
+      'finished': len(runs),
+      'failed': sum(1 for status, _, _ in runs if status == FAILED),
+      'per_minute': len(runs) / (window.total_seconds() / 60),
+      'duration_p50': percentile(durations, 0.5),
+      'duration_p95': percentile(durations, 0.95),
+      'lag_p50': percentile(lags, 0.5),
+      'lag_p95': percentile(lags, 0.95),
+      'backlog_age': (now - oldest_due[name]).total_seconds() if name in oldest_due else 0,
+    })
+  return {'window': window.total_seconds(), 'tasks': tasks}
@@ -0,0 +1,51 @@
+"""Cascade venue and artist deletes to their shows and genre rows in the database,
+with indexes on show.artist_id and show.venue_id so the cascade does not scan show.
+Added venue.deleted_at and artist.deleted_at for soft deletes.
+
+Revision ID: c4f1a6d2e8b9
+Revises: 362e8e427f43
+Create Date: 2021-03-08 10:14:22.518734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f1a6d2e8b9'
+down_revision = '362e8e427f43'
+branch_labels = None
+depends_on = None
+
+# (table, column, referenced table), constraints use the postgres default names
+FOREIGN_KEYS = [
+    ('show', 'artist_id', 'artist'),
+    ('show', 'venue_id', 'venue'),
+    ('artist_genres', 'artist_id', 'artist'),
+    ('venue_genres', 'venue_id', 'venue'),
+]
+
+
+def replace_foreign_keys(ondelete):
+    for table, column, referenced in FOREIGN_KEYS:
+        name = '{}_{}_fkey'.format(table, column)
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referenced, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+    op.create_index(op.f('ix_show_artist_id'), 'show', ['artist_id'], unique=False)
+    op.create_index(op.f('ix_show_venue_id'), 'show', ['venue_id'], unique=False)
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        op.create_index(op.f('ix_{}_deleted_at'.format(table)), table, ['deleted_at'], unique=False)
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        op.drop_index(op.f('ix_{}_deleted_at'.format(table)), table_name=table)
+        op.drop_column(table, 'deleted_at')
+    op.drop_index(op.f('ix_show_venue_id'), table_name='show')
+    op.drop_index(op.f('ix_show_artist_id'), table_name='show')
+    replace_foreign_keys(None)
@@ -0,0 +1,34 @@
+"""Exclusion constraints against double booking a venue or an artist.
+A show occupies [start_time, start_time + 3 hours), scheduling.SHOW_DURATION.
+Needs the btree_gist extension. Fails if existing shows already overlap,
+POST /shows/check lists them.
+
+Revision ID: e2b7c9a4f013
+Revises: c4f1a6d2e8b9
+Create Date: 2021-03-10 16:42:05.203117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c9a4f013'
+down_revision = 'c4f1a6d2e8b9'
+branch_labels = None
+depends_on = None
+
+SHOW_INTERVAL = "tsrange(start_time, start_time + interval '3 hours')"
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for column in ('venue_id', 'artist_id'):
+        op.execute(
+            'ALTER TABLE show ADD CONSTRAINT show_{0}_no_overlap '
+            'EXCLUDE USING gist ({0} WITH =, {1} WITH &&)'.format(column, SHOW_INTERVAL))
+
+
+def downgrade():
+    for column in ('artist_id', 'venue_id'):
+        op.drop_constraint('show_{}_no_overlap'.format(column), 'show')
@@ -0,0 +1,154 @@
+#----------------------------------------------------------------------------#
+# Show scheduling.
+#
+# A show books its venue and its artist from start_time for SHOW_DURATION.
+# check_shows() takes a batch of proposed shows and reports, for each one,
+# an unknown venue or artist id and any overlap with an existing show or an
+# earlier show of the same batch.
+#
+# On Postgres the show table also carries exclusion constraints over the
+# same intervals (migration e2b7c9a4f013), so two requests racing past the
+# check still cannot double book. The check itself runs in memory against
+# per-venue and per-artist IntervalIndexes over the existing shows in the
+# batch's time window, which works on any database and answers thousands
+# of proposals with one query per table.
+#----------------------------------------------------------------------------#
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+# Matches the interval in the exclusion constraints
+SHOW_DURATION = timedelta(hours=3)
+
+Conflict = namedtuple('Conflict', ['index', 'reason', 'show'])
+Conflict.__doc__ = '''A problem with the proposed show at position index of the batch.
+
+reason is one of REASONS. show is the existing or earlier proposed show,
+a ProposedShow, that it overlaps, or None for an unknown id.'''
+
+ProposedShow = namedtuple('ProposedShow', ['artist_id', 'venue_id', 'start_time'])
+
+REASONS = {
+  'unknown_artist': 'There is no artist with id {artist_id}.',
+  'unknown_venue': 'There is no venue with id {venue_id}.',
+  'artist_booked': 'The artist already has a show at {start_time}.',
+  'venue_booked': 'The venue already has a show at {start_time}.',
+}
+
+
+class IntervalIndex(object):
+  '''Half-open [start, end) intervals, each carrying a value, sorted by start.
+
+  Any interval overlapping [start, end) starts after start - longest, where
+  longest is the longest interval added, and before end. overlapping() finds
+  that range by bisection, so a lookup costs O(log n) plus the intervals in
+  the range, which for shows of one fixed length is at most a few.
+  '''
+  def __init__(self, intervals=()):
+    self._items = sorted(intervals, key=lambda item: item[:2])
+    self._starts = [item[0] for item in self._items]
+    self._longest = max((end - start for start, end, _ in self._items), default=None)
+
+  def __len__(self):
+    return len(self._items)
+
+  def add(self, start, end, value=None):
+    position = bisect_left(self._starts, start)
+    self._starts.insert(position, start)
+    self._items.insert(position, (start, end, value))
+    if self._longest is None or end - start > self._longest:
+      self._longest = end - start
+
+  def overlapping(self, start, end):
+    '''(start, end, value) of every interval overlapping [start, end).'''
+    if not self._items:
+      return []
+    first = bisect_left(self._starts, start - self._longest)
+    last = bisect_left(self._starts, end, first)
+    return [item for item in self._items[first:last] if item[1] > start]
+
+
+class ShowSchedule(object):
+  '''Per-venue and per-artist IntervalIndexes over a set of shows.'''
+  def __init__(self, shows=(), duration=SHOW_DURATION):
+    self.duration = duration
+    by_venue, by_artist = defaultdict(list), defaultdict(list)
+    for show in shows:
+      show = ProposedShow(*show)
+      interval = (show.start_time, show.start_time + duration, show)
+      by_venue[show.venue_id].append(interval)
+      by_artist[show.artist_id].append(interval)
+    self.venues = defaultdict(IntervalIndex, ((key, IntervalIndex(items)) for key, items in by_venue.items()))
+    self.artists = defaultdict(IntervalIndex, ((key, IntervalIndex(items)) for key, items in by_artist.items()))
+
+  def add(self, show):
+    end = show.start_time + self.duration
+    self.venues[show.venue_id].add(show.start_time, end, show)
+    self.artists[show.artist_id].add(show.start_time, end, show)
+
+  def conflicts(self, index, show):
+    '''Conflicts of one show with the shows in the schedule.'''
+    end = show.start_time + self.duration
+    found = []
+    for reason, key, intervals in (('venue_booked', show.venue_id, self.venues), ('artist_booked', show.artist_id, self.artists)):
+      if key in intervals:
+        found.extend(Conflict(index, reason, other) for _, _, other in intervals[key].overlapping(show.start_time, end))
+    return found
+
+
+def load_schedule(session, show_model, proposed, duration=SHOW_DURATION):
+  '''ShowSchedule of the existing shows that could overlap a proposed one:
+  those at the proposed venues or of the proposed artists, within the
+  batch's time window.'''
+  earliest = min(show.start_time for show in proposed) - duration
+  latest = max(show.start_time for show in proposed) + duration
+  venue_ids = {show.venue_id for show in proposed}
+  artist_ids = {show.artist_id for show in proposed}
+  rows = session.query(show_model.artist_id, show_model.venue_id, show_model.start_time).filter(
+    show_model.start_time > earliest,
+    show_model.start_time < latest,
+    show_model.venue_id.in_(venue_ids) | show_model.artist_id.in_(artist_ids))
+  return ShowSchedule(rows, duration)
+
+
+def existing_ids(session, model, ids):
+  '''The ids in ids of venues or artists that exist and are not soft deleted.'''
+  query = session.query(model.id).filter(model.id.in_(set(ids)), model.deleted_at.is_(None))
+  return {id for id, in query}
+
+
+def check_shows(session, proposed, artist_model, venue_model, show_model, schedule=None):
+  '''Conflicts for a batch of proposed shows, as a list sorted by batch index.
+
+  proposed is a sequence of (artist_id, venue_id, start_time). Checking one
+  batch takes three queries: the artist ids, the venue ids and the existing
+  shows in the batch's window. A proposal that checks clean is added to the
+  schedule, so later proposals in the same batch are checked against it.
+  schedule, when given, replaces the query for existing shows.
+  '''
+  proposed = [ProposedShow(*show) for show in proposed]
+  if not proposed:
+    return []
+  artists = existing_ids(session, artist_model, (show.artist_id for show in proposed))
+  venues = existing_ids(session, venue_model, (show.venue_id for show in proposed))
+  if schedule is None:
+    schedule = load_schedule(session, show_model, proposed)
+
+  conflicts = []
+  for index, show in enumerate(proposed):
+    found = []
+    if show.artist_id not in artists:
+      found.append(Conflict(index, 'unknown_artist', None))
+    if show.venue_id not in venues:
+      found.append(Conflict(index, 'unknown_venue', None))
+    found.extend(schedule.conflicts(index, show))
+    if not found:
+      schedule.add(show)
+    conflicts.extend(found)
+  return conflicts
+
+
+def describe(conflict, proposed):
+  '''Message for a conflict, proposed is the show it was reported for.'''
+  show = conflict.show or ProposedShow(*proposed)
+  return REASONS[conflict.reason].format(**show._asdict())
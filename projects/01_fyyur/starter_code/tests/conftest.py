@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import app as fyyur
+
+
+def enable_foreign_keys(dbapi_connection, connection_record):
+  # sqlite leaves ON DELETE CASCADE off unless asked, Postgres always has it
+  dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+
+@pytest.fixture
+def app(tmp_path):
+  '''The app on a new sqlite database, inside an app context.'''
+  fyyur.app.config.update(
+    TESTING=True,
+    SQLALCHEMY_DATABASE_URI='sqlite:///{}'.format(tmp_path / 'fyyur.db'),
+    SOFT_DELETE=False,
+    ADMIN_PAGES=False,
+  )
+  with fyyur.app.app_context():
+    event.listen(fyyur.db.engine, 'connect', enable_foreign_keys)
+    fyyur.db.create_all()
+    yield fyyur.app
+    fyyur.db.session.remove()
+    fyyur.db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
+
+
+def add_record(record):
+  fyyur.db.session.add(record)
+  fyyur.db.session.flush()
+  fyyur.refresh_record_profiles(record)
+  fyyur.db.session.commit()
+  return record.id
+
+
+@pytest.fixture
+def make_venue(app):
+  '''Adds a venue with its profile document, returns its id.'''
+  def make(name='The Musical Hop', **values):
+    values = dict({'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street'}, **values)
+    return add_record(fyyur.Venue(name=name, **values))
+  return make
+
+
+@pytest.fixture
+def make_artist(app):
+  '''Adds an artist with its profile document, returns its id.'''
+  def make(name='Guns N Petals', **values):
+    values = dict({'city': 'San Francisco', 'state': 'CA'}, **values)
+    return add_record(fyyur.Artist(name=name, **values))
+  return make
+
+
+@pytest.fixture
+def make_show(app):
+  '''Adds a show, by default a week from now, and refreshes the profile
+  documents it changes, returns its id.'''
+  def make(venue_id, artist_id, start_time=None):
+    start_time = start_time or datetime.now().replace(microsecond=0) + timedelta(days=7)
+    return add_record(fyyur.Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time))
+  return make
+
+
+@pytest.fixture
+def run_jobs(app):
+  '''Runs the queued jobs that are due, returns how many ran.'''
+  def run():
+    return fyyur.jobs.Worker(fyyur.db.session, fyyur.Job, burst=True, log=lambda line: None).run()
+  return run
@@ -0,0 +1,61 @@
+import pytest
+
+import api
+
+
+@pytest.fixture
+def venues(make_venue):
+  return [make_venue('Venue {:02d}'.format(number)) for number in range(1, 6)]
+
+
+def test_venues_are_paginated(client, venues):
+  response = client.get('/api/v1/venues', query_string={'per_page': 2, 'fields': 'id,name'})
+  assert response.status_code == 200
+  body = response.get_json()
+  assert set(body) == {'venues', 'page', 'per_page', 'next'}
+  assert body['venues'] == [{'id': venues[0], 'name': 'Venue 01'}, {'id': venues[1], 'name': 'Venue 02'}]
+  assert (body['page'], body['per_page']) == (1, 2)
+  assert body['next'] == 'http://localhost/api/v1/venues?per_page=2&fields=id%2Cname&page=2'
+
+  body = client.get(body['next']).get_json()
+  assert [venue['name'] for venue in body['venues']] == ['Venue 03', 'Venue 04']
+
+  body = client.get('/api/v1/venues', query_string={'per_page': 2, 'page': 3}).get_json()
+  assert [venue['name'] for venue in body['venues']] == ['Venue 05']
+  assert body['next'] is None
+
+
+def test_page_past_the_end_is_empty(client, venues):
+  body = client.get('/api/v1/venues', query_string={'page': api.MAX_PAGE}).get_json()
+  assert body['venues'] == [] and body['next'] is None
+
+
+@pytest.mark.parametrize('query', [
+  {'page': 0},
+  {'page': api.MAX_PAGE + 1},
+  {'page': '99999999999999999999'},
+  {'page': 'abc'},
+  {'page': ''},
+  {'per_page': 0},
+  {'per_page': api.MAX_PER_PAGE + 1},
+  {'per_page': 'abc'},
+  {'per_page': '2.5'},
+])
+def test_invalid_pagination_is_rejected(client, query):
+  response = client.get('/api/v1/artists', query_string=query)
+  assert response.status_code == 400
+  body = response.get_json()
+  assert body['success'] is False and body['error'] == 400
+  assert body['message'].startswith('{} must be a whole number'.format(next(iter(query))))
+
+
+def test_unknown_field_is_rejected(client):
+  response = client.get('/api/v1/venues', query_string={'fields': 'id,bogus'})
+  assert response.status_code == 400
+  assert response.get_json()['message'].startswith('Unknown fields: bogus.')
+
+
+def test_unknown_venue_is_not_found(client):
+  response = client.get('/api/v1/venues/999')
+  assert response.status_code == 404
+  assert response.get_json()['error'] == 404
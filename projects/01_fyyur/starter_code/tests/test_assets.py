@@ -0,0 +1,123 @@
+import gzip
+import os
+import posixpath
+import re
+
+import pytest
+from flask import Flask, render_template_string
+
+import assets
+
+PAGE = "{% extends 'layouts/main.html' %}"
+
+
+def use_dist_dir(monkeypatch, dist_dir):
+  monkeypatch.setattr(assets, 'DIST_DIR', dist_dir)
+  monkeypatch.setattr(assets, 'MANIFEST_PATH', os.path.join(dist_dir, 'manifest.json'))
+
+
+@pytest.fixture(scope='module')
+def built(tmp_path_factory):
+  '''Builds once into a temporary directory instead of static/dist.'''
+  dist_dir = str(tmp_path_factory.mktemp('assets') / 'dist')
+  with pytest.MonkeyPatch.context() as monkeypatch:
+    use_dist_dir(monkeypatch, dist_dir)
+    manifest = assets.build()
+  return dist_dir, manifest
+
+
+@pytest.fixture
+def dist(built, monkeypatch):
+  '''The built directory and its manifest, for the app created in the test.'''
+  use_dist_dir(monkeypatch, built[0])
+  return built
+
+
+@pytest.fixture
+def no_build(tmp_path, monkeypatch):
+  use_dist_dir(monkeypatch, str(tmp_path / 'dist'))
+
+
+def make_app():
+  '''A bare app with the templates and the routes layouts/main.html links to.'''
+  app = Flask('app', root_path=os.path.dirname(os.path.abspath(assets.__file__)))
+  for endpoint in ('venues', 'artists', 'shows'):
+    app.add_url_rule('/' + endpoint, endpoint, lambda: '')
+  assets.init_app(app)
+  return app
+
+
+def render_layout(app):
+  with app.test_request_context('/'):
+    return render_template_string(PAGE)
+
+
+def layout_urls(html):
+  return re.findall(r'(?:href|src)="(/static/[^"]+)"', html)
+
+
+def test_layout_links_built_files(dist):
+  dist_dir, manifest = dist
+  app = make_app()
+  html = render_layout(app)
+
+  urls = layout_urls(html)
+  for bundle in assets.BUNDLES:
+    url = '/static/dist/' + manifest[bundle]
+    assert url in urls
+    assert os.path.isfile(os.path.join(dist_dir, manifest[bundle]))
+  assert '/static/dist/' + manifest['js/libs/respond-1.4.2.min.js'] in html
+
+  client = app.test_client()
+  for url in (url for url in urls if url.startswith('/static/dist/')):
+    response = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200
+    with open(os.path.join(dist_dir, url[len('/static/dist/'):]), 'rb') as f:
+      assert response.data == f.read()
+    assert response.headers['Cache-Control'] == assets.IMMUTABLE_CACHE_CONTROL
+
+
+def test_gzip_sibling_is_served(dist):
+  dist_dir, manifest = dist
+  client = make_app().test_client()
+
+  response = client.get('/static/dist/' + manifest['main.css'], headers={'Accept-Encoding': 'gzip'})
+
+  assert response.headers['Content-Encoding'] == 'gzip'
+  assert response.mimetype == 'text/css'
+  with open(os.path.join(dist_dir, manifest['main.css']), 'rb') as f:
+    assert gzip.decompress(response.data) == f.read()
+
+
+def test_css_urls_point_at_hashed_files(dist):
+  dist_dir, manifest = dist
+
+  with open(os.path.join(dist_dir, manifest['main.css']), encoding='utf-8') as f:
+    css = f.read()
+  referenced = [url.split('?')[0].split('#')[0] for _, url in assets.CSS_URL.findall(css)]
+  hashed = set(manifest.values())
+  local = [url for url in referenced if not re.match(r'^(?:[a-z]+:|/|#)', url)]
+  assert local
+  for url in local:
+    if url in hashed:
+      assert os.path.isfile(os.path.join(dist_dir, url))
+    else:
+      # Left alone only when the file is not in static/, like the glyphicons
+      assert posixpath.normpath(posixpath.join('css', url)) not in manifest
+
+
+def test_rewrite_css_urls():
+  manifest = {'fonts/icons.eot': 'fonts/icons.0123456789ab.eot'}
+  css = "a{src:url('../fonts/icons.eot?#iefix')}b{src:url(../fonts/missing.eot)}c{src:url(/x.png)}"
+
+  assert assets.rewrite_css_urls('css/main.css', css, manifest) == (
+    'a{src:url("fonts/icons.0123456789ab.eot?#iefix")}b{src:url(../fonts/missing.eot)}c{src:url(/x.png)}')
+
+
+def test_sources_without_a_build(no_build):
+  html = render_layout(make_app())
+
+  for bundle, sources in assets.BUNDLES.items():
+    for source in sources:
+      assert '/static/' + source in layout_urls(html)
+  assert '/static/dist/' not in html
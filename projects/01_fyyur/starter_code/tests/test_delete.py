@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import app as fyyur
+
+
+def listed_ids(model):
+  return sorted(listing_id for listing_id, in model.listed().with_entities(model.id))
+
+
+def test_delete_venue_cascades_to_shows(client, make_venue, make_artist, make_show):
+  venue_id = make_venue()
+  other_venue_id = make_venue('The Dueling Pianos Bar')
+  artist_id = make_artist()
+  make_show(venue_id, artist_id)
+  kept_show_id = make_show(other_venue_id, artist_id, datetime.now() + timedelta(days=30))
+
+  response = client.delete('/venues/{}'.format(venue_id))
+
+  assert response.get_json()['success']
+  assert fyyur.Venue.query.get(venue_id) is None
+  assert [show.id for show in fyyur.Show.query] == [kept_show_id]
+  assert fyyur.db.session.query(fyyur.VenueProfile).filter_by(venue_id=venue_id).count() == 0
+
+
+def test_soft_deleted_listings_are_hidden(app, client, make_venue, make_artist, make_show):
+  app.config['SOFT_DELETE'] = True
+  venue_id = make_venue()
+  artist_id = make_artist()
+  make_show(venue_id, artist_id)
+
+  client.delete('/venues/{}'.format(venue_id))
+  client.delete('/artists/{}'.format(artist_id))
+
+  assert fyyur.Venue.query.get(venue_id).deleted_at is not None
+  assert fyyur.Show.query.count() == 1
+  assert listed_ids(fyyur.Venue) == [] and listed_ids(fyyur.Artist) == []
+  assert client.get('/venues/{}'.format(venue_id)).status_code == 404
+  assert client.get('/artists/{}'.format(artist_id)).status_code == 404
+  assert b'The Musical Hop' not in client.get('/venues').data
+  assert b'Guns N Petals' not in client.get('/artists').data
+  assert b'The Musical Hop' not in client.post('/venues/search', data={'search_term': 'musical'}).data
+  assert b'Guns N Petals' not in client.post('/artists/search', data={'search_term': 'petals'}).data
+  assert client.get('/shows/search?format=json').get_json() == {'shows': []}
+
+
+def test_restore_brings_back_listing_and_shows(app, client, make_venue, make_artist, make_show, run_jobs):
+  app.config['SOFT_DELETE'] = True
+  venue_id = make_venue()
+  artist_id = make_artist()
+  show_id = make_show(venue_id, artist_id)
+  client.delete('/venues/{}'.format(venue_id))
+  run_jobs()
+  assert fyyur.artist_profile(artist_id)['upcoming_shows'] == []
+
+  assert fyyur.restore_listing(fyyur.Venue, venue_id)
+  run_jobs()
+
+  assert listed_ids(fyyur.Venue) == [venue_id]
+  assert b'The Musical Hop' in client.post('/venues/search', data={'search_term': 'musical'}).data
+  assert [show['id'] for show in fyyur.venue_profile(venue_id)['upcoming_shows']] == [show_id]
+  assert [show['id'] for show in fyyur.artist_profile(artist_id)['upcoming_shows']] == [show_id]
+  assert [show['id'] for show in client.get('/shows/search?format=json').get_json()['shows']] == [show_id]
+  assert fyyur.check_profiles(fyyur.Venue) == fyyur.check_profiles(fyyur.Artist) == {'missing': [], 'stale': [], 'leftover': []}
+
+
+def test_restore_command(app, make_venue):
+  app.config['SOFT_DELETE'] = True
+  venue_id = make_venue()
+  app.test_client().delete('/venues/{}'.format(venue_id))
+  runner = app.test_cli_runner()
+
+  result = runner.invoke(args=['restore', 'venue', str(venue_id)])
+  assert result.exit_code == 0
+  assert listed_ids(fyyur.Venue) == [venue_id]
+
+  result = runner.invoke(args=['restore', 'venue', str(venue_id)])
+  assert result.exit_code == 1
+  assert not fyyur.restore_listing(fyyur.Artist, 404)
@@ -0,0 +1,89 @@
+from sqlalchemy import event
+
+import app as fyyur
+
+
+def venue_form(**values):
+  return dict({
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+    'phone': '', 'image_link': '', 'facebook_link': '', 'website': '', 'genres': ['Jazz'],
+  }, **values)
+
+
+def artist_json(**values):
+  return dict({'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA', 'genres': ['Rock n Roll']}, **values)
+
+
+def genre_names(association, listing_id):
+  listing_column = association.c[association.name.split('_')[0] + '_id']
+  return sorted(name for name, in fyyur.db.session.query(fyyur.Genre.name).join(
+    association, association.c.genre_id == fyyur.Genre.id).filter(listing_column == listing_id))
+
+
+def record_statements(app):
+  statements = []
+  event.listen(fyyur.db.engine, 'before_cursor_execute',
+               lambda connection, cursor, statement, *args: statements.append(statement.split()[0]))
+  return statements
+
+
+def test_edit_adds_and_removes_genres(client, make_venue):
+  venue_id = make_venue(image_link='')
+  client.post('/venues/{}/edit'.format(venue_id), data=venue_form(genres=['Jazz', 'Folk']))
+  assert genre_names(fyyur.venue_genres, venue_id) == ['Folk', 'Jazz']
+
+  client.post('/venues/{}/edit'.format(venue_id), data=venue_form(genres=['Folk', 'Blues']))
+  assert genre_names(fyyur.venue_genres, venue_id) == ['Blues', 'Folk']
+  # Genres are shared rows, removing one from a venue keeps it
+  assert sorted(name for name, in fyyur.db.session.query(fyyur.Genre.name)) == ['Blues', 'Folk', 'Jazz']
+  assert fyyur.venue_profile(venue_id)['genres'] == ['Blues', 'Folk']
+
+
+def test_unchanged_edit_writes_nothing(app, client, make_venue):
+  venue_id = make_venue(image_link='')
+  client.post('/venues/{}/edit'.format(venue_id), data=venue_form())
+  statements = record_statements(app)
+
+  response = client.post('/venues/{}/edit'.format(venue_id), data=venue_form())
+
+  assert response.headers['Location'].endswith('/venues/{}'.format(venue_id))
+  assert statements and set(statements) == {'SELECT'}
+
+
+def test_edit_of_missing_or_deleted_listing_is_not_found(app, client, make_venue, make_artist):
+  venue_id = make_venue()
+  artist_id = make_artist()
+  app.config['SOFT_DELETE'] = True
+  client.delete('/venues/{}'.format(venue_id))
+  client.delete('/artists/{}'.format(artist_id))
+
+  for listing_id in (venue_id, 999):
+    assert client.post('/venues/{}/edit'.format(listing_id), data=venue_form()).status_code == 404
+    assert client.post('/venues/{}/edit'.format(listing_id), json=venue_form()).status_code == 404
+  for listing_id in (artist_id, 999):
+    assert client.post('/artists/{}/edit'.format(listing_id), json=artist_json()).status_code == 404
+  assert fyyur.Venue.query.get(venue_id).name == 'The Musical Hop'
+
+
+def test_json_edit(client, make_artist):
+  artist_id = make_artist()
+
+  response = client.post('/artists/{}/edit'.format(artist_id), json=artist_json(name='The Petals', genres=['Soul', 'Funk']))
+
+  assert response.status_code == 200
+  assert response.get_json() == {'success': True, 'id': artist_id}
+  assert fyyur.Artist.query.get(artist_id).name == 'The Petals'
+  assert genre_names(fyyur.artist_genres, artist_id) == ['Funk', 'Soul']
+
+
+def test_json_edit_with_unknown_genre_is_rejected(client, make_artist):
+  artist_id = make_artist()
+  client.post('/artists/{}/edit'.format(artist_id), json=artist_json())
+
+  response = client.post('/artists/{}/edit'.format(artist_id), json=artist_json(name='Renamed', genres=['Soul', 'Polka']))
+
+  assert response.status_code == 400
+  assert response.get_json()['errors'] == {'genres': ["'Polka' is not a valid choice for this field"]}
+  assert fyyur.Artist.query.get(artist_id).name == 'Guns N Petals'
+  assert genre_names(fyyur.artist_genres, artist_id) == ['Rock n Roll']
+  assert fyyur.Genre.query.filter_by(name='Polka').count() == 0
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as fyyur
+import jobs
+
+calls = []
+
+
+@jobs.task('test-record')
+def record_job(value=None):
+  calls.append(value)
+
+
+@jobs.task('test-fail', max_attempts=3)
+def fail_job():
+  raise RuntimeError('always fails')
+
+
+@jobs.task('test-limited', limit=1)
+def limited_job():
+  pass
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+  del calls[:]
+
+
+def enqueue(name, args=None, run_at=None):
+  job = jobs.enqueue(fyyur.db.session, fyyur.Job, name, args, run_at)
+  fyyur.db.session.commit()
+  return job.id
+
+
+def get_job(job_id):
+  fyyur.db.session.expire_all()
+  return fyyur.Job.query.get(job_id)
+
+
+def make_due(job_id):
+  fyyur.Job.query.filter_by(id=job_id).update({'run_at': datetime.now()})
+  fyyur.db.session.commit()
+
+
+def test_retry_delay_doubles_up_to_an_hour():
+  assert [jobs.retry_delay(attempts) for attempts in (1, 2, 3)] == [
+    timedelta(seconds=30), timedelta(minutes=1), timedelta(minutes=2)]
+  assert jobs.retry_delay(20) == jobs.MAX_RETRY_DELAY
+
+
+def test_failed_job_is_retried_with_backoff(app, run_jobs):
+  job_id = enqueue('test-fail')
+
+  for attempts in (1, 2):
+    run_jobs()
+    job = get_job(job_id)
+    assert (job.status, job.attempts, job.worker) == (jobs.QUEUED, attempts, None)
+    assert 'RuntimeError: always fails' in job.last_error
+    assert job.run_at == job.finished_at + jobs.retry_delay(attempts)
+    make_due(job_id)
+
+  run_jobs()
+  job = get_job(job_id)
+  assert (job.status, job.attempts) == (jobs.FAILED, 3)
+
+
+def test_expired_lease_is_requeued(app):
+  now = datetime.now()
+  expired_id, running_id = enqueue('test-record'), enqueue('test-record')
+  fyyur.Job.query.filter_by(id=expired_id).update({
+    'status': jobs.RUNNING, 'attempts': 1, 'worker': 'gone:1', 'started_at': now - jobs.DEFAULT_LEASE - timedelta(minutes=1)})
+  fyyur.Job.query.filter_by(id=running_id).update({
+    'status': jobs.RUNNING, 'attempts': 1, 'worker': 'busy:1', 'started_at': now - timedelta(minutes=1)})
+  fyyur.db.session.commit()
+
+  assert jobs.requeue_expired(fyyur.db.session, fyyur.Job) == 1
+
+  job = get_job(expired_id)
+  assert (job.status, job.worker) == (jobs.QUEUED, None)
+  assert job.last_error.startswith('Lease of 0:10:00 expired on worker gone:1')
+  assert get_job(running_id).status == jobs.RUNNING
+
+
+def test_limit_caps_running_jobs_of_a_task(app):
+  first_id, second_id = enqueue('test-limited'), enqueue('test-limited')
+  record_id = enqueue('test-record')
+
+  claimed = jobs.claim(fyyur.db.session, fyyur.Job, 'one:1')
+  assert claimed.id == first_id
+  # The second limited job waits, the other task's job does not
+  assert jobs.claim(fyyur.db.session, fyyur.Job, 'two:2').id == record_id
+  assert jobs.claim(fyyur.db.session, fyyur.Job, 'two:2') is None
+
+  jobs.finish(fyyur.db.session, fyyur.Job, claimed, 'one:1')
+  assert jobs.claim(fyyur.db.session, fyyur.Job, 'two:2').id == second_id
+
+
+def test_burst_worker_runs_due_jobs_and_exits(app, run_jobs):
+  done_ids = [enqueue('test-record', {'value': value}) for value in (1, 2)]
+  later_id = enqueue('test-record', {'value': 3}, datetime.now() + timedelta(hours=1))
+
+  # Along with the periodic tasks, scheduled when a worker starts
+  assert run_jobs() == 2 + len([task for task in jobs.TASKS.values() if task.every])
+
+  assert calls == [1, 2]
+  assert [get_job(job_id).status for job_id in done_ids] == [jobs.DONE, jobs.DONE]
+  assert get_job(later_id).status == jobs.QUEUED
+
+
+def test_job_page_is_hidden_unless_enabled(app, client):
+  enqueue('test-fail')
+  assert client.get('/admin/jobs').status_code == 404
+  assert client.get('/admin/jobs?format=json').status_code == 404
+
+  app.config['ADMIN_PAGES'] = True
+  response = client.get('/admin/jobs?format=json')
+  assert response.status_code == 200
+  tasks = {task['name']: task for task in response.get_json()['tasks']}
+  assert tasks['test-fail']['counts'][jobs.QUEUED] == 1
+  assert client.get('/admin/jobs').status_code == 200
@@ -0,0 +1,95 @@
+import app as fyyur
+
+MATCHING = {'missing': [], 'stale': [], 'leftover': []}
+
+
+def stored_document(model, listing_id):
+  kind = fyyur.PROFILE_KINDS[model]
+  return fyyur.db.session.query(kind.document_model.document).filter(
+    getattr(kind.document_model, kind.key) == listing_id).scalar()
+
+
+def queued_jobs():
+  return [(job.name, job.args) for job in fyyur.Job.query.filter_by(status=fyyur.jobs.QUEUED)]
+
+
+def venue_form(**values):
+  return dict({
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+    'phone': '', 'image_link': '', 'facebook_link': '', 'website': '', 'genres': ['Jazz'],
+  }, **values)
+
+
+def test_edit_rebuilds_documents(client, make_venue, make_artist, make_show, run_jobs):
+  venue_id = make_venue()
+  artist_id = make_artist()
+  make_show(venue_id, artist_id)
+
+  response = client.post('/venues/{}/edit'.format(venue_id), data=venue_form(name='The Hop', genres=['Jazz', 'Folk']))
+  assert response.headers['Location'].endswith('/venues/{}'.format(venue_id))
+
+  document = stored_document(fyyur.Venue, venue_id)
+  assert (document['name'], document['genres']) == ('The Hop', ['Folk', 'Jazz'])
+  # Artists showing the old name are refreshed by a job
+  assert queued_jobs() == [('refresh-profiles', {'artist_ids': [artist_id]})]
+  assert stored_document(fyyur.Artist, artist_id)['shows'][0]['venue_name'] == 'The Musical Hop'
+  run_jobs()
+  assert stored_document(fyyur.Artist, artist_id)['shows'][0]['venue_name'] == 'The Hop'
+  assert fyyur.check_profiles(fyyur.Venue) == fyyur.check_profiles(fyyur.Artist) == MATCHING
+
+
+def test_edit_without_embedded_change_queues_nothing(client, make_venue, make_artist, make_show):
+  # As the form saves it, blank fields are empty strings
+  venue_id = make_venue(image_link='')
+  make_show(venue_id, make_artist())
+
+  client.post('/venues/{}/edit'.format(venue_id), data=venue_form(phone='415-555-0100'))
+
+  assert stored_document(fyyur.Venue, venue_id)['phone'] == '415-555-0100'
+  assert queued_jobs() == []
+
+
+def test_new_show_rebuilds_both_documents(client, make_venue, make_artist):
+  venue_id = make_venue()
+  artist_id = make_artist()
+
+  response = client.post('/shows/create', json={'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2035-04-01T20:00:00'})
+  assert response.status_code == 201
+
+  show_id = response.get_json()['id']
+  assert [show['id'] for show in stored_document(fyyur.Venue, venue_id)['shows']] == [show_id]
+  assert [show['id'] for show in stored_document(fyyur.Artist, artist_id)['shows']] == [show_id]
+
+
+def test_delete_queues_refresh_of_counterparts(client, make_venue, make_artist, make_show, run_jobs):
+  venue_id = make_venue()
+  artist_ids = [make_artist(), make_artist('Matt Quevedo')]
+  for artist_id in artist_ids:
+    make_show(venue_id, artist_id)
+
+  client.delete('/venues/{}'.format(venue_id))
+
+  assert stored_document(fyyur.Venue, venue_id) is None
+  assert queued_jobs() == [('refresh-profiles', {'artist_ids': artist_ids})]
+  assert fyyur.check_profiles(fyyur.Artist)['stale'] == artist_ids
+  run_jobs()
+  assert [stored_document(fyyur.Artist, artist_id)['shows'] for artist_id in artist_ids] == [[], []]
+  assert fyyur.check_profiles(fyyur.Artist) == MATCHING
+
+
+def test_check_profiles_finds_and_fixes_stale_documents(app, make_venue, make_artist):
+  venue_ids = [make_venue(), make_venue('The Dueling Pianos Bar')]
+  artist_id = make_artist()
+  fyyur.db.session.execute("UPDATE venue SET name = 'Renamed' WHERE id = {}".format(venue_ids[1]))
+  fyyur.db.session.query(fyyur.ArtistProfile).delete()
+  fyyur.db.session.commit()
+
+  assert fyyur.check_profiles(fyyur.Venue) == dict(MATCHING, stale=[venue_ids[1]])
+  assert fyyur.check_profiles(fyyur.Artist) == dict(MATCHING, missing=[artist_id])
+  runner = app.test_cli_runner()
+  assert runner.invoke(args=['check-profiles']).exit_code == 1
+
+  result = runner.invoke(args=['check-profiles', '--fix', '--batch-size', '1'])
+  assert result.exit_code == 0
+  assert stored_document(fyyur.Venue, venue_ids[1])['name'] == 'Renamed'
+  assert runner.invoke(args=['check-profiles']).output == 'All profile documents match.\n'
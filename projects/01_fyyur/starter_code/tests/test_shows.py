@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+import app as fyyur
+from validation import timestamp
+
+
+def test_timestamp_converts_offsets_to_local_time():
+  aware = datetime(2035, 4, 1, 20, tzinfo=timezone(timedelta(hours=2)))
+  assert timestamp('2035-04-01T20:00:00+02:00') == aware.astimezone().replace(tzinfo=None)
+  assert timestamp('2035-04-01T20:00:00') == datetime(2035, 4, 1, 20)
+
+
+def test_show_with_offset_conflicts_with_existing_show(client, make_venue, make_artist, make_show):
+  venue_id = make_venue()
+  artist_id = make_artist()
+  start = datetime(2030, 1, 1, 20, tzinfo=timezone(timedelta(hours=2))).astimezone().replace(tzinfo=None)
+  make_show(venue_id, artist_id, start + timedelta(hours=1))
+  proposed = {'artist_id': artist_id, 'venue_id': venue_id, 'start_time': '2030-01-01T20:00:00+02:00'}
+
+  response = client.post('/shows/create', json=proposed)
+  assert response.status_code == 409
+  assert sorted(response.get_json()['errors']['json']) == [
+    'The artist already has a show at {}.'.format(start + timedelta(hours=1)),
+    'The venue already has a show at {}.'.format(start + timedelta(hours=1))]
+
+  response = client.post('/shows/check', json={'shows': [proposed]})
+  assert response.status_code == 200
+  assert sorted(conflict['reason'] for conflict in response.get_json()['conflicts']) == ['artist_booked', 'venue_booked']
+  assert fyyur.Show.query.count() == 1
+
+
+def test_failed_show_form_reports_error(client, monkeypatch, make_venue, make_artist):
+  form = {'artist_id': make_artist(), 'venue_id': make_venue(), 'start_time': '2030-01-01 20:00:00'}
+  def fail(record):
+    raise RuntimeError('profile rebuild failed')
+  monkeypatch.setattr(fyyur, 'refresh_record_profiles', fail)
+
+  response = client.post('/shows/create', data=form)
+
+  assert response.status_code == 200
+  assert b'An error occurred. Show could not be listed.' in response.data
+  assert fyyur.Show.query.count() == 0
+
+
+def test_show_search_mixes_offset_and_local_bounds(client, make_venue, make_artist, make_show):
+  show_id = make_show(make_venue(), make_artist(), datetime(2030, 1, 1, 20))
+  start = datetime(2030, 1, 1, 19).astimezone().astimezone(timezone(timedelta(hours=2)))
+  query = {'from': start.isoformat(), 'to': '2030-01-02'}
+
+  response = client.get('/shows/search', query_string=dict(query, format='json'))
+  assert response.status_code == 200
+  assert [show['id'] for show in response.get_json()['shows']] == [show_id]
+
+  response = client.get('/api/v1/shows', query_string=query)
+  assert response.status_code == 200
+  assert [show['id'] for show in response.get_json()['shows']] == [show_id]
+
+  query['from'] = (start + timedelta(hours=2)).isoformat()
+  assert client.get('/api/v1/shows', query_string=query).get_json()['shows'] == []
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from forms import ArtistForm, VenueForm
+from validation import (ARTIST_RULES, REQUIRED_MESSAGE, SHOW_RULES, VENUE_RULES, validate_json,
+                        without_csrf)
+
+VENUE = {
+  'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+  'phone': '415-555-1234', 'genres': ['Jazz', 'Folk'], 'website': 'https://www.themusicalhop.com',
+  'image_link': 'https://images.unsplash.com/photo-1543900694-133f37abaaa5',
+  'facebook_link': 'https://www.facebook.com/TheMusicalHop',
+}
+
+
+@pytest.fixture
+def form(app):
+  '''Validates a venue or artist submission through its form, returns its errors.'''
+  def validate(form_class, values):
+    with app.test_request_context(method='POST'):
+      form = without_csrf(form_class)(MultiDict(
+        [(name, item) for name, value in values.items() for item in (value if isinstance(value, list) else [value])]))
+      form.validate()
+      return form.errors
+  return validate
+
+
+def test_valid_venue(form):
+  values, errors = validate_json(VENUE_RULES, VENUE)
+  assert errors == {}
+  assert values['genres'] == ['Jazz', 'Folk'] and values['seeking_talent'] is False
+  assert form(VenueForm, VENUE) == {}
+
+
+def test_missing_required_fields():
+  values, errors = validate_json(ARTIST_RULES, {'name': 'Guns N Petals', 'city': '  ', 'genres': []})
+  assert errors == {'city': [REQUIRED_MESSAGE], 'state': [REQUIRED_MESSAGE], 'genres': [REQUIRED_MESSAGE]}
+  assert values['phone'] is None
+  assert validate_json(VENUE_RULES, ['not', 'an', 'object']) == ({}, {'json': ['Expected a JSON object.']})
+
+
+def test_missing_required_fields_in_form(form):
+  errors = form(ArtistForm, {'name': 'Guns N Petals'})
+  assert set(errors) == {'city', 'state', 'genres'}
+
+
+def test_choices_are_checked(form):
+  venue = dict(VENUE, state='XX', genres=['Jazz', 'Polka'])
+  assert validate_json(VENUE_RULES, venue)[1] == {
+    'state': ['Not a valid choice'], 'genres': ["'Polka' is not a valid choice for this field"]}
+  assert form(VenueForm, venue) == {
+    'state': ['Not a valid choice'], 'genres': ["'Polka' is not a valid choice for this field"]}
+  assert validate_json(VENUE_RULES, dict(VENUE, genres='Jazz'))[1] == {'genres': ['Expected a list of choices.']}
+
+
+@pytest.mark.parametrize('phone', ['123-456', 'call me', '+44 20 7946 0958', 12312312345])
+def test_bad_phone_number(form, phone):
+  assert validate_json(VENUE_RULES, dict(VENUE, phone=phone))[1] == {'phone': ['Invalid phone number.']}
+  if isinstance(phone, str):
+    assert form(VenueForm, dict(VENUE, phone=phone)) == {'phone': ['Invalid phone number.']}
+
+
+@pytest.mark.parametrize('link', ['www.facebook.com/hop', 'http://', 'https://exa mple.com', 'ftp:/x'])
+def test_bad_url(form, link):
+  assert validate_json(VENUE_RULES, dict(VENUE, facebook_link=link))[1] == {'facebook_link': ['Invalid URL.']}
+  assert set(form(VenueForm, dict(VENUE, facebook_link=link))) == {'facebook_link'}
+
+
+def test_show_timestamps():
+  show = {'artist_id': 4, 'venue_id': 1, 'start_time': '2035-04-01T20:00:00+02:00'}
+  values, errors = validate_json(SHOW_RULES, show)
+  assert errors == {}
+  local = datetime(2035, 4, 1, 20, tzinfo=timezone(timedelta(hours=2))).astimezone().replace(tzinfo=None)
+  assert values['start_time'] == local and values['start_time'].tzinfo is None
+
+  assert validate_json(SHOW_RULES, dict(show, start_time='2035-04-01 20:00:00'))[0]['start_time'] == datetime(2035, 4, 1, 20)
+  assert validate_json(SHOW_RULES, dict(show, start_time='next friday'))[1] == {'start_time': ['Not a valid datetime value']}
+  assert validate_json(SHOW_RULES, dict(show, artist_id='4', venue_id=True))[1] == {
+    'artist_id': ['Not a valid integer value'], 'venue_id': ['Not a valid integer value']}
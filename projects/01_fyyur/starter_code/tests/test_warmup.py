@@ -0,0 +1,63 @@
+import os
+import runpy
+from types import SimpleNamespace
+
+import pytest
+
+import app as fyyur
+import warmup
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def listings(make_venue, make_artist, make_show):
+  venue_id, artist_id = make_venue(), make_artist()
+  make_show(venue_id, artist_id)
+  return venue_id, artist_id
+
+
+class Log(object):
+  def __init__(self):
+    self.lines = []
+
+  def info(self, message, *args):
+    self.lines.append(message % args)
+
+
+def test_warm_reports_each_step(app, listings):
+  report = fyyur.warm_app(profiles=1, connections=2)
+
+  assert [step.name for step in report.steps] == ['templates', 'caches', 'connections', 'pages']
+  steps = {step.name: step for step in report.steps}
+  assert steps['templates'].count == len(app.jinja_env.list_templates(extensions=['html']))
+  assert steps['connections'].count == 2
+  assert [page.path for page in report.pages] == list(app.config['WARMUP_PAGES']) + ['/venues/1', '/artists/1']
+  assert steps['pages'].count == len(report.pages)
+  assert all(page.status == 200 and page.size > 0 for page in report.pages)
+  assert report.seconds >= sum(step.seconds for step in report.steps)
+
+  lines = warmup.format_report(report)
+  assert lines[-1].startswith('Warm after ')
+  assert len(lines) == len(report.steps) + len(report.pages) + 1
+
+
+def test_warmup_command(app, listings):
+  result = app.test_cli_runner().invoke(args=['warmup', '--profiles', '0', '--connections', '1'])
+
+  assert result.exit_code == 0
+  assert '/venues' in result.output and 'Warm after' in result.output
+
+
+@pytest.mark.parametrize('pages', [('/',), ()])
+def test_gunicorn_hooks(app, listings, monkeypatch, pages):
+  '''post_fork must not fail with WARMUP_PAGES empty.'''
+  monkeypatch.setitem(app.config, 'WARMUP_PAGES', pages)
+  hooks = runpy.run_path(GUNICORN_CONF)
+  server = SimpleNamespace(log=Log())
+
+  hooks['when_ready'](server)
+  hooks['post_fork'](server, SimpleNamespace(pid=1234))
+
+  assert server.log.lines[-1].startswith('Worker 1234 opened 1 connections')
+  assert ('first response' in server.log.lines[-1]) == bool(pages)
@@ -0,0 +1,216 @@
+#----------------------------------------------------------------------------#
+# Shared validation.
+#
+# The choice lists, patterns and validators the forms in forms.py are built
+# from, created once at import and shared by every form instance, plus a
+# plain-dict validator for JSON request bodies that checks the same rules
+# without building a WTForms form.
+#----------------------------------------------------------------------------#
+import re
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+from wtforms import SelectField, SelectMultipleField
+from wtforms.validators import URL
+
+STATES = (
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI',
+    'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MT', 'NE', 'NV', 'NH',
+    'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'MD', 'MA', 'MI', 'MN',
+    'MS', 'MO', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA',
+    'WV', 'WI', 'WY',
+)
+
+GENRES = (
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other',
+)
+
+# (value, label) pairs for the select widgets, in display order
+STATE_CHOICES = tuple((state, state) for state in STATES)
+GENRE_CHOICES = tuple((genre, genre) for genre in GENRES)
+
+# Membership checks
+STATE_SET = frozenset(STATES)
+GENRE_SET = frozenset(GENRES)
+
+PHONE_REGEX = re.compile(r'^(?:(?:\+?1\s*(?:[.-]\s*)?)?(?:\(\s*([2-9]1[02-9]|[2-9][02-8]1|[2-9][02-8][02-9])\s*\)|([2-9]1[02-9]|[2-9][02-8]1|[2-9][02-8][02-9]))\s*(?:[.-]\s*)?)?([2-9]1[02-9]|[2-9][02-9]1|[2-9][02-9]{2})\s*(?:[.-]\s*)?([0-9]{4})(?:\s*(?:#|x\.?|ext\.?|extension)\s*(\d+))?$')
+PHONE_MESSAGE = 'Invalid phone number.'
+
+# One instance serves every url field, its pattern is compiled here.
+# The hostname check idna-encodes the host on each call, and a handful of
+# hosts (facebook.com, the image sites) cover most links, so it is memoized.
+URL_VALIDATOR = URL()
+URL_VALIDATOR.validate_hostname = lru_cache(maxsize=1024)(URL_VALIDATOR.validate_hostname)
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+#----------------------------------------------------------------------------#
+# Fields.
+#----------------------------------------------------------------------------#
+
+class ChoiceField(SelectField):
+    '''A SelectField that checks the submitted value against a frozenset
+    instead of scanning its choices.'''
+    def __init__(self, label=None, validators=None, values=None, **kwargs):
+        super(ChoiceField, self).__init__(label, validators, **kwargs)
+        self.values = values if values is not None else frozenset(c[0] for c in self.choices)
+
+    def pre_validate(self, form):
+        if self.data not in self.values:
+            raise ValueError(self.gettext('Not a valid choice'))
+
+class MultipleChoiceField(SelectMultipleField):
+    '''SelectMultipleField counterpart of ChoiceField.'''
+    def __init__(self, label=None, validators=None, values=None, **kwargs):
+        super(MultipleChoiceField, self).__init__(label, validators, **kwargs)
+        self.values = values if values is not None else frozenset(c[0] for c in self.choices)
+
+    def pre_validate(self, form):
+        for value in self.data or ():
+            if value not in self.values:
+                raise ValueError(self.gettext("'%(value)s' is not a valid choice for this field") % dict(value=value))
+
+#----------------------------------------------------------------------------#
+# Form classes.
+#----------------------------------------------------------------------------#
+
+@lru_cache(maxsize=None)
+def without_csrf(form_class):
+    '''Subclass of form_class with CSRF disabled, built once per form class,
+    for submissions that would otherwise pass meta={'csrf': False}.'''
+    meta = type('Meta', (), {'csrf': False})
+    return type(form_class.__name__, (form_class,), {'Meta': meta, '__module__': form_class.__module__})
+
+#----------------------------------------------------------------------------#
+# JSON validation.
+#----------------------------------------------------------------------------#
+
+# check(value) returns the cleaned value or raises ValueError with the message
+Rule = namedtuple('Rule', ['name', 'check', 'required', 'default'])
+Rule.__new__.__defaults__ = (False, None)
+
+REQUIRED_MESSAGE = 'This field is required.'
+
+def text(value):
+    if not isinstance(value, str):
+        raise ValueError('Not a valid string.')
+    return value
+
+def one_of(values):
+    def check(value):
+        if not isinstance(value, str) or value not in values:
+            raise ValueError('Not a valid choice')
+        return value
+    return check
+
+def all_of(values):
+    def check(value):
+        if not isinstance(value, list):
+            raise ValueError('Expected a list of choices.')
+        for item in value:
+            if not isinstance(item, str) or item not in values:
+                raise ValueError("'{}' is not a valid choice for this field".format(item))
+        return value
+    return check
+
+def phone(value):
+    if not isinstance(value, str) or not PHONE_REGEX.match(value):
+        raise ValueError(PHONE_MESSAGE)
+    return value
+
+def url(value):
+    match = isinstance(value, str) and URL_VALIDATOR.regex.match(value)
+    if not match or not URL_VALIDATOR.validate_hostname(match.group('host')):
+        raise ValueError('Invalid URL.')
+    return value
+
+def boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError('Not a valid boolean.')
+    return value
+
+def integer(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('Not a valid integer value')
+    return value
+
+def parse_datetime(value):
+    '''Parses an ISO 8601 date or datetime. One with a UTC offset, e.g.
+    2035-04-01T20:00:00+02:00, is converted to the server's local time and
+    returned naive, as show times are stored and compared with now().'''
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def timestamp(value):
+    '''Accepts the form's format and ISO 8601, e.g. 2035-04-01T20:00:00.'''
+    try:
+        return parse_datetime(value)
+    except (TypeError, ValueError):
+        raise ValueError('Not a valid datetime value')
+
+def is_blank(value):
+    return value is None or value == '' or value == [] or isinstance(value, str) and not value.strip()
+
+VENUE_RULES = (
+    Rule('name', text, required=True),
+    Rule('city', text, required=True),
+    Rule('state', one_of(STATE_SET), required=True),
+    Rule('address', text, required=True),
+    Rule('phone', phone),
+    Rule('genres', all_of(GENRE_SET), required=True),
+    Rule('website', url),
+    Rule('image_link', url),
+    Rule('facebook_link', url),
+    Rule('seeking_talent', boolean, default=False),
+    Rule('seeking_description', text),
+)
+
+ARTIST_RULES = (
+    Rule('name', text, required=True),
+    Rule('city', text, required=True),
+    Rule('state', one_of(STATE_SET), required=True),
+    Rule('phone', phone),
+    Rule('genres', all_of(GENRE_SET), required=True),
+    Rule('image_link', url),
+    Rule('website', url),
+    Rule('facebook_link', url),
+    Rule('seeking_venue', boolean, default=False),
+    Rule('seeking_description', text),
+)
+
+SHOW_RULES = (
+    Rule('artist_id', integer, required=True),
+    Rule('venue_id', integer, required=True),
+    Rule('start_time', timestamp, required=True),
+)
+
+def validate_json(rules, data):
+    '''Validates a decoded JSON object against rules.
+
+    Returns (values, errors). values maps every rule's name to its cleaned
+    value, or its default when the key is missing or blank. errors has the
+    shape of form.errors, field name to a list of messages, and is empty
+    when data is valid. Keys without a rule are ignored.
+    '''
+    if not isinstance(data, dict):
+        return {}, {'json': ['Expected a JSON object.']}
+
+    values, errors = {}, {}
+    for rule in rules:
+        value = data.get(rule.name)
+        if is_blank(value):
+            if rule.required:
+                errors[rule.name] = [REQUIRED_MESSAGE]
+            values[rule.name] = rule.default
+            continue
+        try:
+            values[rule.name] = rule.check(value)
+        except ValueError as e:
+            errors[rule.name] = [str(e)]
+    return values, errors
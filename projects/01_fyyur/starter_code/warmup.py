@@ -0,0 +1,93 @@
+#----------------------------------------------------------------------------#
+# Cache warming.
+#
+# Run by `flask warmup` and the gunicorn hooks in gunicorn.conf.py so the
+# first visitors after a deploy do not pay for compiling templates,
+# opening database connections and reading cold tables. Like jobs.py this
+# takes the app and engine as arguments instead of importing app.
+#----------------------------------------------------------------------------#
+import time
+from collections import namedtuple
+
+from sqlalchemy import text
+
+Step = namedtuple('Step', ['name', 'count', 'seconds'])
+Page = namedtuple('Page', ['path', 'status', 'size', 'cold', 'warm'])
+Report = namedtuple('Report', ['steps', 'pages', 'seconds'])
+
+
+def compile_templates(app):
+  '''Loads every template into the Jinja cache, which compiles it once
+  for the life of the process. Returns how many.'''
+  names = app.jinja_env.list_templates(extensions=['html'])
+  for name in names:
+    app.jinja_env.get_template(name)
+  return len(names)
+
+
+def open_connections(engine, count=None):
+  '''Checks out count connections at once, by default the pool size, and
+  returns them to the pool open. Returns how many.'''
+  if count is None:
+    # Only QueuePool keeps a fixed number, sqlite files use NullPool
+    count = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+  connections = []
+  try:
+    for _ in range(count):
+      connection = engine.connect()
+      connection.execute(text('SELECT 1'))
+      connections.append(connection)
+  finally:
+    for connection in connections:
+      connection.close()
+  return count
+
+
+def render_pages(app, paths):
+  '''Requests each path twice through the whole app, the first time cold
+  and the second as visitors will see it. Returns a Page for each.'''
+  client = app.test_client()
+  pages = []
+  for path in paths:
+    timings = []
+    for _ in range(2):
+      started = time.perf_counter()
+      response = client.get(path)
+      # Streamed responses render while read
+      body = response.get_data()
+      timings.append(time.perf_counter() - started)
+    pages.append(Page(path, response.status_code, len(body), timings[0], timings[1]))
+  return pages
+
+
+def warm(app, engine, paths, prime=None, connections=None):
+  '''Compiles templates, calls prime to fill the app's own caches, opens
+  pool connections and renders paths. Returns a Report whose seconds is
+  the time until the first warm response.'''
+  started = time.perf_counter()
+  steps = []
+
+  def step(name, function, *args):
+    step_started = time.perf_counter()
+    result = function(*args)
+    steps.append(Step(name, result, time.perf_counter() - step_started))
+    return result
+
+  step('templates', compile_templates, app)
+  if prime is not None:
+    step('caches', prime)
+  step('connections', open_connections, engine, connections)
+  pages = step('pages', render_pages, app, paths)
+  steps[-1] = steps[-1]._replace(count=len(pages))
+  return Report(steps, pages, time.perf_counter() - started)
+
+
+def format_report(report):
+  '''The report as lines for a terminal or a log.'''
+  lines = ['{:<12} {:>5} {:9.1f} ms'.format(step.name, step.count if step.count is not None else '', step.seconds * 1e3)
+           for step in report.steps]
+  for page in report.pages:
+    lines.append('  {:<32} {} {:>8} bytes  cold {:7.1f} ms  warm {:7.1f} ms'.format(
+      page.path, page.status, page.size, page.cold * 1e3, page.warm * 1e3))
+  lines.append('Warm after {:.0f} ms'.format(report.seconds * 1e3))
+  return lines
@@ -0,0 +1,91 @@
+'''
+Times category filtering and quiz sampling with and without the
+ix_questions_category_id (category, id) index.
+
+    python benchmarks/category_index.py --rows 100000
+    python benchmarks/category_index.py --database postgres://localhost:5432/trivia_bench
+
+The target database is dropped and reseeded, never point it at real data.
+'''
+import argparse
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import setup_db, db, Question, Category
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports']
+PAGE_SIZE = 10
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Category.__table__.insert(), [{'type': t} for t in CATEGORIES])
+    db.session.execute(Question.__table__.insert(), [{
+        'question': 'Question {}'.format(i),
+        'answer': 'Answer {}'.format(i),
+        'category': random.randint(1, len(CATEGORIES)),
+        'difficulty': random.randint(1, 5)
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def filter_category():
+    query = Question.query.filter(Question.category == 3)
+    query.count()
+    return query.order_by(Question.id).offset(PAGE_SIZE * 5).limit(PAGE_SIZE).all()
+
+
+def sample_quiz():
+    query = Question.query.filter(Question.id.notin_([1, 2, 3]), Question.category == 3)
+    count = query.count()
+    return query.order_by(Question.id).offset(random.randrange(count)).first()
+
+
+def explain(sql):
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    return [' '.join(str(col) for col in row) for row in db.session.execute(prefix + sql)]
+
+
+def run(label, number):
+    print('{}:'.format(label))
+    for name, fn in (('category page', filter_category), ('quiz sample', sample_quiz)):
+        best = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print('  {:<14} {:8.3f} ms'.format(name, best * 1000))
+    for line in explain('SELECT id FROM questions WHERE category = 3 ORDER BY id LIMIT 10'):
+        print('  plan:', line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='SQLAlchemy database url, defaults to a temporary sqlite file')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+
+    database = args.database or 'sqlite:///{}'.format(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    app = Flask(__name__)
+    setup_db(app, database)
+    with app.app_context():
+        seed(args.rows)
+        print('{} questions on {}'.format(args.rows, db.engine.dialect.name))
+
+        db.session.execute('DROP INDEX ix_questions_category_id')
+        db.session.execute('ANALYZE')
+        db.session.commit()
+        run('before (no index)', args.number)
+
+        db.session.execute('CREATE INDEX ix_questions_category_id ON questions (category, id)')
+        db.session.execute('ANALYZE')
+        db.session.commit()
+        run('after (category, id) index', args.number)
+
+
+if __name__ == '__main__':
+    main()
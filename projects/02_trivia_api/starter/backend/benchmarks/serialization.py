@@ -0,0 +1,69 @@
+'''
+Compares serializing a page of questions through ORM objects, format() and
+jsonify against the column tuple fast path in flaskr/serializers.py.
+
+    python benchmarks/serialization.py --page-size 1000
+'''
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from models import setup_db, db, Question, Category
+from flaskr import serializers
+from flaskr.serializers import question_rows, format_rows, encode_json
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Category.__table__.insert(), [{'type': 'Science'}])
+    db.session.execute(Question.__table__.insert(), [{
+        'question': 'What is the answer to question number {}?'.format(i),
+        'answer': 'Answer {}'.format(i),
+        'category': 1,
+        'difficulty': i % 5 + 1
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    setup_db(app, 'sqlite://')
+    with app.test_request_context():
+        seed(args.page_size)
+        size = args.page_size
+
+        def orm_jsonify():
+            questions = Question.query.order_by(Question.id).limit(size).all()
+            return jsonify({'success': True, 'questions': [q.format() for q in questions]}).get_data()
+
+        def rows_fast_json():
+            rows = question_rows().order_by(Question.id).limit(size).all()
+            return encode_json({'success': True, 'questions': format_rows(rows)})
+
+        def rows_msgpack():
+            rows = question_rows().order_by(Question.id).limit(size).all()
+            return serializers.encode_msgpack({'success': True, 'questions': format_rows(rows)})
+
+        cases = [('ORM + format() + jsonify', orm_jsonify),
+                 ('rows + {}'.format('orjson' if serializers.orjson else 'json'), rows_fast_json)]
+        if serializers.msgpack is not None:
+            cases.append(('rows + msgpack', rows_msgpack))
+
+        print('page of {} questions'.format(size))
+        for label, fn in cases:
+            best = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+            print('  {:<26} {:8.3f} ms {:>8} bytes'.format(label, best * 1000, len(fn())))
+
+
+if __name__ == '__main__':
+    main()
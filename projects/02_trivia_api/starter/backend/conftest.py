@@ -0,0 +1,24 @@
+import time
+
+import testing
+
+_session_started = None
+
+
+def pytest_sessionstart(session):
+    global _session_started
+    _session_started = time.perf_counter()
+
+
+def pytest_terminal_summary(terminalreporter):
+    '''Reports wall-clock timings recorded by the database harness.'''
+    tests = testing.timings['tests']
+    if not tests:
+        return
+    terminalreporter.section('trivia timings')
+    if testing.timings['setup'] is not None:
+        terminalreporter.write_line('schema setup: {:.3f}s'.format(testing.timings['setup']))
+    terminalreporter.write_line('{} tests: {:.3f}s in test bodies, {:.3f}s wall-clock'.format(
+        len(tests), sum(tests.values()), time.perf_counter() - _session_started))
+    for name, seconds in sorted(tests.items(), key=lambda item: item[1], reverse=True)[:5]:
+        terminalreporter.write_line('  {:.3f}s {}'.format(seconds, name))
@@ -1,4 +1,5 @@
 import os
+import click
 from flask import Flask, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
@@ -6,22 +7,45 @@ import random
 import json
 from json.decoder import JSONDecodeError
 
-from models import setup_db, Question, Category
+from models import setup_db, database_path, db, Question, Category
+from .ingest import CHUNK_SIZE, ingest_questions
+from .serializers import question_rows, format_rows, respond
 
 QUESTIONS_PER_PAGE = 10
 
-def paginate(request, data):
-  if not data:
-    return data
-  page = request.args.get('page', 1, type=int)
+def paginate_query(request, query):
+  '''Paginates in SQL so only the requested page of rows is fetched.'''
+  page = max(request.args.get('page', 1, type=int), 1)
   start = (page - 1) * QUESTIONS_PER_PAGE
-  end = start + QUESTIONS_PER_PAGE
-  return data[start:end]
+  return query.order_by(Question.id).offset(start).limit(QUESTIONS_PER_PAGE).all()
+
+def question_criteria(body):
+  '''Builds filter clauses for bulk question operations from either
+  an "ids" list or a "filter" object in the request body.'''
+  ids = body.get('ids', None)
+  filters = body.get('filter', None) or {}
+  criteria = []
+  if ids:
+    if not all(isinstance(q_id, int) for q_id in ids):
+      raise ValueError('Question ids must be integers.')
+    criteria.append(Question.id.in_(ids))
+  if 'category' in filters:
+    criteria.append(Question.category == int(filters['category']))
+  if 'difficulty' in filters:
+    criteria.append(Question.difficulty == int(filters['difficulty']))
+  if filters.get('searchTerm'):
+    criteria.append(Question.question.ilike('%{}%'.format(filters['searchTerm'])))
+  # Refuse to touch every row when no criteria were given
+  if not criteria:
+    raise ValueError('Either ids or filter criteria must be provided.')
+  return criteria
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
-    setup_db(app)
+    if test_config is not None:
+        app.config.from_mapping(test_config)
+    setup_db(app, app.config.get('SQLALCHEMY_DATABASE_URI', database_path))
     cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 
@@ -35,9 +59,9 @@ def create_app(test_config=None):
     @app.route('/categories')
     def get_categories():
         try:
-            categories = Category.query.all()
-            formatted_categories = {category.id: category.type for category in categories}
-            return jsonify({
+            categories = db.session.query(Category.id, Category.type).all()
+            formatted_categories = {c_id: c_type for c_id, c_type in categories}
+            return respond({
                 'success': True,
                 'categories': formatted_categories
             })
@@ -48,15 +72,14 @@ def create_app(test_config=None):
     @app.route('/questions')
     def get_questions():
         try:
-            questions = Question.query.all()
-            paginated_qs = paginate(request, questions)
+            paginated_qs = paginate_query(request, question_rows())
 
-            categories = Category.query.all()
-            formatted_categories = {category.id: category.type for category in categories}
-            return jsonify({
+            categories = db.session.query(Category.id, Category.type).all()
+            formatted_categories = {c_id: c_type for c_id, c_type in categories}
+            return respond({
                 'success': True,
-                'questions': [q.format() for q in paginated_qs],
-                'total_questions': len(questions),
+                'questions': format_rows(paginated_qs),
+                'total_questions': Question.query.count(),
                 'categories': formatted_categories,
                 'current_category': paginated_qs[0].category
             })
@@ -81,6 +104,54 @@ def create_app(test_config=None):
             abort(400)
 
 
+    @app.route('/questions', methods=['DELETE'])
+    def bulk_delete_questions():
+        try:
+            body = json.loads(request.data)
+            criteria = question_criteria(body)
+            # Single set-based DELETE, no rows are loaded into the session
+            deleted = Question.query.filter(*criteria).delete(synchronize_session=False)
+            db.session.commit()
+            return jsonify({
+                'success': True,
+                'deleted': deleted
+            })
+        except JSONDecodeError:
+            abort(400)
+        except Exception as e:
+            db.session.rollback()
+            print('Error:', e)
+            abort(422)
+
+
+    @app.route('/questions', methods=['PATCH'])
+    def bulk_update_questions():
+        try:
+            body = json.loads(request.data)
+            criteria = question_criteria(body)
+            updates = body.get('updates', None) or {}
+            values = {}
+            if 'category' in updates:
+                values[Question.category] = int(updates['category'])
+            if 'difficulty' in updates:
+                values[Question.difficulty] = int(updates['difficulty'])
+            if not values:
+                raise ValueError('Only category and difficulty can be bulk updated.')
+            # Single set-based UPDATE, no rows are loaded into the session
+            updated = Question.query.filter(*criteria).update(values, synchronize_session=False)
+            db.session.commit()
+            return jsonify({
+                'success': True,
+                'updated': updated
+            })
+        except JSONDecodeError:
+            abort(400)
+        except Exception as e:
+            db.session.rollback()
+            print('Error:', e)
+            abort(422)
+
+
     @app.route('/questions', methods=['POST'])
     def create_question():
         try:
@@ -92,14 +163,14 @@ def create_app(test_config=None):
             search = body.get('searchTerm', None)
 
             if search:
-                results = Question.query.filter(Question.question.ilike('%{}%'.format(search))).all()
-                questions = paginate(request, results)
-                formatted_qs = [q.format() for q in questions]
+                query = question_rows().filter(Question.question.ilike('%{}%'.format(search)))
+                questions = paginate_query(request, query)
+                formatted_qs = format_rows(questions)
             
-                return jsonify({
+                return respond({
                     'success': True,
                     'questions': formatted_qs,
-                    'total_questions': len(results),
+                    'total_questions': query.count(),
                     'current_category': questions and questions[0].category
                 })
             else:
@@ -118,16 +189,45 @@ def create_app(test_config=None):
             print(e)
 
 
+    @app.route('/questions/bulk', methods=['POST'])
+    def bulk_create_questions():
+        # Body is newline delimited JSON, one question object per line
+        try:
+            chunk_size = request.args.get('chunk_size', CHUNK_SIZE, type=int)
+            report = ingest_questions(request.stream, chunk_size=max(chunk_size, 1))
+            return jsonify({
+                'success': True,
+                **report
+            })
+        except Exception as e:
+            print('Error:', e)
+            abort(422)
+
+
+    @app.cli.command('import-questions')
+    @click.argument('path', type=click.File('rb'))
+    @click.option('--chunk-size', default=CHUNK_SIZE, show_default=True,
+                  help='Number of rows inserted per transaction.')
+    def import_questions(path, chunk_size):
+        """Bulk load questions from a newline delimited JSON file."""
+        report = ingest_questions(path, chunk_size=max(chunk_size, 1))
+        for error in report['errors']:
+            click.echo('Line {}: {}'.format(error['line'], error['error']), err=True)
+        click.echo('Inserted {} questions in {}s ({} rows/sec), {} errors.'.format(
+            report['inserted'], report['elapsed'], report['rows_per_sec'], len(report['errors'])))
+
+
     @app.route('/categories/<int:category_id>/questions')
     def get_questions_for_category(category_id):
         try:
-            results = Question.query.filter(Question.category == category_id).all()
-            questions = paginate(request, results)
-            formatted_qs = [q.format() for q in questions]
-            return jsonify({
+            # Range scan over ix_questions_category_id (category, id)
+            query = question_rows().filter(Question.category == category_id)
+            questions = paginate_query(request, query)
+            formatted_qs = format_rows(questions)
+            return respond({
                 'success': True,
                 'questions': formatted_qs,
-                'total_questions': len(results),
+                'total_questions': query.count(),
                 'current_category': questions and questions[0].category
             })
         except:
@@ -139,15 +239,21 @@ def create_app(test_config=None):
         try:
             body = json.loads(request.data)
             previous = body.get('previous_questions', [])
+            if not all(isinstance(q_id, int) for q_id in previous):
+                raise ValueError('Previous question ids must be integers.')
             category = body.get('quiz_category', None)
 
-            if category:
-                category_id = category.get('id', 0)
-                questions = Question.query.filter(Question.id.notin_(previous), Question.category == category_id).all()
-            else:
-                questions = Question.query.filter(Question.id.notin_(previous)).all()
-            
-            question = random.choice(questions).format() if questions else None
+            query = Question.query.filter(Question.id.notin_(previous))
+            # The "ALL" category is sent with an id of 0
+            category_id = int(category.get('id', 0)) if category else 0
+            if category_id:
+                query = query.filter(Question.category == category_id)
+
+            # Pick a random offset instead of loading every candidate row
+            count = query.count()
+            question = None
+            if count:
+                question = query.order_by(Question.id).offset(random.randrange(count)).first().format()
             return jsonify({
                 'success': True,
                 'question': question,
@@ -170,106 +276,18 @@ def create_app(test_config=None):
     @app.errorhandler(404)
     def not_found(e):
         return jsonify({
-          'success': True,
-          'questions': formatted_qs,
-          'total_questions': len(results),
-          'current_category': questions[0].category
-        })
-      else:
-        question = Question(question=new_question, answer=new_answer, category=new_category, difficulty=new_difficulty)
-        question.insert()
+            'success': False,
+            'error': 404,
+            'message': 'Question not found.'
+        }), 404
+
+
+    @app.errorhandler(422)
+    def unprocessable(e):
         return jsonify({
-          'success': True
-        })
-    except Exception as e:
-      print('Error: ', e)
-      abort(400)
-
-  '''
-  @TODO: 
-  Create a GET endpoint to get questions based on category. 
-
-  TEST: In the "List" tab / main screen, clicking on one of the 
-  categories in the left column will cause only questions of that 
-  category to be shown. 
-  '''
-  @app.route('/categories/<int:category_id>/questions')
-  def get_questions_for_category(category_id):
-    try:
-      results = Question.query.filter(Question.category == category_id).all()
-      questions = paginate(request, results)
-      formatted_qs = [q.format() for q in questions]
-      return jsonify({
-        'success': True,
-        'questions': formatted_qs,
-        'total_questions': len(results),
-        'current_category': questions[0].category
-      })
-    except:
-      abort(404)
-
-  '''
-  @TODO: 
-  Create a POST endpoint to get questions to play the quiz. 
-  This endpoint should take category and previous question parameters 
-  and return a random question within the given category, 
-  if provided, and that is not one of the previous questions. 
-
-  TEST: In the "Play" tab, after a user selects "All" or a category,
-  one question at a time is displayed, the user is allowed to answer
-  and shown whether they were correct or not. 
-  '''
-  @app.route('/quizzes', methods=['POST'])
-  def get_quiz_question():
-    body = json.loads(request.data)
-    previous = body.get('previous_questions', [])
-    category = body.get('quiz_category', None)
-
-    try:
-      if category:
-        category_id = category.get('id', 0)
-        questions = Question.query.filter(Question.id.notin_(previous), Question.category == category_id).all()
-      else:
-        questions = Question.query.filter(Question.id.notin_(previous)).all()
-      
-      question = random.choice(questions).format() if questions else None
-      return jsonify({
-          'success': True,
-          'question': question,
-      })
-    except Exception as e:
-      print('Error:', e)
-      abort(404)
-
-  '''
-  @TODO: 
-  Create error handlers for all expected errors 
-  including 404 and 422. 
-  '''
-  @app.errorhandler(400)
-  def bad_request():
-    return jsonify({
-      'succes': False,
-      'error': 400,
-      'message': 'Request was not formatted correctly.'
-    }), 400
-
-  @app.errorhandler(404)
-  def not_found():
-    return jsonify({
-      'success': False,
-      'error': 404
-      'message': 'Question not found.'
-    }), 404
-  
-  @app.errorhandler(422)
-  def unprocessable():
-    return jsonify({
-      'success': False,
-      'error': 422,
-      'message': 'Data within the request body was unable to be processed.'
-    }), 422
-
-  return app
-
-    
\ No newline at end of file
+            'success': False,
+            'error': 422,
+            'message': 'Data within the request body was unable to be processed.'
+        }), 422
+
+    return app
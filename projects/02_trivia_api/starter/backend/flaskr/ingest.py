@@ -0,0 +1,100 @@
+import json
+import time
+
+from models import db, Question, Category
+
+# Rows inserted per transaction when bulk loading questions
+CHUNK_SIZE = 500
+
+
+def load_category_lookup():
+    '''Maps lowercased category names and stringified ids to category ids
+    using a single query.'''
+    lookup = {}
+    for category_id, category_type in db.session.query(Category.id, Category.type):
+        lookup[str(category_id)] = category_id
+        if category_type:
+            lookup[category_type.lower()] = category_id
+    return lookup
+
+
+def validate_question(row, categories):
+    '''Returns the column values for a question row or raises ValueError.'''
+    if not isinstance(row, dict):
+        raise ValueError('Each line must be a JSON object.')
+
+    question = row.get('question', None)
+    answer = row.get('answer', None)
+    if not (question and answer):
+        raise ValueError('Both question and answer fields must not be None.')
+
+    category = row.get('category', None)
+    category_id = None
+    if category is not None:
+        category_id = categories.get(str(category).lower())
+        if category_id is None:
+            raise ValueError('Category {} does not exist.'.format(category))
+
+    difficulty = row.get('difficulty', None)
+    if difficulty is not None:
+        try:
+            difficulty = int(difficulty)
+        except (TypeError, ValueError):
+            raise ValueError('Difficulty must be an integer.')
+
+    return {
+        'question': question,
+        'answer': answer,
+        'category': category_id,
+        'difficulty': difficulty
+    }
+
+
+def insert_chunk(rows):
+    '''Inserts rows with a single executemany and commits them as one transaction.'''
+    try:
+        db.session.execute(Question.__table__.insert(), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
+
+
+def ingest_questions(lines, chunk_size=CHUNK_SIZE):
+    '''Validates and inserts newline delimited JSON questions in chunked transactions.
+
+    Invalid lines are skipped and reported with their line number.
+    Returns a report with the inserted count, per-row errors and throughput.'''
+    categories = load_category_lookup()
+    started = time.perf_counter()
+    inserted = 0
+    errors = []
+    chunk = []
+
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            chunk.append(validate_question(json.loads(line), categories))
+        # JSONDecodeError is a subclass of ValueError
+        except ValueError as e:
+            errors.append({'line': line_no, 'error': str(e)})
+            continue
+        if len(chunk) >= chunk_size:
+            inserted += insert_chunk(chunk)
+            chunk = []
+
+    if chunk:
+        inserted += insert_chunk(chunk)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'inserted': inserted,
+        'errors': errors,
+        'elapsed': round(elapsed, 3),
+        'rows_per_sec': round(inserted / elapsed, 1) if elapsed else inserted
+    }
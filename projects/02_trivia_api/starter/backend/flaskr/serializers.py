@@ -0,0 +1,73 @@
+import json
+
+from flask import Response, request
+
+from models import db, Question
+
+# orjson and msgpack are optional, the stdlib encoder is used without them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+QUESTION_FIELDS = ('id', 'question', 'answer', 'category', 'difficulty')
+
+# Built once and reused for every response when orjson is unavailable
+_json_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+def question_rows():
+    '''Query selecting raw question column tuples instead of ORM objects.'''
+    return db.session.query(*[getattr(Question, field) for field in QUESTION_FIELDS])
+
+
+def format_rows(rows):
+    '''Formats question column tuples the same way as Question.format().'''
+    questions = [dict(zip(QUESTION_FIELDS, row)) for row in rows]
+    for question in questions:
+        if question['category'] is not None:
+            question['category'] = int(question['category'])
+    return questions
+
+
+def string_keys(value):
+    '''value with every map key turned into a string, as JSON has them.'''
+    if isinstance(value, dict):
+        return {str(key): string_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [string_keys(item) for item in value]
+    return value
+
+
+def encode_json(payload):
+    if orjson is not None:
+        # Category maps are keyed by integer ids
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return _json_encoder.encode(payload).encode('utf-8')
+
+
+def encode_msgpack(payload):
+    # Category maps are keyed by integer ids, which msgpack decoders reject
+    # by default, so keys are strings as in the JSON response
+    return msgpack.packb(string_keys(payload), use_bin_type=True)
+
+
+def respond(payload, status=200):
+    '''Encodes a payload as MessagePack when the client prefers it, JSON otherwise.'''
+    offered = [JSON_MIMETYPE, MSGPACK_MIMETYPE] if msgpack is not None else [JSON_MIMETYPE]
+    mimetype = request.accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+    if mimetype == MSGPACK_MIMETYPE:
+        body = encode_msgpack(payload)
+    else:
+        body = encode_json(payload)
+    response = Response(body, status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,31 @@
+--
+-- Converts questions.category into an indexed integer foreign key to categories.id.
+-- Databases created by db.create_all() before this change hold category as varchar
+-- without a foreign key; databases restored from trivia.psql only lack the index.
+-- Safe to run more than once:
+--
+--     psql trivia < migrations/001_question_category_fk.sql
+--
+
+BEGIN;
+
+ALTER TABLE public.questions
+    ALTER COLUMN category TYPE integer USING NULLIF(category::text, '')::integer;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'public.questions'::regclass AND contype = 'f'
+    ) THEN
+        ALTER TABLE ONLY public.questions
+            ADD CONSTRAINT category FOREIGN KEY (category) REFERENCES public.categories(id) ON UPDATE CASCADE ON DELETE SET NULL;
+    END IF;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS ix_questions_category_id ON public.questions USING btree (category, id);
+
+ANALYZE public.questions;
+
+COMMIT;
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, create_engine
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -25,17 +25,20 @@ Question
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
+  # Serves category filtering and quiz sampling as index range scans
+  __table_args__ = (Index('ix_questions_category_id', 'category', 'id'),)
 
   id = Column(Integer, primary_key=True)
   question = Column(String)
   answer = Column(String)
-  category = Column(String)
+  category = Column(Integer, ForeignKey('categories.id', name='category', onupdate='CASCADE', ondelete='SET NULL'))
   difficulty = Column(Integer)
 
   def __init__(self, question, answer, category, difficulty):
     self.question = question
     self.answer = answer
-    self.category = category
+    # Clients may still send category ids as strings
+    self.category = int(category) if category is not None else None
     self.difficulty = difficulty
 
   def insert(self):
@@ -50,11 +53,12 @@ class Question(db.Model):
     db.session.commit()
 
   def format(self):
+    # Databases not yet migrated still return category ids as strings
     return {
       'id': self.id,
       'question': self.question,
       'answer': self.answer,
-      'category': self.category,
+      'category': int(self.category) if self.category is not None else None,
       'difficulty': self.difficulty
     }
 
@@ -1,33 +1,19 @@
 import os
 import unittest
 import json
-from flask_sqlalchemy import SQLAlchemy
+from unittest import mock
 
-from flaskr import create_app
-from models import setup_db, Question, Category
+import testing
+from flaskr import serializers
+from models import Question, Category
+from testing import DatabaseTestCase
 
 
-class TriviaTestCase(unittest.TestCase):
-    """This class represents the trivia test case"""
+class TriviaTestCase(DatabaseTestCase):
+    """This class represents the trivia test case.
 
-    def setUp(self):
-        """Define test variables and initialize app."""
-        self.app = create_app()
-        self.client = self.app.test_client
-        self.database_name = "trivia_test"
-        self.database_path = "postgres://{}/{}".format('localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
-
-        # binds the app to the current context
-        with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
-    
-    def tearDown(self):
-        """Executed after each test"""
-        pass
+    The app and schema are shared by all tests and each test
+    is rolled back, see testing.py."""
 
     """
     TODO
@@ -57,6 +43,17 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['questions'])
         self.assertEqual(len(data['questions']), 10)
     
+    @unittest.skipUnless(serializers.msgpack, 'msgpack is not installed')
+    def test_get_questions_msgpack(self):
+        res = self.client().get('/questions', headers={'Accept': 'application/x-msgpack'})
+        data = serializers.msgpack.unpackb(res.data, raw=False)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, 'application/x-msgpack')
+        self.assertEqual(data['success'], True)
+        self.assertEqual(len(data['questions']), 10)
+        self.assertEqual(data, self.client().get('/questions').get_json())
+    
     def test_get_questions_404_response(self):
         res = self.client().get('/question')
         data = json.loads(res.data)
@@ -84,6 +81,53 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(res.status_code, 422)
         self.assertEqual(data['success'], False)
     
+    def test_bulk_delete_questions(self):
+        questions = [Question(question='Bulk delete {}'.format(i), answer='None', category=1, difficulty=1) for i in range(3)]
+        for question in questions:
+            question.insert()
+        q_ids = [q.id for q in questions]
+
+        res = self.client().delete('/questions', json={'ids': q_ids})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['deleted'], 3)
+
+    def test_bulk_delete_questions_422_response(self):
+        res = self.client().delete('/questions', json={})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+
+    def test_bulk_update_questions(self):
+        questions = [Question(question='Bulk update {}'.format(i), answer='None', category=1, difficulty=1) for i in range(2)]
+        for question in questions:
+            question.insert()
+
+        req_body = {
+            'filter': {'searchTerm': 'Bulk update'},
+            'updates': {'difficulty': 5}
+        }
+        res = self.client().patch('/questions', json=req_body)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['updated'], 2)
+
+    def test_bulk_update_questions_422_response(self):
+        req_body = {
+            'ids': [1],
+            'updates': {'answer': 'Not allowed'}
+        }
+        res = self.client().patch('/questions', json=req_body)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+    
     def test_create_question(self):
         req_body = {
             'question':'What is the tallest type of grass?',
@@ -110,6 +154,30 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(res.status_code, 422)
         self.assertEqual(data['success'], False)
     
+    def test_bulk_create_questions(self):
+        lines = [
+            json.dumps({'question':'What is the chemical symbol for gold?', 'answer':'Au', 'category':'Science', 'difficulty':2}),
+            json.dumps({'question':'Which planet is known as the Red Planet?', 'answer':'Mars', 'category':1, 'difficulty':1}),
+            json.dumps({'question':'Missing answer', 'answer':None, 'category':1, 'difficulty':1}),
+            'not json'
+        ]
+        res = self.client().post('/questions/bulk', data='\n'.join(lines), content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['inserted'], 2)
+        self.assertEqual([e['line'] for e in data['errors']], [3, 4])
+
+    def test_bulk_create_questions_unknown_category(self):
+        line = json.dumps({'question':'Who painted the Mona Lisa?', 'answer':'Leonardo da Vinci', 'category':'Painting', 'difficulty':1})
+        res = self.client().post('/questions/bulk', data=line, content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['inserted'], 0)
+        self.assertEqual(len(data['errors']), 1)
+
     def test_search_question(self):
         req_body = {
             'searchTerm':'clay'
@@ -180,6 +248,29 @@ class TriviaTestCase(unittest.TestCase):
     
 
 
+class WorkerDatabaseTestCase(unittest.TestCase):
+    """Database urls of pytest-xdist workers, see testing.py."""
+
+    def worker_database_path(self, worker, database=None):
+        environ = {'PYTEST_XDIST_WORKER': worker}
+        if database:
+            environ['TRIVIA_TEST_DATABASE'] = database
+        with mock.patch.dict(os.environ, environ):
+            if not database:
+                os.environ.pop('TRIVIA_TEST_DATABASE', None)
+            return testing.worker_database_path()
+
+    def test_default_database_per_worker(self):
+        self.assertEqual(self.worker_database_path('gw1'), 'postgres://localhost:5432/trivia_test_gw1')
+
+    def test_postgresql_driver_per_worker(self):
+        path = self.worker_database_path('gw0', 'postgresql+psycopg2://localhost/trivia')
+        self.assertEqual(path, 'postgresql+psycopg2://localhost/trivia_gw0')
+
+    def test_sqlite_shared(self):
+        self.assertEqual(self.worker_database_path('gw1', 'sqlite://'), 'sqlite://')
+
+
 # Make the tests conveniently executable
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
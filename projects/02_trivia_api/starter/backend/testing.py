@@ -0,0 +1,181 @@
+'''
+Database harness for the trivia test suite.
+
+The app, its engine and the schema are created once per process and seeded
+from the COPY blocks in trivia.psql. Every test then runs inside a
+transaction on a single connection with a SAVEPOINT, so commits made by the
+code under test only release the savepoint and everything is rolled back
+when the test finishes.
+
+TRIVIA_TEST_DATABASE selects the database, e.g. "sqlite://" for in-memory
+SQLite. Under pytest-xdist each worker uses its own Postgres database,
+suffixed with the worker id, which is created if it does not exist.
+'''
+import os
+import re
+import time
+import unittest
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import scoped_session
+
+from flaskr import create_app
+from models import db, Question, Category
+
+DEFAULT_DATABASE = 'postgres://localhost:5432/trivia_test'
+DUMP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trivia.psql')
+
+# Wall-clock seconds for the one-off schema setup and for each test
+timings = {'setup': None, 'tests': {}}
+
+_app = None
+
+
+def is_postgres(url):
+    # SQLAlchemy 1.3 names the backend of postgres:// urls 'postgres'
+    return url.drivername.startswith('postgres')
+
+
+def worker_database_path():
+    '''Database url for this process, one database per pytest-xdist worker.'''
+    url = make_url(os.environ.get('TRIVIA_TEST_DATABASE', DEFAULT_DATABASE))
+    worker = os.environ.get('PYTEST_XDIST_WORKER')
+    if worker and is_postgres(url):
+        url.database = '{}_{}'.format(url.database, worker)
+    return str(url)
+
+
+def create_database(database_path):
+    '''Creates a missing Postgres database, other backends need no setup.'''
+    url = make_url(database_path)
+    if not is_postgres(url):
+        return
+    name = url.database
+    url.database = 'postgres'
+    engine = create_engine(url, isolation_level='AUTOCOMMIT')
+    try:
+        with engine.connect() as connection:
+            exists = connection.execute(
+                text('SELECT 1 FROM pg_database WHERE datname = :name'), name=name).scalar()
+            if not exists:
+                connection.execute('CREATE DATABASE "{}"'.format(name))
+    finally:
+        engine.dispose()
+
+
+def load_dump_rows(table):
+    '''Reads the rows of a table's COPY block in trivia.psql.'''
+    with open(DUMP_PATH, encoding='utf-8') as f:
+        lines = iter(f.read().splitlines())
+    header = re.compile(r'^COPY public\.{} \((.*)\) FROM stdin;$'.format(table.name))
+    for line in lines:
+        match = header.match(line)
+        if match:
+            break
+    else:
+        return []
+
+    columns = match.group(1).split(', ')
+    rows = []
+    for line in lines:
+        if line == '\\.':
+            break
+        row = {}
+        for column, value in zip(columns, line.split('\t')):
+            row[column] = None if value == '\\N' else table.c[column].type.python_type(value)
+        rows.append(row)
+    return rows
+
+
+def seed():
+    for model in (Category, Question):
+        db.session.execute(model.__table__.insert(), load_dump_rows(model.__table__))
+    # Explicit ids do not advance Postgres sequences
+    if db.engine.dialect.name == 'postgresql':
+        for table in ('categories', 'questions'):
+            db.session.execute(
+                "SELECT setval(pg_get_serial_sequence('{0}', 'id'), (SELECT max(id) FROM {0}))".format(table))
+    db.session.commit()
+
+
+def enable_sqlite_savepoints(engine):
+    '''pysqlite manages transactions itself and breaks SAVEPOINT,
+    hand transaction control back to SQLAlchemy.'''
+    @event.listens_for(engine, 'connect')
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def do_begin(connection):
+        connection.execute('BEGIN')
+
+    # Reconnect so the listeners apply to the pooled connection
+    engine.dispose()
+
+
+def get_app():
+    '''Creates the app, schema and seed data once per process.'''
+    global _app
+    if _app is None:
+        started = time.perf_counter()
+        database_path = worker_database_path()
+        create_database(database_path)
+        app = create_app({'SQLALCHEMY_DATABASE_URI': database_path, 'TESTING': True})
+        with app.app_context():
+            if db.engine.dialect.name == 'sqlite':
+                enable_sqlite_savepoints(db.engine)
+            db.drop_all()
+            db.create_all()
+            seed()
+        timings['setup'] = time.perf_counter() - started
+        _app = app
+    return _app
+
+
+class RetainedScopedSession(scoped_session):
+    '''Keeps the test session open when a request tears down its app context.'''
+
+    def remove(self):
+        self.expire_all()
+
+    def close_test_session(self):
+        scoped_session.remove(self)
+
+
+class DatabaseTestCase(unittest.TestCase):
+    '''Runs each test in a rolled back transaction on the shared app.'''
+
+    def setUp(self):
+        self.app = get_app()
+        self.client = self.app.test_client
+        self._app_context = self.app.app_context()
+        self._app_context.push()
+
+        self._connection = db.engine.connect()
+        self._transaction = self._connection.begin()
+        self._session = RetainedScopedSession(db.create_session({'bind': self._connection, 'binds': {}}))
+        self._session.begin_nested()
+        event.listen(self._session, 'after_transaction_end', self._restart_savepoint)
+
+        self._original_session = db.session
+        db.session = self._session
+        self._started = time.perf_counter()
+
+    @staticmethod
+    def _restart_savepoint(session, transaction):
+        # Commits in the code under test end the savepoint, start a new one
+        if transaction.nested and not transaction._parent.nested:
+            session.expire_all()
+            session.begin_nested()
+
+    def tearDown(self):
+        timings['tests'][self.id()] = time.perf_counter() - self._started
+        db.session = self._original_session
+        event.remove(self._session, 'after_transaction_end', self._restart_savepoint)
+        # Close the open savepoint before the outer transaction
+        self._session.rollback()
+        self._session.close_test_session()
+        self._transaction.rollback()
+        self._connection.close()
+        self._app_context.pop()
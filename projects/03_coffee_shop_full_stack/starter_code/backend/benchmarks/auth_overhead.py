@@ -0,0 +1,70 @@
+'''
+Measures the per-request overhead of @requires_auth with and without the
+verified token cache. Keys come from an in-process JWKS stub, so the
+numbers exclude any network time.
+
+    python benchmarks/auth_overhead.py --number 2000
+'''
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Crypto.PublicKey import RSA
+from flask import Flask
+from jose import jwk, jwt
+
+from src.auth import auth
+from src.auth.jwks import JWKSCache
+from src.auth.tokens import VerifiedTokenCache
+
+
+class StubResponse(io.BytesIO):
+    headers = {'Cache-Control': 'max-age=600'}
+
+
+def make_token():
+    private_key = RSA.generate(2048)
+    public_jwk = jwk.construct(private_key.publickey().export_key().decode(), 'RS256').to_dict()
+    public_jwk.update({'kid': 'bench', 'use': 'sig'})
+    jwks = json.dumps({'keys': [public_jwk]}).encode()
+    auth.key_provider = JWKSCache('stub', opener=lambda url, timeout: StubResponse(jwks))
+
+    claims = {
+        'iss': 'https://{}/'.format(auth.AUTH0_DOMAIN),
+        'aud': auth.API_AUDIENCE,
+        'exp': int(time.time()) + 3600,
+        'permissions': ['get:drinks-detail', 'post:drinks', 'patch:drinks', 'delete:drinks']
+    }
+    return jwt.encode(claims, private_key.export_key().decode(), algorithm='RS256', headers={'kid': 'bench'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    token = make_token()
+    app = Flask(__name__)
+
+    @auth.requires_auth('get:drinks-detail')
+    def endpoint(payload):
+        return payload
+
+    # The request context is pushed once so only the auth work is timed
+    with app.test_request_context(headers={'Authorization': 'Bearer ' + token}):
+        print('auth overhead per request:')
+        for label, maxsize in (('without token cache', 0), ('with token cache', 1024)):
+            auth.token_cache = VerifiedTokenCache(maxsize=maxsize)
+            endpoint()
+            best = min(timeit.repeat(endpoint, number=args.number, repeat=3)) / args.number
+            print('  {:<20} {:8.1f} us'.format(label, best * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Shared setup for the auth benchmarks: a local RS256 signing key, a stubbed
+JWKS endpoint, and both auth implementations wired to them, the coffee shop
+src/auth/auth.py and the BasicFlaskAuth/app.py example.
+'''
+import importlib.util
+import io
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASIC_FLASK_AUTH_PATH = os.path.join(BACKEND_DIR, '..', '..', '..', '..', 'BasicFlaskAuth', 'app.py')
+
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask
+
+from src.auth import auth
+from src.auth.jwks import JWKSCache
+from src.auth.tokens import VerifiedTokenCache
+from test_auth import make_key, make_token
+
+KID = 'bench'
+PERMISSIONS = ['get:drinks-detail', 'post:drinks', 'patch:drinks', 'delete:drinks']
+
+
+class StubResponse(io.BytesIO):
+    headers = {'Cache-Control': 'max-age=600'}
+
+
+def stub_opener(jwks):
+    body = json.dumps(jwks).encode()
+    return lambda url, timeout=None: StubResponse(body)
+
+
+def load_basic_flask_auth(jwks):
+    '''Imports BasicFlaskAuth/app.py with its placeholders set to the coffee shop
+    domain and audience, and its urlopen serving jwks.'''
+    with open(BASIC_FLASK_AUTH_PATH, encoding='utf-8') as f:
+        source = f.read()
+    source = source.replace('@TODO_REPLACE_WITH_YOUR_DOMAIN', repr(auth.AUTH0_DOMAIN))
+    source = source.replace('@TODO_REPLACE_WITH_YOUR_API_AUDIENCE', repr(auth.API_AUDIENCE))
+
+    spec = importlib.util.spec_from_loader('basic_flask_auth', loader=None)
+    module = importlib.util.module_from_spec(spec)
+    exec(compile(source, BASIC_FLASK_AUTH_PATH, 'exec'), module.__dict__)
+    module.urlopen = stub_opener(jwks)
+    return module
+
+
+class AuthBench:
+    '''A signed token plus both implementations configured to verify it.
+
+    The coffee shop token cache is disabled so every call verifies the token.
+    '''
+
+    def __init__(self):
+        private_pem, public_jwk = make_key(KID)
+        jwks = {'keys': [public_jwk]}
+        self.token = make_token(private_pem, KID, permissions=PERMISSIONS)
+        self.headers = {'Authorization': 'Bearer ' + self.token}
+
+        auth.key_provider = JWKSCache('stub', opener=stub_opener(jwks))
+        auth.token_cache = VerifiedTokenCache(maxsize=0)
+        self.coffee = auth
+        self.basic = load_basic_flask_auth(jwks)
+        self.app = Flask(__name__)
+
+        # Warm both key caches so the first timed call does not fetch
+        self.coffee.key_provider.get_key(KID)
+        self.basic.get_signing_key(KID)
+
+    def request_context(self):
+        return self.app.test_request_context(headers=self.headers)
@@ -0,0 +1,123 @@
+'''
+Mixed read/write load against GET /drinks from several worker processes
+sharing one sqlite file, once with the sqlite defaults and once with the
+engine profile from src/database/engine.py.
+
+Each worker runs its own app. Reads go through the test client. Writes
+update a random drink's recipe through Drink.update(), which is the
+same transaction PATCH /drinks/<id> commits. Every write bumps the menu
+version, so reads after it rebuild the cached listing.
+
+    python benchmarks/concurrency.py --workers 4 --seconds 5 --write-ratio 0.2
+'''
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+
+
+def load_app(database, profile):
+    from src import api
+    api.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database
+    api.app.config['SQLITE_ENGINE_PROFILE'] = profile
+    return api.app
+
+
+def seed(database, profile, drinks):
+    from src.database.models import db, Drink
+    app = load_app(database, profile)
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_save_objects([Drink(title='drink {}'.format(i), recipe=[
+            {'name': 'espresso', 'color': 'brown', 'parts': 1},
+            {'name': 'milk', 'color': 'white', 'parts': 2}
+        ]) for i in range(drinks)])
+        db.session.commit()
+
+
+def worker(database, profile, seconds, write_ratio, drinks, results):
+    from src.database.models import db, Drink
+    app = load_app(database, profile)
+    client = app.test_client()
+    rng = random.Random(os.getpid())
+    reads, writes, errors = [], [], 0
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                with app.app_context():
+                    drink = Drink.query.get(rng.randint(1, drinks))
+                    drink.recipe = [{'name': 'espresso', 'color': 'brown', 'parts': rng.randint(1, 3)}]
+                    drink.update()
+                writes.append(time.perf_counter() - started)
+            else:
+                if client.get('/drinks').status_code != 200:
+                    raise OperationalError('GET /drinks', None, None)
+                reads.append(time.perf_counter() - started)
+        except OperationalError:
+            errors += 1
+            with app.app_context():
+                db.session.rollback()
+    results.put((reads, writes, errors))
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def run(profile, args):
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'bench.db')
+        seed(database, profile, args.drinks)
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(
+            target=worker, args=(database, profile, args.seconds, args.write_ratio, args.drinks, results))
+            for _ in range(args.workers)]
+        for process in workers:
+            process.start()
+        reads, writes, errors = [], [], 0
+        for _ in workers:
+            r, w, e = results.get()
+            reads += r
+            writes += w
+            errors += e
+        for process in workers:
+            process.join()
+
+    label = 'engine profile' if profile else 'sqlite defaults'
+    print('{}:'.format(label))
+    print('  reads  {:7.0f}/s  p50 {:6.1f} ms  p99 {:6.1f} ms'.format(
+        len(reads) / args.seconds, percentile(reads, 0.5) * 1e3, percentile(reads, 0.99) * 1e3))
+    print('  writes {:7.0f}/s  p50 {:6.1f} ms  p99 {:6.1f} ms'.format(
+        len(writes) / args.seconds, percentile(writes, 0.5) * 1e3, percentile(writes, 0.99) * 1e3))
+    print('  errors {:7d}'.format(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--drinks', type=int, default=200)
+    args = parser.parse_args()
+
+    print('{} workers, {:.0%} writes, {} drinks'.format(args.workers, args.write_ratio, args.drinks))
+    for profile in (False, True):
+        run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
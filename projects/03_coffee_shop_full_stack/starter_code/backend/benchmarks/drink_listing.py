@@ -0,0 +1,86 @@
+'''
+Measures serializing the drinks list for GET /drinks and /drinks-detail with
+the recipe stored as a JSON string that is parsed on every call, against the
+JSON recipe column and the denormalized recipe_short column.
+
+Both tables live in one in-memory sqlite database seeded with --drinks rows.
+
+    python benchmarks/drink_listing.py --drinks 10000
+'''
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import Column, Integer, String
+
+from src.database.models import db, Drink
+
+
+class LegacyDrink(db.Model):
+    '''The drink model before recipes were stored as JSON.'''
+    id = Column(Integer, primary_key=True)
+    title = Column(String(80), unique=True)
+    recipe = Column(String(180), nullable=False)
+
+    def short(self):
+        short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
+        return {'id': self.id, 'title': self.title, 'recipe': short_recipe}
+
+    def long(self):
+        return {'id': self.id, 'title': self.title, 'recipe': json.loads(self.recipe)}
+
+
+def seed(count):
+    recipes = [[
+        {'name': 'espresso', 'color': 'brown', 'parts': 1 + i % 3},
+        {'name': 'milk', 'color': 'white', 'parts': 2},
+        {'name': 'foam', 'color': 'grey', 'parts': 1}
+    ] for i in range(count)]
+    db.session.bulk_save_objects(
+        [Drink(title='drink {}'.format(i), recipe=recipe) for i, recipe in enumerate(recipes)])
+    db.session.execute(LegacyDrink.__table__.insert(), [
+        {'title': 'drink {}'.format(i), 'recipe': json.dumps(recipe)} for i, recipe in enumerate(recipes)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drinks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    cases = [
+        ('short, json string', lambda: [d.short() for d in LegacyDrink.query.all()]),
+        ('short, json column', lambda: [d.short() for d in Drink.query.all()]),
+        ('short, projection', Drink.all_short),
+        ('long, json string', lambda: [d.long() for d in LegacyDrink.query.all()]),
+        ('long, json column', lambda: [d.long() for d in Drink.query.all()]),
+        ('long, projection', Drink.all_long),
+    ]
+
+    with app.app_context():
+        db.create_all()
+        seed(args.drinks)
+
+        print('listing {} drinks:'.format(args.drinks))
+        for label, case in cases:
+            def run():
+                case()
+                # Drop the identity map so every run loads the rows again
+                db.session.remove()
+            best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+            print('  {:<20} {:8.1f} ms'.format(label, best * 1e3))
+
+
+if __name__ == '__main__':
+    main()
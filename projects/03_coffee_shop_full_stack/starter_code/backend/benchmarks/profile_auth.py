@@ -0,0 +1,99 @@
+'''
+Profiles token verification in src/auth/auth.py and BasicFlaskAuth/app.py
+and writes the result in flamegraph friendly formats:
+
+    auth.folded   collapsed stacks, one "frame;frame;frame microseconds" line
+                  per stack, for flamegraph.pl or https://www.speedscope.app
+    auth.prof     cProfile stats for snakeviz, pstats or flameprof
+
+    python benchmarks/profile_auth.py --iterations 2000 --output-dir profiles
+    flamegraph.pl profiles/auth.folded > profiles/auth.svg
+
+The stacks are rooted at coffee_shop and basic_flask_auth, so one graph
+shows both implementations. Timings include the tracing overhead and are
+only meaningful relative to each other, use test_auth_stages.py for latency.
+'''
+import argparse
+import cProfile
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from auth_stages import AuthBench
+
+
+class StackProfiler:
+    '''Accumulates wall time per full call stack using sys.setprofile.'''
+
+    def __init__(self):
+        self.stacks = Counter()
+        self._stack = []
+        self._last = None
+
+    @staticmethod
+    def frame_name(event, frame, arg):
+        if event == 'c_call':
+            return '{}:{}'.format(getattr(arg, '__module__', None) or 'builtins', arg.__qualname__)
+        return '{}:{}'.format(frame.f_globals.get('__name__', '?'), frame.f_code.co_name)
+
+    def trace(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        if self._stack:
+            self.stacks[';'.join(self._stack)] += now - self._last
+        if event in ('call', 'c_call'):
+            self._stack.append(self.frame_name(event, frame, arg))
+        elif len(self._stack) > 1:
+            # Keep the root label pushed by run()
+            self._stack.pop()
+        self._last = time.perf_counter_ns()
+
+    def run(self, root, func, iterations):
+        self._stack = [root]
+        self._last = time.perf_counter_ns()
+        sys.setprofile(self.trace)
+        try:
+            for _ in range(iterations):
+                func()
+        finally:
+            sys.setprofile(None)
+        self._stack = []
+
+    def write_folded(self, path):
+        with open(path, 'w') as f:
+            for stack, nanoseconds in sorted(self.stacks.items()):
+                if nanoseconds >= 1000:
+                    f.write('{} {}\n'.format(stack, nanoseconds // 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--output-dir', default='.')
+    args = parser.parse_args()
+
+    bench = AuthBench()
+    views = [
+        ('coffee_shop', bench.coffee.requires_auth('get:drinks-detail')(lambda payload: payload)),
+        ('basic_flask_auth', bench.basic.requires_auth(lambda payload: payload)),
+    ]
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    profiler = StackProfiler()
+    stats = cProfile.Profile()
+    with bench.request_context():
+        for root, view in views:
+            profiler.run(root, view, args.iterations)
+            stats.runcall(lambda: [view() for _ in range(args.iterations)])
+
+    folded_path = os.path.join(args.output_dir, 'auth.folded')
+    prof_path = os.path.join(args.output_dir, 'auth.prof')
+    profiler.write_folded(folded_path)
+    stats.dump_stats(prof_path)
+    print('wrote {} and {}'.format(folded_path, prof_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+'''
+Per-stage latency of token verification in src/auth/auth.py and
+BasicFlaskAuth/app.py, measured with pytest-benchmark.
+
+Each stage is a benchmark group holding one case per implementation, so
+the two are compared side by side:
+
+    header parsing      Authorization header and unverified JOSE header
+    key lookup          signing key for the token's kid from the cached JWKS
+    signature           RS256 signature check with the looked up key
+    claims              payload decode plus exp/aud/iss checks, and the
+                        permission check where the implementation has one
+    end to end          the @requires_auth decorated view
+
+    python -m pytest benchmarks --benchmark-only
+    python -m pytest benchmarks --benchmark-only --benchmark-json=auth.json
+
+benchmarks/profile_auth.py writes a flamegraph profile of the same calls.
+'''
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jose import jws, jwt
+
+from auth_stages import KID, AuthBench
+from src.auth import auth
+
+
+@pytest.fixture(scope='module')
+def bench():
+    original = (auth.key_provider, auth.token_cache)
+    yield AuthBench()
+    auth.key_provider, auth.token_cache = original
+
+
+@pytest.fixture
+def request_context(bench):
+    with bench.request_context():
+        yield
+
+
+def decode_claims(module, token, key):
+    return jwt.decode(
+        token,
+        key,
+        algorithms=module.ALGORITHMS,
+        audience=module.API_AUDIENCE,
+        issuer='https://' + module.AUTH0_DOMAIN + '/',
+        options={'verify_signature': False})
+
+
+def basic_rsa_key(key):
+    # The JWK dict BasicFlaskAuth builds per request before verifying
+    return {name: key[name] for name in ('kty', 'kid', 'use', 'n', 'e')}
+
+
+@pytest.mark.benchmark(group='header parsing')
+def test_header_parsing_coffee_shop(benchmark, bench, request_context):
+    benchmark(lambda: bench.coffee.get_token_kid(bench.coffee.get_token_auth_header()))
+
+
+@pytest.mark.benchmark(group='header parsing')
+def test_header_parsing_basic_flask_auth(benchmark, bench, request_context):
+    benchmark(lambda: jwt.get_unverified_header(bench.basic.get_token_auth_header())['kid'])
+
+
+@pytest.mark.benchmark(group='key lookup')
+def test_key_lookup_coffee_shop(benchmark, bench):
+    assert benchmark(bench.coffee.key_provider.get_key, KID) is not None
+
+
+@pytest.mark.benchmark(group='key lookup')
+def test_key_lookup_basic_flask_auth(benchmark, bench):
+    assert benchmark(bench.basic.get_signing_key, KID) is not None
+
+
+@pytest.mark.benchmark(group='signature')
+def test_signature_coffee_shop(benchmark, bench):
+    key = bench.coffee.key_provider.get_key(KID)
+    benchmark(jws.verify, bench.token, key, bench.coffee.ALGORITHMS)
+
+
+@pytest.mark.benchmark(group='signature')
+def test_signature_basic_flask_auth(benchmark, bench):
+    key = bench.basic.get_signing_key(KID)
+    benchmark(lambda: jws.verify(bench.token, basic_rsa_key(key), bench.basic.ALGORITHMS))
+
+
+@pytest.mark.benchmark(group='claims')
+def test_claims_coffee_shop(benchmark, bench):
+    key = bench.coffee.key_provider.get_key(KID)
+
+    def validate():
+        payload = bench.coffee.Claims(decode_claims(bench.coffee, bench.token, key))
+        return bench.coffee.check_permissions('get:drinks-detail', payload)
+
+    assert benchmark(validate)
+
+
+@pytest.mark.benchmark(group='claims')
+def test_claims_basic_flask_auth(benchmark, bench):
+    key = basic_rsa_key(bench.basic.get_signing_key(KID))
+    benchmark(decode_claims, bench.basic, bench.token, key)
+
+
+@pytest.mark.benchmark(group='end to end')
+def test_end_to_end_coffee_shop(benchmark, bench, request_context):
+    view = bench.coffee.requires_auth('get:drinks-detail')(lambda payload: payload)
+    assert benchmark(view)['sub'] == 'auth0|tester'
+
+
+@pytest.mark.benchmark(group='end to end')
+def test_end_to_end_basic_flask_auth(benchmark, bench, request_context):
+    view = bench.basic.requires_auth(lambda payload: payload)
+    assert benchmark(view)['sub'] == 'auth0|tester'
@@ -5,13 +5,20 @@ import json
 from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
 
-from .database.models import db_drop_and_create_all, setup_db, Drink
+from .database.models import db_drop_and_create_all, setup_db, Drink, SHORT_FIELDS
 from .auth.auth import AuthError, requires_auth
+from .menu_cache import MenuCache
 
 app = Flask(__name__)
 setup_db(app)
 CORS(app)
 
+# Serialized /drinks and /drinks-detail bodies, rebuilt when the menu version changes
+menu_cache = MenuCache()
+
+DRINKS_PER_PAGE = 20
+MAX_DRINKS_PER_PAGE = 100
+
 '''
 @TODO uncomment the following line to initialize the datbase
 !! NOTE THIS WILL DROP ALL RECORDS AND START YOUR DB FROM SCRATCH
@@ -28,17 +35,70 @@ CORS(app)
         it should contain only the drink.short() data representation
     returns status code 200 and json {"success": True, "drinks": drinks} where drinks is the list of drinks
         or appropriate status code indicating reason for failure
+
+    optional query parameters
+        fields: comma separated subset of id, title and recipe
+        title_prefix: only drinks whose title starts with it
+        limit, cursor: pages of at most limit drinks (default 20, max 100) after the
+            drink id given as cursor, the response adds next_cursor, null on the last page
+            a limit or cursor that is not a whole number is a 400
+'''
+
 '''
+int_arg(name, default)
+    the query parameter name as an int, default when it is missing
+    aborts with 400 when it is not an integer, instead of falling back to default
+'''
+def int_arg(name, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        abort(400)
+
 
 @app.route('/drinks', methods=['GET'])
 def drinks():
-    try:
-        drinks = Drink.query.all()
-        formatted_drinks = [drink.short() for drink in drinks]
-        return jsonify({
+    # Without parameters the whole menu is served from the response cache
+    if not request.args:
+        return menu_cache.respond('drinks', lambda: {
             'success': True,
-            'drinks': formatted_drinks
+            'drinks': Drink.all_short()
         })
+
+    try:
+        fields = tuple(request.args.get('fields', ','.join(SHORT_FIELDS)).split(','))
+        if not set(fields) <= set(SHORT_FIELDS):
+            abort(400)
+
+        paginated = 'limit' in request.args or 'cursor' in request.args
+        limit = int_arg('limit', DRINKS_PER_PAGE) if paginated else None
+        after = int_arg('cursor', None)
+        if limit is not None and not 0 < limit <= MAX_DRINKS_PER_PAGE:
+            abort(400)
+        if after is not None and after < 0:
+            abort(400)
+
+        # The cursor is the id of the last drink on the page
+        query_fields = fields if 'id' in fields or not paginated else ('id',) + fields
+        # One extra row tells whether there is a next page
+        drinks = Drink.list_short(
+            fields=query_fields,
+            title_prefix=request.args.get('title_prefix'),
+            after=after,
+            limit=limit + 1 if paginated else None)
+
+        body = {'success': True}
+        if paginated:
+            body['next_cursor'] = drinks[limit - 1]['id'] if len(drinks) > limit else None
+            drinks = drinks[:limit]
+        if query_fields is not fields:
+            for drink in drinks:
+                del drink['id']
+        body['drinks'] = drinks
+        return jsonify(body)
     except:
         abort(400)
 
@@ -54,12 +114,10 @@ def drinks():
 @requires_auth(permission='get:drinks-detail')
 def drinks_detail(payload):
     try:
-        drinks = Drink.query.all()
-        formatted_details = [drink.long() for drink in drinks]
-        return jsonify({
+        return menu_cache.respond('drinks-detail', lambda: {
             'success': True,
-            'drinks': formatted_details
-        })
+            'drinks': Drink.all_long()
+        }, cache_control='private, no-cache')
     except:
         abort(400)
 
@@ -80,8 +138,7 @@ def create_drink(payload):
         body = json.loads(request.data)
         new_title = body.get('title', None)
         new_recipe = body.get('recipe', None)
-        recipe_json = json.dumps(new_recipe) # convert Python object to JSON
-        drink = Drink(title=new_title, recipe=recipe_json)
+        drink = Drink(title=new_title, recipe=new_recipe)
         drink.insert()
         return jsonify({
             'success': True,
@@ -1,14 +1,37 @@
 import json
+import os
 from flask import request, _request_ctx_stack
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from .jwks import JWKSCache
+from .keys import FileKeyProvider
+from .tokens import Claims, VerifiedTokenCache
 
 
 AUTH0_DOMAIN = 'jmw-dev.us.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'coffee'
 
+# Set to a JWKS/PEM file or directory to verify tokens without reaching Auth0
+AUTH_KEYS_PATH = os.environ.get('AUTH_KEYS_PATH')
+
+
+'''
+load_key_provider()
+    keys from AUTH_KEYS_PATH if it is set, otherwise the Auth0 JWKS
+    Auth0 keys are fetched once and refreshed in the background, not per request
+'''
+def load_key_provider():
+    if AUTH_KEYS_PATH:
+        return FileKeyProvider(AUTH_KEYS_PATH)
+    return JWKSCache(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+
+
+key_provider = load_key_provider()
+# Clients reuse bearer tokens for minutes, verified payloads are kept until exp
+token_cache = VerifiedTokenCache()
+
 ## AuthError Exception
 '''
 AuthError Exception
@@ -78,14 +101,29 @@ def get_token_auth_header():
     return true otherwise
 '''
 def check_permissions(permission, payload):
+    return check_permission_sets(frozenset((permission,)), frozenset(), payload)
 
-    if 'permissions' not in payload:
-        raise AuthError({
-                'code': 'invalid_payload',
-                'description': 'Incorrect payload. Payload must contain permissions field.'
-        }, 400)
-    
-    if permission not in payload['permissions']:
+'''
+check_permission_sets(all_of, any_of, payload)
+    @INPUTS
+        all_of: frozenset of permissions that must all be granted
+        any_of: frozenset of permissions of which at least one must be granted, ignored if empty
+        payload: decoded jwt payload, a Claims instance carries its precompiled permission set
+
+    raises the same AuthErrors as check_permissions
+    the cost depends on the size of all_of and any_of, not on how many permissions the token has
+'''
+def check_permission_sets(all_of, any_of, payload):
+    granted = getattr(payload, 'permission_set', None)
+    if granted is None:
+        if 'permissions' not in payload:
+            raise AuthError({
+                    'code': 'invalid_payload',
+                    'description': 'Incorrect payload. Payload must contain permissions field.'
+            }, 400)
+        granted = frozenset(payload['permissions'])
+
+    if not all_of <= granted or (any_of and any_of.isdisjoint(granted)):
         raise AuthError({
                 'code': 'invalid_permissions',
                 'description': 'Invalid permissions. User does not have the required permissions.'
@@ -100,6 +138,7 @@ def check_permissions(permission, payload):
 
     it should be an Auth0 token with key id (kid)
     it should verify the token using Auth0 /.well-known/jwks.json
+        the parsed key comes from key_provider, see load_key_provider()
     it should decode the payload from the token
     it should validate the claims
     return the decoded payload
@@ -107,83 +146,147 @@ def check_permissions(permission, payload):
     !!NOTE urlopen has a common certificate error described here: https://stackoverflow.com/questions/50236117/scraping-ssl-certificate-verify-failed-error-for-http-en-wikipedia-org
 '''
 def verify_decode_jwt(token):
-    print('Token: {}'.format(token))
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    print('jsonurl:', jsonurl)
-    jwks = json.loads(jsonurl.read())
-    print('jwks', jwks)
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    kid = get_token_kid(token)
+    try:
+        key = key_provider.get_key(kid)
+    except Exception:
+        raise_keys_unavailable()
+    return decode_jwt(token, key)
+
+'''
+verify_decode_jwt_async(token)
+    coroutine version of verify_decode_jwt for async views
+    waiting for signing keys does not block the event loop, and concurrent
+    requests that need the same key fetch share one request to the provider
+'''
+async def verify_decode_jwt_async(token):
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    kid = get_token_kid(token)
+    try:
+        key = await key_provider.get_key_async(kid)
+    except Exception:
+        raise_keys_unavailable()
+    return decode_jwt(token, key)
+
+
+def get_token_kid(token):
     unverified_header = jwt.get_unverified_header(token)
-    print('unverified_header: {}\n'.format(unverified_header))
-    rsa_key = {}
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
+    return unverified_header['kid']
 
-    for key in jwks['keys']:
-        print('KEY COMPARE: {}:{}'.format(key['kid'], unverified_header['kid']))
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
-    if rsa_key:
-        try:
-            payload = jwt.decode(
-                token,
-                rsa_key,
-                algorithms=ALGORITHMS,
-                audience=API_AUDIENCE,
-                issuer='https://' + AUTH0_DOMAIN + '/'
-            )
-
-            return payload
-
-        except jwt.ExpiredSignatureError:
-            raise AuthError({
-                'code': 'token_expired',
-                'description': 'Token expired.'
-            }, 401)
 
-        except jwt.JWTClaimsError:
-            raise AuthError({
-                'code': 'invalid_claims',
-                'description': 'Incorrect claims. Please, check the audience and issuer.'
-            }, 401)
-        except Exception:
-            raise AuthError({
-                'code': 'invalid_header',
-                'description': 'Unable to parse authentication token.'
-            }, 400)
-    else:
+def raise_keys_unavailable():
+    raise AuthError({
+        'code': 'jwks_unavailable',
+        'description': 'Unable to fetch the signing keys.'
+    }, 503)
+
+'''
+decode_jwt(token, key)
+    verifies the signature and claims of token with the key from the key provider
+    returns the decoded payload and caches it until the token expires
+'''
+def decode_jwt(token, key):
+    if key is None:
         raise AuthError({
                 'code': 'invalid_header',
                 'description': 'Unable to find the appropriate key.'
             }, 400)
 
+    try:
+        payload = jwt.decode(
+            token,
+            key,
+            algorithms=ALGORITHMS,
+            audience=API_AUDIENCE,
+            issuer='https://' + AUTH0_DOMAIN + '/'
+        )
+
+        payload = Claims(payload)
+        token_cache.put(token, payload)
+        return payload
+
+    except jwt.ExpiredSignatureError:
+        raise AuthError({
+            'code': 'token_expired',
+            'description': 'Token expired.'
+        }, 401)
+
+    except jwt.JWTClaimsError:
+        raise AuthError({
+            'code': 'invalid_claims',
+            'description': 'Incorrect claims. Please, check the audience and issuer.'
+        }, 401)
+    except Exception:
+        raise AuthError({
+            'code': 'invalid_header',
+            'description': 'Unable to parse authentication token.'
+        }, 400)
+
+
+def required_permission_sets(permission, all_of, any_of):
+    required = frozenset(all_of) | (frozenset((permission,)) if permission else frozenset())
+    required_any = frozenset(any_of)
+    if not required and not required_any:
+        raise ValueError('requires_auth needs a permission, all_of or any_of')
+    return required, required_any
+
 
 '''
 @TODO implement @requires_auth(permission) decorator method
     @INPUTS
         permission: string permission (i.e. 'post:drink')
+        all_of: permissions that must all be granted (optional)
+        any_of: permissions of which at least one must be granted (optional)
 
     it should use the get_token_auth_header method to get the token
     it should use the verify_decode_jwt method to decode the jwt
     it should use the check_permissions method validate claims and check the requested permission
     return the decorator which passes the decoded payload to the decorated method
+
+    the required permission sets are built once when the endpoint is decorated
+    raises ValueError when no permission is given, as any valid token would pass
 '''
-def requires_auth(permission=''):
+def requires_auth(permission='', all_of=(), any_of=()):
+    required, required_any = required_permission_sets(permission, all_of, any_of)
+
     def requires_auth_decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
             token = get_token_auth_header()
             payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
+            check_permission_sets(required, required_any, payload)
             return f(payload, *args, **kwargs)
 
         return wrapper
-    return requires_auth_decorator
\ No newline at end of file
+    return requires_auth_decorator
+
+'''
+requires_auth_async(permission)
+    @requires_auth for async views, e.g. on Flask 2 or Quart
+    takes the same arguments and passes the decoded payload to the view
+'''
+def requires_auth_async(permission='', all_of=(), any_of=()):
+    required, required_any = required_permission_sets(permission, all_of, any_of)
+
+    def requires_auth_decorator(f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            token = get_token_auth_header()
+            payload = await verify_decode_jwt_async(token)
+            check_permission_sets(required, required_any, payload)
+            return await f(payload, *args, **kwargs)
+
+        return wrapper
+    return requires_auth_decorator
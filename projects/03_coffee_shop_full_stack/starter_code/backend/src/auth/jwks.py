@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+from .keys import KeyProvider, parse_jwks
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSUnavailable(Exception):
+    '''Raised when the key set could not be fetched.'''
+
+
+'''
+JWKSCache
+    key provider for the signing keys published at a JWKS url, e.g. by Auth0,
+    cached and keyed by key id (kid)
+
+    keys are kept for the max-age sent in the response Cache-Control header
+    shortly before they expire they are refreshed on a background thread while
+    the cached keys keep being served, so a slow or failing identity provider
+    does not block requests
+    an unknown kid triggers one blocking re-fetch, at most once per
+    min_refetch_interval seconds
+    failed fetches count against min_refetch_interval too, so while the
+    provider is down requests without cached keys fail fast with
+    JWKSUnavailable instead of each waiting out the timeout
+
+    get_key_async() is the coroutine version for async servers, the fetch runs
+    on a worker thread and all coroutines waiting for keys share one fetch
+    threads blocked in get_key() share fetches too, they wait on the lock and
+    reuse the keys fetched while they waited, which also holds under gevent
+'''
+class JWKSCache(KeyProvider):
+    def __init__(self, url, default_max_age=600, min_refetch_interval=30,
+                 refresh_ahead=60, timeout=5, opener=urlopen):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refetch_interval = min_refetch_interval
+        self.refresh_ahead = refresh_ahead
+        self.timeout = timeout
+        self.opener = opener
+        self.fetch_count = 0
+
+        self._keys = {}
+        self._expires_at = 0
+        self._last_fetch = None
+        self._last_attempt = None
+        self._last_error = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._inflight = None
+        self._inflight_lock = threading.Lock()
+        self._executor = None
+
+    def get_key(self, kid):
+        '''Returns the parsed key for kid, or None if the provider does not publish it.'''
+        if self._last_fetch is None:
+            self._check_retry_allowed()
+            self.refresh()
+
+        key, refetch = self._lookup(kid)
+        if refetch:
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def get_key_async(self, kid):
+        '''Like get_key, without blocking the event loop while keys are fetched.'''
+        if self._last_fetch is None:
+            self._check_retry_allowed()
+            await self.refresh_async()
+
+        key, refetch = self._lookup(kid)
+        if refetch:
+            await self.refresh_async()
+            key = self._keys.get(kid)
+        return key
+
+    def _failed_recently(self, now):
+        '''Whether the last fetch failed less than min_refetch_interval ago.'''
+        return self._last_error is not None and now - self._last_attempt < self.min_refetch_interval
+
+    def _check_retry_allowed(self):
+        if self._failed_recently(time.monotonic()):
+            raise JWKSUnavailable('Fetching {} failed: {}'.format(self.url, self._last_error))
+
+    def _lookup(self, kid):
+        '''Returns the cached key for kid and whether it is worth re-fetching the keys.'''
+        now = time.monotonic()
+        may_refetch = now - self._last_fetch >= self.min_refetch_interval and not self._failed_recently(now)
+        if now >= self._expires_at - self.refresh_ahead and may_refetch:
+            self.refresh_in_background()
+
+        key = self._keys.get(kid)
+        # The provider may have rotated its keys since the last fetch
+        return key, key is None and may_refetch
+
+    def refresh(self):
+        '''Fetches the key set, callers waiting on the lock reuse the result.'''
+        started = time.monotonic()
+        with self._lock:
+            if self._last_attempt is not None and self._last_attempt >= started:
+                if self._last_error is not None:
+                    raise JWKSUnavailable('Fetching {} failed: {}'.format(self.url, self._last_error))
+                return
+            try:
+                response = self.opener(self.url, timeout=self.timeout)
+                jwks = json.loads(response.read())
+            except Exception as e:
+                self._last_error = e
+                raise
+            else:
+                self._last_error = None
+            finally:
+                # When it ended, so callers that waited on the lock see it
+                self._last_attempt = time.monotonic()
+            max_age = parse_max_age(response.headers.get('Cache-Control'), self.default_max_age)
+
+            # Keys are parsed here, once per fetch, not per verified token
+            self._keys = parse_jwks(jwks)
+            self.fetch_count += 1
+            self._last_fetch = time.monotonic()
+            self._expires_at = self._last_fetch + max_age
+
+    def refresh_async(self):
+        '''Awaitable refresh, callers arriving while a fetch runs await that same fetch.'''
+        with self._inflight_lock:
+            if self._inflight is None or self._inflight.done():
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jwks')
+                self._inflight = self._executor.submit(self.refresh)
+            return asyncio.wrap_future(self._inflight)
+
+    def refresh_in_background(self):
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._background_refresh, daemon=True)
+        self._refresh_thread.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the cached keys, retry once min_refetch_interval has passed
+            logger.warning('JWKS refresh failed: %s', e)
+            self._expires_at = time.monotonic() + self.min_refetch_interval + self.refresh_ahead
+
+
+def parse_max_age(cache_control, default):
+    '''Reads max-age from a Cache-Control header, no-cache/no-store mean 0.'''
+    if not cache_control:
+        return default
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else default
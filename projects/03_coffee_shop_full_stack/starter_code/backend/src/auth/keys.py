@@ -0,0 +1,107 @@
+import json
+import os
+
+from jose import jwk
+
+
+'''
+KeyProvider
+    source of the public keys that verify token signatures, looked up by key id (kid)
+
+    providers parse every key into a jose Key, which holds the ready-to-use
+    RSA public key object, when the keys are loaded, so verifying a token
+    never builds a key
+    get_key(kid) returns that Key, or None if the provider has no key for kid
+    get_key_async(kid) is the same for coroutines, providers that fetch keys
+    over the network override it so the event loop is not blocked
+'''
+class KeyProvider:
+    def get_key(self, kid):
+        raise NotImplementedError
+
+    async def get_key_async(self, kid):
+        return self.get_key(kid)
+
+
+'''
+construct_key(key_data)
+    parses a JWK dict or a PEM public key or certificate into an RS256 jose Key
+'''
+def construct_key(key_data):
+    return jwk.construct(key_data, 'RS256')
+
+
+'''
+parse_jwks(jwks)
+    maps kid to parsed Key for the RSA signing keys of a JWKS document,
+    a single JWK is accepted as well, other key types are skipped
+'''
+def parse_jwks(jwks):
+    keys = jwks.get('keys', [jwks] if 'kty' in jwks else [])
+    return {
+        key['kid']: construct_key(key)
+        for key in keys
+        if 'kid' in key and key.get('kty') == 'RSA' and key.get('use', 'sig') == 'sig'
+    }
+
+
+'''
+InMemoryKeyProvider
+    keys handed over directly, for tests and load tests
+    keys maps kid to a JWK dict, a PEM string or an already built Key
+'''
+class InMemoryKeyProvider(KeyProvider):
+    def __init__(self, keys=None):
+        self._keys = {}
+        for kid, key in (keys or {}).items():
+            self.add_key(kid, key)
+
+    def add_key(self, kid, key):
+        self._keys[kid] = key if isinstance(key, jwk.Key) else construct_key(key)
+
+    def remove_key(self, kid):
+        self._keys.pop(kid, None)
+
+    def get_key(self, kid):
+        return self._keys.get(kid)
+
+
+'''
+FileKeyProvider
+    keys read from the local filesystem, for air-gapped environments
+
+    path is a JWKS json file, a PEM file or a directory of them
+    a PEM file holds one public key or certificate whose kid is the file
+    name without its extension, e.g. keys/staging-2021.pem has kid staging-2021
+    reload() reads the files again, e.g. after a key rotation
+'''
+class FileKeyProvider(KeyProvider):
+    def __init__(self, path):
+        self.path = path
+        self._keys = {}
+        self.reload()
+
+    def reload(self):
+        if os.path.isdir(self.path):
+            paths = sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path)
+                if name.endswith(('.json', '.pem')))
+        else:
+            paths = [self.path]
+
+        keys = {}
+        for path in paths:
+            keys.update(self.load_file(path))
+        self._keys = keys
+
+    @staticmethod
+    def load_file(path):
+        with open(path, encoding='utf-8') as f:
+            contents = f.read()
+        if contents.lstrip().startswith('{'):
+            return parse_jwks(json.loads(contents))
+        kid = os.path.splitext(os.path.basename(path))[0]
+        return {kid: construct_key(contents)}
+
+    def get_key(self, kid):
+        return self._keys.get(kid)
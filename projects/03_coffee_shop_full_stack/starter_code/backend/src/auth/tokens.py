@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+'''
+Claims
+    decoded jwt payload with its permissions compiled into a frozenset once per
+    token, so permission checks are set operations instead of list scans
+    permission_set is None when the payload has no permissions field
+'''
+class Claims(dict):
+    __slots__ = ('permission_set',)
+
+    def __init__(self, payload):
+        super().__init__(payload)
+        permissions = payload.get('permissions')
+        self.permission_set = frozenset(permissions) if permissions is not None else None
+
+
+'''
+VerifiedTokenCache
+    bounded LRU of tokens that already passed signature and claims checks,
+    mapping a digest of the token to its decoded payload
+
+    entries expire at the token's own exp claim, tokens without exp are not cached
+    cached payloads are shared between requests and must be treated as read-only
+'''
+class VerifiedTokenCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token):
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        return hashlib.sha256(token).digest()
+
+    def get(self, token):
+        '''Returns the cached payload for token, or None if missing or expired.'''
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, token, payload):
+        expires_at = payload.get('exp')
+        if not isinstance(expires_at, (int, float)):
+            return
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,61 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+'''
+SQLite engine profile
+    journal_mode=WAL lets readers run while a writer commits
+    synchronous=NORMAL only syncs at checkpoints, which is safe with WAL
+    mmap_size reads pages through a memory map instead of read() calls
+    busy_timeout makes a writer wait for the lock instead of failing
+    with "database is locked"
+'''
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('busy_timeout', 5000),
+)
+
+# Prepared statements kept per connection by the sqlite3 module (default 100)
+SQLITE_CACHED_STATEMENTS = 256
+
+# Connections kept open per process, so the pragmas and statement cache survive requests
+SQLITE_POOL_SIZE = 5
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute('PRAGMA {}={}'.format(name, value))
+    cursor.close()
+
+
+'''
+ProfiledSQLAlchemy
+    SQLAlchemy that applies the sqlite profile above to sqlite databases
+    set SQLITE_ENGINE_PROFILE = False in the app config to get the defaults
+
+    sqlalchemy opens a new connection per checkout for sqlite files,
+    here they are pooled instead so each connection is set up once
+'''
+class ProfiledSQLAlchemy(SQLAlchemy):
+    def apply_driver_hacks(self, app, sa_url, options):
+        if sa_url.drivername == 'sqlite' and app.config.get('SQLITE_ENGINE_PROFILE', True):
+            connect_args = options.setdefault('connect_args', {})
+            connect_args.setdefault('cached_statements', SQLITE_CACHED_STATEMENTS)
+            if sa_url.database not in (None, '', ':memory:'):
+                options.setdefault('poolclass', QueuePool)
+                options.setdefault('pool_size', SQLITE_POOL_SIZE)
+                # Pooled connections are handed between threads, one at a time
+                connect_args.setdefault('check_same_thread', False)
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        # apply_driver_hacks only sets cached_statements when the profile is enabled
+        profiled = 'cached_statements' in engine_opts.get('connect_args', {})
+        if engine.dialect.name == 'sqlite' and profiled:
+            event.listen(engine, 'connect', set_sqlite_pragmas)
+        return engine
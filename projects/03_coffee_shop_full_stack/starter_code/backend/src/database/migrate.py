@@ -0,0 +1,116 @@
+'''
+Migrates an existing drink table from the recipe String(180) column to the
+JSON recipe and recipe_short columns, and creates the menu_version table.
+
+    python -m src.database.migrate [DATABASE_URL]
+
+Without an argument the bundled sqlite database is migrated. Running it
+again on a migrated database does nothing.
+'''
+import json
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, inspect, text
+
+from .models import MenuVersion, database_path, short_recipe
+
+
+'''
+ddl_transaction(connection)
+    runs the block in a transaction, committed at the end or rolled back on error
+    pysqlite commits on its own before DDL statements, so on sqlite the driver's
+    transaction handling is turned off and BEGIN is issued explicitly
+'''
+@contextmanager
+def ddl_transaction(connection):
+    if connection.dialect.name != 'sqlite':
+        with connection.begin():
+            yield
+        return
+
+    dbapi_connection = connection.connection
+    isolation_level = dbapi_connection.isolation_level
+    dbapi_connection.isolation_level = None
+    try:
+        with connection.begin():
+            connection.execute(text('BEGIN'))
+            yield
+    finally:
+        dbapi_connection.isolation_level = isolation_level
+
+
+'''
+migrate_recipe_to_json(engine)
+    sqlite cannot change a column type in place, so the table is rebuilt
+    with the new schema and the rows are copied over
+    other databases convert the column with ALTER TABLE
+    every recipe is parsed before the schema is touched, and the whole
+    migration runs in one transaction, so a bad row leaves the table as it was
+    returns the number of rows backfilled, or None if already migrated
+    raises ValueError naming the drink if a recipe cannot be parsed
+'''
+
+
+def migrate_recipe_to_json(engine):
+    columns = {column['name'] for column in inspect(engine).get_columns('drink')}
+    if 'recipe_short' in columns:
+        return None
+
+    with engine.connect() as connection, ddl_transaction(connection):
+        rows = connection.execute(text('SELECT id, title, recipe FROM drink')).fetchall()
+
+        params = []
+        for id, title, recipe in rows:
+            try:
+                parsed = json.loads(recipe)
+                recipe_short = short_recipe(parsed)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError('drink {} has an invalid recipe: {}'.format(id, e)) from e
+            params.append({
+                'id': id,
+                'title': title,
+                'recipe': json.dumps(parsed),
+                'recipe_short': json.dumps(recipe_short)
+            })
+
+        if engine.dialect.name == 'sqlite':
+            connection.execute(text('ALTER TABLE drink RENAME TO drink_old'))
+            connection.execute(text(
+                'CREATE TABLE drink ('
+                'id INTEGER NOT NULL, '
+                'title VARCHAR(80), '
+                'recipe JSON NOT NULL, '
+                'recipe_short JSON NOT NULL, '
+                'PRIMARY KEY (id), '
+                'UNIQUE (title))'))
+            connection.execute(text('DROP TABLE drink_old'))
+            statement = text(
+                'INSERT INTO drink (id, title, recipe, recipe_short) '
+                'VALUES (:id, :title, :recipe, :recipe_short)')
+        else:
+            connection.execute(text('ALTER TABLE drink ALTER COLUMN recipe TYPE JSON USING recipe::json'))
+            connection.execute(text('ALTER TABLE drink ADD COLUMN recipe_short JSON'))
+            statement = text('UPDATE drink SET recipe_short = :recipe_short WHERE id = :id')
+
+        if params:
+            connection.execute(statement, params)
+
+        if engine.dialect.name != 'sqlite':
+            connection.execute(text('ALTER TABLE drink ALTER COLUMN recipe_short SET NOT NULL'))
+
+    return len(rows)
+
+
+if __name__ == '__main__':
+    url = sys.argv[1] if len(sys.argv) > 1 else database_path
+    engine = create_engine(url)
+    try:
+        migrated = migrate_recipe_to_json(engine)
+    except ValueError as e:
+        sys.exit('migration aborted, nothing was changed: {}'.format(e))
+    MenuVersion.__table__.create(engine, checkfirst=True)
+    if migrated is None:
+        print('drink table is already migrated')
+    else:
+        print('migrated {} drinks'.format(migrated))
@@ -1,13 +1,15 @@
 import os
-from sqlalchemy import Column, String, Integer
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Column, String, Integer, JSON
+from sqlalchemy.orm import validates
 import json
 
+from .engine import ProfiledSQLAlchemy
+
 database_filename = "database.db"
 project_dir = os.path.dirname(os.path.abspath(__file__))
 database_path = "sqlite:///{}".format(os.path.join(project_dir, database_filename))
 
-db = SQLAlchemy()
+db = ProfiledSQLAlchemy()
 
 '''
 setup_db(app)
@@ -36,12 +38,33 @@ def db_drop_and_create_all():
     # add one demo row which is helping in POSTMAN test
     drink = Drink(
         title='water',
-        recipe='[{"name": "water", "color": "blue", "parts": 1}]'
+        recipe=[{'name': 'water', 'color': 'blue', 'parts': 1}]
     )
     drink.insert()
 
+'''
+short_recipe(recipe)
+    projects a parsed recipe onto the fields shown in the short form
+'''
+
+
+def short_recipe(recipe):
+    return [{'color': r['color'], 'parts': r['parts']} for r in recipe]
+
+'''
+prefix_upper_bound(prefix)
+    smallest string greater than every string starting with prefix
+'''
+
+
+def prefix_upper_bound(prefix):
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
 # ROUTES
 
+# Fields of the short drink representation, in response order
+SHORT_FIELDS = ('id', 'title', 'recipe')
+
 '''
 Drink
 a persistent drink entity, extends the base SQLAlchemy Model
@@ -53,9 +76,25 @@ class Drink(db.Model):
     id = Column(Integer().with_variant(Integer, "sqlite"), primary_key=True)
     # String Title
     title = Column(String(80), unique=True)
-    # the ingredients blob - this stores a lazy json blob
+    # the ingredients blob - stored as json and parsed once when the row is loaded
     # the required datatype is [{'color': string, 'name':string, 'parts':number}]
-    recipe = Column(String(180), nullable=False)
+    recipe = Column(JSON, nullable=False)
+    # denormalized short form of recipe, kept in sync by set_recipe()
+    # the datatype is [{'color': string, 'parts':number}]
+    recipe_short = Column(JSON, nullable=False)
+
+    '''
+    set_recipe()
+        parses recipes given as json text and derives recipe_short
+        runs whenever recipe is assigned, so both columns are written together
+    '''
+
+    @validates('recipe')
+    def set_recipe(self, key, recipe):
+        if isinstance(recipe, (str, bytes)):
+            recipe = json.loads(recipe)
+        self.recipe_short = short_recipe(recipe)
+        return recipe
 
     '''
     short()
@@ -63,12 +102,10 @@ class Drink(db.Model):
     '''
 
     def short(self):
-        print(json.loads(self.recipe))
-        short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
         return {
             'id': self.id,
             'title': self.title,
-            'recipe': short_recipe
+            'recipe': self.recipe_short
         }
 
     '''
@@ -80,9 +117,49 @@ class Drink(db.Model):
         return {
             'id': self.id,
             'title': self.title,
-            'recipe': json.loads(self.recipe)
+            'recipe': self.recipe
         }
 
+    '''
+    all_short()
+        short form of every drink, read from the id, title and recipe_short
+        columns only so the full recipes are never loaded
+    '''
+
+    @classmethod
+    def all_short(cls):
+        return cls.list_short()
+
+    '''
+    list_short(fields, title_prefix, after, limit)
+        short form of the drinks ordered by id, reading only the requested fields
+        title_prefix keeps titles starting with it (case sensitive), as a range
+            on title so the unique index on title is used
+        after and limit return the drinks with an id greater than after, at most limit of them
+    '''
+
+    @classmethod
+    def list_short(cls, fields=SHORT_FIELDS, title_prefix=None, after=None, limit=None):
+        columns = {'id': cls.id, 'title': cls.title, 'recipe': cls.recipe_short}
+        query = db.session.query(*[columns[field] for field in fields]).order_by(cls.id)
+        if title_prefix:
+            query = query.filter(cls.title >= title_prefix, cls.title < prefix_upper_bound(title_prefix))
+        if after is not None:
+            query = query.filter(cls.id > after)
+        if limit is not None:
+            query = query.limit(limit)
+        return [dict(zip(fields, row)) for row in query]
+
+    '''
+    all_long()
+        long form of every drink, read from the id, title and recipe columns
+    '''
+
+    @classmethod
+    def all_long(cls):
+        rows = db.session.query(cls.id, cls.title, cls.recipe).order_by(cls.id)
+        return [{'id': id, 'title': title, 'recipe': recipe} for id, title, recipe in rows]
+
     '''
     insert()
         inserts a new model into a database
@@ -95,6 +172,7 @@ class Drink(db.Model):
 
     def insert(self):
         db.session.add(self)
+        bump_menu_version()
         db.session.commit()
 
     '''
@@ -108,6 +186,7 @@ class Drink(db.Model):
 
     def delete(self):
         db.session.delete(self)
+        bump_menu_version()
         db.session.commit()
 
     '''
@@ -121,7 +200,50 @@ class Drink(db.Model):
     '''
 
     def update(self):
+        bump_menu_version()
         db.session.commit()
 
     def __repr__(self):
         return json.dumps(self.short())
+
+
+'''
+MenuVersion
+a single row counter that is incremented by every write to the drink table
+response caches in any worker process compare it with the version their
+snapshot was built from, so they never serve a menu older than the last commit
+'''
+
+
+class MenuVersion(db.Model):
+    __tablename__ = 'menu_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+'''
+get_menu_version()
+    returns the current menu version, 0 if nothing has been written yet
+'''
+
+
+def get_menu_version():
+    version = db.session.query(MenuVersion.version).filter(MenuVersion.id == 1).scalar()
+    return version or 0
+
+
+'''
+bump_menu_version()
+    increments the menu version in the current transaction, so the new
+    version becomes visible together with the drink changes on commit
+    the increment is done by the database to stay correct across processes
+'''
+
+
+def bump_menu_version():
+    table = MenuVersion.__table__
+    result = db.session.execute(
+        table.update().where(table.c.id == 1).values(version=table.c.version + 1))
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(id=1, version=1))
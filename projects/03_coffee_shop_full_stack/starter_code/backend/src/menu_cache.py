@@ -0,0 +1,52 @@
+import json
+import threading
+
+from flask import Response, request
+
+from .database.models import get_menu_version
+
+
+'''
+MenuCache
+    keeps the serialized json body of each menu listing together with the
+    menu version it was built from
+
+    every lookup reads the shared version row, a single primary key select,
+    and only rebuilds the listing when the version has moved on
+    the bodies are stored as bytes, so a hit does no serialization at all
+'''
+class MenuCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        '''Returns (version, body) for key, calling build() to serialize a stale listing.'''
+        version = get_menu_version()
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot[0] == version:
+            self.hits += 1
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None or snapshot[0] != version:
+                self.misses += 1
+                body = json.dumps(build(), separators=(',', ':')).encode('utf-8')
+                snapshot = (version, body)
+                self._snapshots[key] = snapshot
+            return snapshot
+
+    def respond(self, key, build, cache_control='no-cache'):
+        '''Serves the cached listing for key, answering 304 when the client's ETag is current.'''
+        version, body = self.get(key, build)
+        response = Response(body, mimetype='application/json')
+        response.set_etag('{}-{}'.format(key, version))
+        response.headers['Cache-Control'] = cache_control
+        return response.make_conditional(request)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
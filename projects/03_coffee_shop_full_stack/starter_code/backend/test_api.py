@@ -0,0 +1,148 @@
+import json
+import unittest
+
+from src import api
+from src.auth import auth
+from src.auth.jwks import JWKSCache
+from src.auth.tokens import VerifiedTokenCache
+from src.database.models import db, Drink
+from test_auth import StubJWKSServer, make_key, make_token
+
+# Keep the bundled database untouched, the engine is created on first use
+api.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+
+
+class MenuCacheTestCase(unittest.TestCase):
+    """This class represents the /drinks response cache test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_pem, cls.public_jwk = make_key('key-1')
+
+    def setUp(self):
+        self.stub = StubJWKSServer([self.public_jwk])
+        self.original_cache = auth.key_provider
+        self.original_token_cache = auth.token_cache
+        auth.key_provider = JWKSCache(self.stub.url)
+        auth.token_cache = VerifiedTokenCache()
+
+        self.client = api.app.test_client()
+        with api.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Drink(title='water', recipe=[{'name': 'water', 'color': 'blue', 'parts': 1}]).insert()
+        api.menu_cache = api.MenuCache()
+
+        token = make_token(self.private_pem, 'key-1', permissions=['get:drinks-detail', 'post:drinks'])
+        self.headers = {'Authorization': 'Bearer ' + token}
+
+    def tearDown(self):
+        auth.key_provider = self.original_cache
+        auth.token_cache = self.original_token_cache
+        self.stub.close()
+
+    def test_repeated_get_served_from_cache(self):
+        first = self.client.get('/drinks')
+        second = self.client.get('/drinks')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(json.loads(first.data)['drinks'][0]['recipe'], [{'color': 'blue', 'parts': 1}])
+        self.assertEqual(api.menu_cache.misses, 1)
+        self.assertEqual(api.menu_cache.hits, 1)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get('/drinks').headers['ETag']
+        res = self.client.get('/drinks', headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    def test_create_drink_invalidates_listings(self):
+        etag = self.client.get('/drinks').headers['ETag']
+        self.client.get('/drinks-detail', headers=self.headers)
+
+        res = self.client.post('/drinks', headers=self.headers, data=json.dumps({
+            'title': 'latte',
+            'recipe': [{'name': 'milk', 'color': 'white', 'parts': 2}]
+        }))
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.get('/drinks', headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([d['title'] for d in json.loads(res.data)['drinks']], ['water', 'latte'])
+        detail = json.loads(self.client.get('/drinks-detail', headers=self.headers).data)
+        self.assertEqual(detail['drinks'][1]['recipe'], [{'name': 'milk', 'color': 'white', 'parts': 2}])
+
+    def test_write_from_another_worker_invalidates(self):
+        self.client.get('/drinks')
+        # Another process commits through its own connection
+        with api.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute("INSERT INTO drink (title, recipe, recipe_short) VALUES ('tea', '[]', '[]')")
+                connection.execute('UPDATE menu_version SET version = version + 1')
+
+        drinks = json.loads(self.client.get('/drinks').data)['drinks']
+        self.assertEqual([d['title'] for d in drinks], ['water', 'tea'])
+        self.assertEqual(api.menu_cache.misses, 2)
+
+
+class DrinksListingTestCase(unittest.TestCase):
+    """This class represents the /drinks pagination and filtering test case"""
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        with api.app.app_context():
+            db.drop_all()
+            db.create_all()
+            for title in ('americano', 'latte', 'lemonade', 'mocha', 'water'):
+                Drink(title=title, recipe=[{'name': title, 'color': 'brown', 'parts': 1}]).insert()
+        api.menu_cache = api.MenuCache()
+
+    def get_drinks(self, query):
+        res = self.client.get('/drinks?' + query)
+        return res.status_code, json.loads(res.data)
+
+    def test_no_parameters_returns_every_drink(self):
+        status, body = self.get_drinks('')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body['drinks']), 5)
+        self.assertNotIn('next_cursor', body)
+
+    def test_cursor_pagination(self):
+        status, body = self.get_drinks('limit=2')
+        self.assertEqual([d['title'] for d in body['drinks']], ['americano', 'latte'])
+
+        titles = []
+        while body['next_cursor'] is not None:
+            status, body = self.get_drinks('limit=2&cursor={}'.format(body['next_cursor']))
+            titles += [d['title'] for d in body['drinks']]
+        self.assertEqual(titles, ['lemonade', 'mocha', 'water'])
+
+    def test_title_prefix(self):
+        status, body = self.get_drinks('title_prefix=l')
+        self.assertEqual([d['title'] for d in body['drinks']], ['latte', 'lemonade'])
+
+        status, body = self.get_drinks('title_prefix=le&limit=1')
+        self.assertEqual([d['title'] for d in body['drinks']], ['lemonade'])
+        self.assertIsNone(body['next_cursor'])
+
+    def test_field_selection(self):
+        status, body = self.get_drinks('fields=title&limit=1')
+
+        self.assertEqual(body['drinks'], [{'title': 'americano'}])
+        self.assertIsNotNone(body['next_cursor'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get_drinks('fields=title,price')[0], 400)
+        self.assertEqual(self.get_drinks('limit=1000')[0], 400)
+        self.assertEqual(self.get_drinks('limit=abc')[0], 400)
+        self.assertEqual(self.get_drinks('cursor=abc')[0], 400)
+        self.assertEqual(self.get_drinks('limit=2&cursor=')[0], 400)
+        self.assertEqual(self.get_drinks('cursor=-1')[0], 400)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
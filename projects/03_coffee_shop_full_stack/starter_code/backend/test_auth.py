@@ -0,0 +1,450 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from Crypto.PublicKey import RSA
+from flask import Flask
+from jose import jwk, jwt
+
+from src.auth import auth
+from src.auth.auth import (AuthError, check_permissions, requires_auth, requires_auth_async,
+                           verify_decode_jwt, verify_decode_jwt_async)
+from src.auth.jwks import JWKSCache, parse_max_age
+from src.auth.keys import FileKeyProvider, InMemoryKeyProvider
+from src.auth.tokens import Claims, VerifiedTokenCache
+
+
+def make_key(kid):
+    '''Returns a private PEM and its public JWK for signing test tokens.'''
+    private_key = RSA.generate(2048)
+    public_jwk = jwk.construct(private_key.publickey().export_key().decode(), 'RS256').to_dict()
+    public_jwk.update({'kid': kid, 'use': 'sig'})
+    return private_key.export_key().decode(), public_jwk
+
+
+def make_token(private_pem, kid, permissions=(), expires_in=3600):
+    claims = {
+        'iss': 'https://{}/'.format(auth.AUTH0_DOMAIN),
+        'aud': auth.API_AUDIENCE,
+        'sub': 'auth0|tester',
+        'exp': int(time.time()) + expires_in,
+        'permissions': list(permissions)
+    }
+    return jwt.encode(claims, private_pem, algorithm='RS256', headers={'kid': kid})
+
+
+class StubJWKSServer:
+    '''Serves a JWKS document on localhost and counts the requests it receives.'''
+
+    def __init__(self, keys, cache_control='max-age=600'):
+        self.keys = keys
+        self.cache_control = cache_control
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                body = json.dumps({'keys': stub.keys}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', stub.cache_control)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/.well-known/jwks.json'.format(self.server.server_port)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JWKSCacheTestCase(unittest.TestCase):
+    """This class represents the JWKS cache test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_pem, cls.public_jwk = make_key('key-1')
+        cls.rotated_pem, cls.rotated_jwk = make_key('key-2')
+
+    def setUp(self):
+        self.stub = StubJWKSServer([self.public_jwk])
+        self.original_cache = auth.key_provider
+        self.original_token_cache = auth.token_cache
+        auth.key_provider = JWKSCache(self.stub.url, min_refetch_interval=0)
+        # Verify every token so each call goes through the key cache
+        auth.token_cache = VerifiedTokenCache(maxsize=0)
+
+    def tearDown(self):
+        auth.key_provider = self.original_cache
+        auth.token_cache = self.original_token_cache
+        self.stub.close()
+
+    def test_keys_fetched_once(self):
+        token = make_token(self.private_pem, 'key-1')
+        for _ in range(5):
+            payload = verify_decode_jwt(token)
+
+        self.assertEqual(payload['sub'], 'auth0|tester')
+        self.assertEqual(self.stub.hits, 1)
+
+    def test_unknown_kid_refetches_after_rotation(self):
+        verify_decode_jwt(make_token(self.private_pem, 'key-1'))
+        self.stub.keys = [self.public_jwk, self.rotated_jwk]
+
+        payload = verify_decode_jwt(make_token(self.rotated_pem, 'key-2'))
+
+        self.assertEqual(payload['sub'], 'auth0|tester')
+        self.assertEqual(self.stub.hits, 2)
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        auth.key_provider.min_refetch_interval = 60
+        verify_decode_jwt(make_token(self.private_pem, 'key-1'))
+
+        for _ in range(3):
+            with self.assertRaises(AuthError) as cm:
+                verify_decode_jwt(make_token(self.rotated_pem, 'key-2'))
+            self.assertEqual(cm.exception.error['code'], 'invalid_header')
+        self.assertEqual(self.stub.hits, 1)
+
+    def test_expired_keys_refresh_in_background(self):
+        self.stub.cache_control = 'max-age=0'
+        auth.key_provider.refresh_ahead = 0
+        token = make_token(self.private_pem, 'key-1')
+        verify_decode_jwt(token)
+
+        # Stale keys are served while the refresh runs
+        verify_decode_jwt(token)
+        auth.key_provider._refresh_thread.join(timeout=5)
+        self.assertEqual(self.stub.hits, 2)
+
+    def test_stale_keys_served_when_provider_is_down(self):
+        self.stub.cache_control = 'max-age=0'
+        auth.key_provider.refresh_ahead = 0
+        token = make_token(self.private_pem, 'key-1')
+        verify_decode_jwt(token)
+        self.stub.close()
+
+        payload = verify_decode_jwt(token)
+        auth.key_provider._refresh_thread.join(timeout=5)
+
+        self.assertEqual(payload['sub'], 'auth0|tester')
+        self.assertEqual(verify_decode_jwt(token)['sub'], 'auth0|tester')
+
+    def test_unreachable_provider_returns_503(self):
+        self.stub.close()
+        auth.key_provider = JWKSCache(self.stub.url, timeout=1)
+
+        with self.assertRaises(AuthError) as cm:
+            verify_decode_jwt(make_token(self.private_pem, 'key-1'))
+        self.assertEqual(cm.exception.status_code, 503)
+
+    def test_failed_first_fetch_is_rate_limited(self):
+        self.stub.close()
+        auth.key_provider = JWKSCache(self.stub.url, timeout=1)
+        token = make_token(self.private_pem, 'key-1')
+        with self.assertRaises(AuthError):
+            verify_decode_jwt(token)
+
+        self.stub = StubJWKSServer([self.public_jwk])
+        auth.key_provider.url = self.stub.url
+        for _ in range(3):
+            with self.assertRaises(AuthError) as cm:
+                verify_decode_jwt(token)
+            self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(self.stub.hits, 0)
+
+        # Retried once min_refetch_interval has passed
+        auth.key_provider._last_attempt -= 30
+        self.assertEqual(verify_decode_jwt(token)['sub'], 'auth0|tester')
+        self.assertEqual(self.stub.hits, 1)
+
+    def test_failed_refresh_is_logged(self):
+        self.stub.cache_control = 'max-age=0'
+        auth.key_provider.refresh_ahead = 0
+        token = make_token(self.private_pem, 'key-1')
+        verify_decode_jwt(token)
+        self.stub.close()
+
+        with self.assertLogs('src.auth.jwks', level='WARNING') as logs:
+            verify_decode_jwt(token)
+            auth.key_provider._refresh_thread.join(timeout=5)
+        self.assertIn('JWKS refresh failed', logs.output[0])
+
+    def test_parse_max_age(self):
+        self.assertEqual(parse_max_age('public, max-age=15', 600), 15)
+        self.assertEqual(parse_max_age('no-store', 600), 0)
+        self.assertEqual(parse_max_age(None, 600), 600)
+
+
+class VerifiedTokenCacheTestCase(unittest.TestCase):
+    """This class represents the verified token cache test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_pem, cls.public_jwk = make_key('key-1')
+
+    def setUp(self):
+        self.stub = StubJWKSServer([self.public_jwk])
+        self.original_cache = auth.key_provider
+        self.original_token_cache = auth.token_cache
+        auth.key_provider = JWKSCache(self.stub.url)
+        auth.token_cache = VerifiedTokenCache(maxsize=2)
+
+    def tearDown(self):
+        auth.key_provider = self.original_cache
+        auth.token_cache = self.original_token_cache
+        self.stub.close()
+
+    def test_repeated_token_verified_once(self):
+        token = make_token(self.private_pem, 'key-1', permissions=['get:drinks-detail'])
+        first = verify_decode_jwt(token)
+        second = verify_decode_jwt(token)
+
+        self.assertIs(first, second)
+        self.assertEqual(auth.token_cache.hits, 1)
+
+    def test_cached_token_expires_at_exp(self):
+        auth.token_cache.put('token', {'exp': time.time() + 0.1})
+        self.assertIsNotNone(auth.token_cache.get('token'))
+        time.sleep(0.2)
+
+        self.assertIsNone(auth.token_cache.get('token'))
+        self.assertEqual(len(auth.token_cache), 0)
+
+    def test_token_without_exp_not_cached(self):
+        auth.token_cache.put('token', {'sub': 'auth0|tester'})
+        self.assertIsNone(auth.token_cache.get('token'))
+
+    def test_cache_is_bounded(self):
+        tokens = [make_token(self.private_pem, 'key-1', expires_in=3600 + i) for i in range(3)]
+        for token in tokens:
+            verify_decode_jwt(token)
+
+        self.assertEqual(len(auth.token_cache), 2)
+        self.assertIsNone(auth.token_cache.get(tokens[0]))
+
+    def test_invalid_token_not_cached(self):
+        token = make_token(self.private_pem, 'key-1')
+        tampered = token[:-4] + ('AAAA' if not token.endswith('AAAA') else 'BBBB')
+
+        with self.assertRaises(AuthError):
+            verify_decode_jwt(tampered)
+        self.assertEqual(len(auth.token_cache), 0)
+
+
+class KeyProviderTestCase(unittest.TestCase):
+    """This class represents the key provider test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_pem, cls.public_jwk = make_key('key-1')
+        cls.public_pem = RSA.import_key(cls.private_pem).publickey().export_key().decode()
+
+    def setUp(self):
+        self.original_provider = auth.key_provider
+        self.original_token_cache = auth.token_cache
+        auth.token_cache = VerifiedTokenCache(maxsize=0)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        auth.key_provider = self.original_provider
+        auth.token_cache = self.original_token_cache
+        self.directory.cleanup()
+
+    def write(self, name, contents):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+    def test_in_memory_provider(self):
+        auth.key_provider = InMemoryKeyProvider({'key-1': self.public_jwk})
+
+        payload = verify_decode_jwt(make_token(self.private_pem, 'key-1'))
+        self.assertEqual(payload['sub'], 'auth0|tester')
+
+        auth.key_provider.remove_key('key-1')
+        with self.assertRaises(AuthError) as cm:
+            verify_decode_jwt(make_token(self.private_pem, 'key-1'))
+        self.assertEqual(cm.exception.error['code'], 'invalid_header')
+
+    def test_file_provider_reads_jwks(self):
+        path = self.write('jwks.json', json.dumps({'keys': [self.public_jwk]}))
+        auth.key_provider = FileKeyProvider(path)
+
+        payload = verify_decode_jwt(make_token(self.private_pem, 'key-1'))
+        self.assertEqual(payload['sub'], 'auth0|tester')
+
+    def test_file_provider_reads_pem_directory(self):
+        self.write('staging.pem', self.public_pem)
+        self.write('notes.txt', 'not a key')
+        auth.key_provider = FileKeyProvider(self.directory.name)
+
+        payload = verify_decode_jwt(make_token(self.private_pem, 'staging'))
+        self.assertEqual(payload['sub'], 'auth0|tester')
+        self.assertIsNone(auth.key_provider.get_key('notes'))
+
+    def test_keys_parsed_once_at_load(self):
+        provider = FileKeyProvider(self.write('jwks.json', json.dumps({'keys': [self.public_jwk]})))
+
+        key = provider.get_key('key-1')
+        self.assertIsInstance(key, jwk.Key)
+        self.assertIs(provider.get_key('key-1'), key)
+
+
+class AsyncVerificationTestCase(unittest.TestCase):
+    """This class represents the async verification and single-flight fetch test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_pem, cls.public_jwk = make_key('key-1')
+        cls.rotated_pem, cls.rotated_jwk = make_key('key-2')
+
+    def setUp(self):
+        self.stub = StubJWKSServer([self.public_jwk])
+        self.original_provider = auth.key_provider
+        self.original_token_cache = auth.token_cache
+        auth.key_provider = JWKSCache(self.stub.url, min_refetch_interval=0)
+        auth.token_cache = VerifiedTokenCache(maxsize=0)
+
+    def tearDown(self):
+        auth.key_provider = self.original_provider
+        auth.token_cache = self.original_token_cache
+        self.stub.close()
+
+    def test_verify_async(self):
+        payload = asyncio.run(verify_decode_jwt_async(make_token(self.private_pem, 'key-1')))
+        self.assertEqual(payload['sub'], 'auth0|tester')
+
+    def test_unknown_kid_burst_fetches_once(self):
+        asyncio.run(verify_decode_jwt_async(make_token(self.private_pem, 'key-1')))
+        self.stub.keys = [self.public_jwk, self.rotated_jwk]
+        token = make_token(self.rotated_pem, 'key-2')
+
+        async def burst():
+            return await asyncio.gather(*[verify_decode_jwt_async(token) for _ in range(1000)])
+
+        payloads = asyncio.run(burst())
+        self.assertEqual(len(payloads), 1000)
+        self.assertEqual(self.stub.hits, 2)
+
+    def test_unknown_kid_threads_fetch_once(self):
+        auth.key_provider.min_refetch_interval = 30
+        verify_decode_jwt(make_token(self.private_pem, 'key-1'))
+        self.stub.keys = [self.public_jwk, self.rotated_jwk]
+        # Let the rate limit pass before the burst
+        auth.key_provider._last_fetch -= 30
+        token = make_token(self.rotated_pem, 'key-2')
+
+        threads = [threading.Thread(target=verify_decode_jwt, args=(token,)) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.stub.hits, 2)
+
+    def test_requires_auth_async(self):
+        app = Flask(__name__)
+
+        @requires_auth_async('get:drinks-detail')
+        async def endpoint(payload):
+            return payload['sub']
+
+        token = make_token(self.private_pem, 'key-1', permissions=['get:drinks-detail'])
+        with app.test_request_context(headers={'Authorization': 'Bearer ' + token}):
+            self.assertEqual(asyncio.run(endpoint()), 'auth0|tester')
+
+
+class PermissionsTestCase(unittest.TestCase):
+    """This class represents the permission check test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_pem, cls.public_jwk = make_key('key-1')
+
+    def setUp(self):
+        self.stub = StubJWKSServer([self.public_jwk])
+        self.original_cache = auth.key_provider
+        self.original_token_cache = auth.token_cache
+        auth.key_provider = JWKSCache(self.stub.url)
+        auth.token_cache = VerifiedTokenCache()
+        self.app = Flask(__name__)
+
+    def tearDown(self):
+        auth.key_provider = self.original_cache
+        auth.token_cache = self.original_token_cache
+        self.stub.close()
+
+    def call(self, endpoint, permissions):
+        token = make_token(self.private_pem, 'key-1', permissions=permissions)
+        with self.app.test_request_context(headers={'Authorization': 'Bearer ' + token}):
+            return endpoint()
+
+    def test_payload_carries_permission_set(self):
+        token = make_token(self.private_pem, 'key-1', permissions=['get:drinks-detail', 'post:drinks'])
+        payload = verify_decode_jwt(token)
+
+        self.assertIsInstance(payload, Claims)
+        self.assertEqual(payload.permission_set, frozenset(['get:drinks-detail', 'post:drinks']))
+        self.assertIs(verify_decode_jwt(token).permission_set, payload.permission_set)
+
+    def test_check_permissions_accepts_plain_dict(self):
+        self.assertTrue(check_permissions('post:drinks', {'permissions': ['post:drinks']}))
+        with self.assertRaises(AuthError) as cm:
+            check_permissions('post:drinks', {'permissions': ['get:drinks-detail']})
+        self.assertEqual(cm.exception.status_code, 401)
+
+    def test_missing_permissions_claim(self):
+        with self.assertRaises(AuthError) as cm:
+            check_permissions('post:drinks', Claims({'sub': 'auth0|tester'}))
+        self.assertEqual(cm.exception.error['code'], 'invalid_payload')
+        self.assertEqual(cm.exception.status_code, 400)
+
+    def test_requires_all_of(self):
+        endpoint = requires_auth(all_of=['patch:drinks', 'delete:drinks'])(lambda payload: payload['sub'])
+
+        self.assertEqual(self.call(endpoint, ['patch:drinks', 'delete:drinks']), 'auth0|tester')
+        with self.assertRaises(AuthError) as cm:
+            self.call(endpoint, ['patch:drinks'])
+        self.assertEqual(cm.exception.error['code'], 'invalid_permissions')
+
+    def test_requires_any_of(self):
+        endpoint = requires_auth(any_of=['patch:drinks', 'delete:drinks'])(lambda payload: payload['sub'])
+
+        self.assertEqual(self.call(endpoint, ['delete:drinks']), 'auth0|tester')
+        with self.assertRaises(AuthError):
+            self.call(endpoint, ['get:drinks-detail'])
+
+    def test_permission_combined_with_any_of(self):
+        endpoint = requires_auth('get:drinks-detail', any_of=['post:drinks', 'patch:drinks'])(
+            lambda payload: payload['sub'])
+
+        self.assertEqual(self.call(endpoint, ['get:drinks-detail', 'patch:drinks']), 'auth0|tester')
+        with self.assertRaises(AuthError):
+            self.call(endpoint, ['post:drinks', 'patch:drinks'])
+
+    def test_no_permission_is_rejected(self):
+        for decorator in (requires_auth, requires_auth_async):
+            with self.assertRaises(ValueError):
+                decorator()
+            with self.assertRaises(ValueError):
+                decorator('', all_of=[], any_of=[])
+        with self.assertRaises(AuthError) as cm:
+            check_permissions('', {'permissions': ['get:drinks-detail']})
+        self.assertEqual(cm.exception.status_code, 401)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
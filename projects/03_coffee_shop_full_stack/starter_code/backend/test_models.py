@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from src.database.migrate import migrate_recipe_to_json
+from src.database.models import db, Drink
+
+
+class DrinkTestCase(unittest.TestCase):
+    """This class represents the drink model test case"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self._app_context = self.app.app_context()
+        self._app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self._app_context.pop()
+
+    def test_recipe_text_is_parsed(self):
+        Drink(title='water', recipe='[{"name": "water", "color": "blue", "parts": 1}]').insert()
+        db.session.remove()
+
+        drink = Drink.query.one()
+        self.assertEqual(drink.recipe, [{'name': 'water', 'color': 'blue', 'parts': 1}])
+        self.assertEqual(drink.short()['recipe'], [{'color': 'blue', 'parts': 1}])
+
+    def test_short_recipe_follows_recipe_updates(self):
+        drink = Drink(title='latte', recipe=[{'name': 'milk', 'color': 'white', 'parts': 2}])
+        drink.insert()
+        drink.recipe = [{'name': 'espresso', 'color': 'brown', 'parts': 1}]
+        drink.update()
+
+        self.assertEqual(Drink.all_short(), [
+            {'id': drink.id, 'title': 'latte', 'recipe': [{'color': 'brown', 'parts': 1}]}])
+        self.assertEqual(Drink.all_long(), [drink.long()])
+
+
+class SQLiteProfileTestCase(unittest.TestCase):
+    """This class represents the sqlite engine profile test case"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.directory.name, 'test.db')
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def pragmas(self):
+        with self.app.app_context():
+            with db.engine.connect() as connection:
+                return {name: connection.execute('PRAGMA ' + name).scalar()
+                        for name in ('journal_mode', 'synchronous', 'busy_timeout')}
+
+    def test_profile_applied_to_pooled_connections(self):
+        self.assertEqual(self.pragmas(), {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000})
+        with self.app.app_context():
+            self.assertEqual(db.engine.pool.__class__.__name__, 'QueuePool')
+
+    def test_profile_can_be_disabled(self):
+        self.app.config['SQLITE_ENGINE_PROFILE'] = False
+        self.assertEqual(self.pragmas()['journal_mode'], 'delete')
+
+
+class RecipeMigrationTestCase(unittest.TestCase):
+    """This class represents the recipe column migration test case"""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE drink (id INTEGER NOT NULL, title VARCHAR(80), '
+                'recipe VARCHAR(180) NOT NULL, PRIMARY KEY (id), UNIQUE (title))'))
+            connection.execute(text('INSERT INTO drink VALUES (1, :title, :recipe)'), {
+                'title': 'water',
+                'recipe': json.dumps([{'name': 'water', 'color': 'blue', 'parts': 1}])
+            })
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_migration_backfills_short_recipe(self):
+        self.assertEqual(migrate_recipe_to_json(self.engine), 1)
+        self.assertIsNone(migrate_recipe_to_json(self.engine))
+
+        with self.engine.connect() as connection:
+            row = connection.execute(text('SELECT title, recipe, recipe_short FROM drink')).fetchone()
+        self.assertEqual(row[0], 'water')
+        self.assertEqual(json.loads(row[2]), [{'color': 'blue', 'parts': 1}])
+
+    def test_malformed_recipe_aborts_migration(self):
+        with self.engine.begin() as connection:
+            connection.execute(text('INSERT INTO drink VALUES (2, :title, :recipe)'), {
+                'title': 'mud',
+                'recipe': '[{"name": "mud", '
+            })
+
+        with self.assertRaises(ValueError):
+            migrate_recipe_to_json(self.engine)
+
+        with self.engine.connect() as connection:
+            tables = {row[0] for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+            rows = connection.execute(text('SELECT id, recipe FROM drink ORDER BY id')).fetchall()
+        self.assertEqual(tables, {'drink'})
+        self.assertEqual([id for id, _ in rows], [1, 2])
+        self.assertEqual(rows[1][1], '[{"name": "mud", ')
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()